@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import List, ClassVar
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,8 +22,118 @@ class Settings(BaseSettings):
    
     # Model Settings
     MODEL_PATH: str = "pharmiq/phamiq.onnx"
+    # Model variant to serve: fp32 (MODEL_PATH itself) or a quantized variant produced by
+    # tools/quantize_model.py (int8-dynamic, int8-static, fp16), stored as e.g. pharmiq/phamiq.int8-static.onnx
+    MODEL_VARIANT: str = "fp32"
     IMAGE_SIZE: int = 112
-    MAX_FILE_SIZE: int = 1024 * 1024 * 1024  # 1GB
+    MAX_FILE_SIZE: int = 1024 * 1024 * 1024  # 1GB, total multispectral upload
+    
+    # Upload Settings
+    MAX_IMAGE_UPLOAD_SIZE: int = 20 * 1024 * 1024  # 20MB per leaf photo
+    MAX_REQUEST_BODY_SIZE: int = 10 * 1024 * 1024  # 10MB for routes without a specific limit
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB read/write chunks
+    
+    # ONNX Runtime Session Settings
+    ORT_GRAPH_OPTIMIZATION_LEVEL: str = "all"  # disabled, basic, extended or all
+    ORT_INTRA_OP_NUM_THREADS: int = 0  # 0 = let ONNX Runtime decide
+    ORT_INTER_OP_NUM_THREADS: int = 0  # only used by the parallel execution mode
+    ORT_EXECUTION_MODE: str = "sequential"  # sequential or parallel
+    ORT_ENABLE_CPU_MEM_ARENA: bool = True
+    ORT_ENABLE_MEM_PATTERN: bool = True
+    # Serialized ORT-optimized graph, written on first load and reused on later boots.
+    # "all"-level graphs can contain CPU-specific kernels, so don't share this file across hardware.
+    ORT_OPTIMIZED_MODEL_PATH: str = ""
+    
+    # Model Health Settings
+    MODEL_HEALTH_CHECK_INTERVAL: int = 300  # seconds between background validations
+    MODEL_HEALTH_FAILURE_THRESHOLD: int = 3  # consecutive failures that trigger a check
+    MODEL_MAX_AGE: int = 86400  # reload the model after 24 hours
+    
+    # Inference Batching Settings
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_MAX_BATCH_SIZE: int = 32  # images per ONNX session call
+    INFERENCE_MAX_WAIT_MS: float = 5.0  # how long a request may wait for a batch to fill
+    INFERENCE_MAX_CONCURRENT_BATCHES: int = 1
+    
+    # Inference Executor Settings
+    INFERENCE_EXECUTOR_WORKERS: int = 0  # 0 = size from CPU count
+    INFERENCE_MAX_QUEUE_SIZE: int = 64  # waiting tasks before answering 503
+    INFERENCE_RETRY_AFTER_SECONDS: int = 1
+    
+    # Prediction Cache Settings
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ENTRIES: int = 2048
+    PREDICTION_CACHE_TTL_SECONDS: int = 3600
+    PREDICTION_CACHE_SHARED: bool = False  # Share hits across workers through MongoDB
+
+    # Recommendations Cache Settings
+    RECOMMENDATIONS_CACHE_MAX_ENTRIES: int = 256
+    RECOMMENDATIONS_CACHE_TTL_SECONDS: int = 24 * 3600
+    RECOMMENDATIONS_CACHE_FALLBACK_TTL_SECONDS: int = 300  # Canned answers stored after an LLM failure are retried sooner
+    RECOMMENDATIONS_CACHE_SHARED: bool = False  # Share recommendations across workers through MongoDB
+    RECOMMENDATIONS_CONFIDENCE_BUCKET: float = 0.25  # Confidences in the same band share an entry; 0 leaves confidence out of the key
+
+    # Recommendations Warm-up Settings
+    RECOMMENDATIONS_WARMUP_ENABLED: bool = True  # Generate recommendations for every class and confidence band in the background
+    RECOMMENDATIONS_WARMUP_CONCURRENCY: int = 4  # Concurrent LLM calls made by the warm-up
+    RECOMMENDATIONS_WARMUP_INTERVAL_SECONDS: int = 3600  # How often to look for stale recommendations
+    RECOMMENDATIONS_WARMUP_RETRY_SECONDS: int = 300  # Sooner next pass after an LLM failure
+    RECOMMENDATIONS_REFRESH_AFTER_SECONDS: int = 12 * 3600  # Keep below RECOMMENDATIONS_CACHE_TTL_SECONDS so entries never expire unrefreshed
+    RECOMMENDATIONS_REFRESH_LEASE_SECONDS: int = 300  # How long one worker's claim to regenerate an entry lasts
+    
+    # Batch Prediction Settings
+    BATCH_PREDICTION_MAX_IMAGES: int = 100
+    BATCH_PREDICTION_MAX_TOTAL_SIZE: int = 200 * 1024 * 1024  # 200MB across all images (zip contents included)
+    
+    # Multispectral Settings
+    MULTISPECTRAL_TILE_SIZE: int = 1024  # Pixels per tile side, rounded to the raster's block size
+    MULTISPECTRAL_PREVIEW_SIZE: int = 1024  # Longest side of the downsampled maps that get rendered
+    MULTISPECTRAL_RENDER_SIZE: int = 512  # Longest side of the rendered map images
+    MULTISPECTRAL_IMAGE_FORMAT: str = "PNG"  # PNG or WEBP (lossless)
+    MULTISPECTRAL_READ_WORKERS: int = 5  # Threads reading bands concurrently (one per required band); 1 reads serially
+    GDAL_CACHEMAX_MB: int = 512  # GDAL raster block cache
+    GDAL_NUM_THREADS: str = "ALL_CPUS"  # Threads GDAL may use to decompress a single read
+    
+    # Analysis Worker Pool Settings
+    ANALYSIS_MAX_WORKERS: int = 2  # Scene analyses running at once, each in its own process
+    ANALYSIS_MAX_QUEUED: int = 8  # Analyses waiting for a worker before answering 503
+    ANALYSIS_TIMEOUT_SECONDS: int = 900
+    ANALYSIS_RETRY_AFTER_SECONDS: int = 30
+    
+    # Analysis Job Queue Settings
+    ANALYSIS_STORAGE_DIR: str = os.path.join(tempfile.gettempdir(), "phamiq-analysis")  # Must be shared with workers on other hosts
+    ANALYSIS_EMBEDDED_WORKER: bool = True  # Run a queue worker inside the API process (disable when running app.worker separately)
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_RETRY_BASE_SECONDS: float = 30.0  # Backoff doubles per attempt
+    ANALYSIS_RETRY_MAX_SECONDS: float = 900.0
+    ANALYSIS_LEASE_SECONDS: float = 120.0  # A job whose worker stops heartbeating is reclaimed after this
+    ANALYSIS_HEARTBEAT_SECONDS: float = 30.0
+    ANALYSIS_QUEUE_POLL_SECONDS: float = 2.0
+    
+    # Scene Result Cache Settings
+    SCENE_CACHE_ENABLED: bool = True
+    SCENE_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "phamiq-scene-cache")  # Share it between workers to share hits
+    SCENE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # Least recently used results are evicted beyond this
+    
+    # Rendered Layer Settings
+    LAYER_STORAGE_DIR: str = os.path.join(tempfile.gettempdir(), "phamiq-layers")  # Must be shared with standalone workers
+    LAYER_RETENTION_SECONDS: int = 7 * 24 * 3600  # Layers unused for this long are pruned at startup
+    LAYER_URL_TTL_SECONDS: int = 3600  # Lifetime of the signed layer URLs handed to clients
+    
+    # Outbound HTTP Client Settings
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20  # Bounds concurrent calls to one LLM API
+    HTTP_KEEPALIVE_SECONDS: float = 60.0
+    HTTP_DNS_CACHE_SECONDS: int = 300
+    HTTP_TIMEOUT_SECONDS: float = 60.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    
+    # Chat Settings
+    OPENROUTER_API_URL: str = "https://openrouter.ai/api/v1/chat/completions"
+    OPENROUTER_CHAT_MODEL: str = "openai/gpt-4o"
+    CHAT_MAX_CONCURRENCY: int = 16  # Concurrent LLM chat calls, further calls wait; keep <= HTTP_MAX_CONNECTIONS_PER_HOST
+    CHAT_TIMEOUT_SECONDS: float = 120.0
+    CHAT_DISCONNECT_POLL_SECONDS: float = 0.5  # How often chat routes check whether the client went away
     
     # CORS Settings
     ALLOWED_ORIGINS: List[str] = ["*"]
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.config import settings
-from app.models.database import connect_to_mongo, close_mongo_connection
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
 from app.routes import (
     health_router, 
     prediction_router, 
@@ -18,7 +19,16 @@ from app.routes import (
     ai_router
 )
 from app.services.prediction_service import prediction_service
+from app.services.inference_engine import inference_engine
+from app.services.inference_executor import inference_executor
+from app.services.analysis_pool import analysis_pool
+from app.services.analysis_worker import analysis_worker
+from app.services.scene_cache import scene_cache
+from app.services.layer_store import layer_store
 from app.services.alleai_service import alleai_service
+from app.services.recommendation_warmup import recommendation_warmer
+from app.services.http_client import http_client
+from app.utils.uploads import UploadSizeLimitMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -35,8 +45,21 @@ async def lifespan(app: FastAPI):
         # Connect to MongoDB
         await connect_to_mongo()
         
-        # Load prediction model
+        # Load prediction model and start background health checks
         prediction_service.load_model()
+        await prediction_service.health_monitor.start()
+        await inference_engine.start()
+        
+        # Reclaim space held by results computed with previous crop parameters
+        await asyncio.to_thread(scene_cache.invalidate, None, True)
+        await asyncio.to_thread(layer_store.prune)
+        
+        # Run queued multispectral jobs in this process unless dedicated workers do
+        if settings.ANALYSIS_EMBEDDED_WORKER and get_database() is not None:
+            await analysis_worker.start()
+        
+        # Shared keep-alive HTTP session for outbound LLM and image calls
+        await http_client.start()
         
         # Initialize AlleAI service
         logger.info("Initializing AlleAI service...")
@@ -56,12 +79,23 @@ async def lifespan(app: FastAPI):
             logger.info(f"API Key configured: {bool(alleai_service.api_key)}")
             logger.info(f"API Key length: {len(alleai_service.api_key) if alleai_service.api_key else 0}")
         
+        # Keep recommendations for every known class ready so /predict does not wait on the LLM
+        if settings.RECOMMENDATIONS_WARMUP_ENABLED:
+            await recommendation_warmer.start()
+        
         logger.info("API server started successfully")
         yield
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")
         raise e
     # Shutdown
+    await recommendation_warmer.stop()
+    await inference_engine.stop()
+    inference_executor.shutdown(wait=False)
+    await analysis_worker.stop()
+    analysis_pool.shutdown()
+    await prediction_service.health_monitor.stop()
+    await http_client.close()
     await close_mongo_connection()
     logger.info("API server shutting down")
 
@@ -73,6 +107,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Reject oversized bodies while they stream in (added first so CORS still wraps the 413)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    default_limit=settings.MAX_REQUEST_BODY_SIZE,
+    route_limits={
+        "/predict/multispectral": settings.MAX_FILE_SIZE,
+        "/predict/batch": settings.BATCH_PREDICTION_MAX_TOTAL_SIZE,
+        "/predict": settings.MAX_IMAGE_UPLOAD_SIZE,
+    }
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1,8 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
-from datetime import datetime
-from typing import Optional, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, List
 from app.config import settings
 from pydantic import BaseModel, Field
 from app.utils.passwords import get_password_hash, verify_password
@@ -29,6 +30,10 @@ async def connect_to_mongo():
         await database.prediction_history.create_index([("created_at", ASCENDING)])
         await database.chat_history.create_index([("user_id", ASCENDING)])
         await database.chat_history.create_index([("created_at", ASCENDING)])
+        await database.cache_entries.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        await database.analysis_jobs.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        await database.analysis_jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        await database.analysis_jobs.create_index([("user_id", ASCENDING)])
         print("Connected to MongoDB")
     except Exception as e:
         print(f"Failed to connect to MongoDB: {e}")
@@ -103,7 +108,7 @@ class ChatHistory(BaseModel):
 class AnalysisJob(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
     user_id: PyObjectId
-    status: str = "pending"  # pending, processing, completed, failed
+    status: str = "pending"  # pending, processing, completed, failed, cancelled
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     result: Optional[dict] = None
@@ -115,6 +120,16 @@ class AnalysisJob(BaseModel):
         json_encoders = {ObjectId: str}
 
 class AnalysisJobModel:
+    """
+    A multispectral analysis job, which is also an entry in the work queue.
+
+    Workers (app.worker) claim pending jobs atomically with claim_next and
+    hold them under a lease they renew with heartbeat. A job whose lease
+    expires (its worker died) becomes claimable again. Updates made while
+    running are conditional on the worker still owning the job, so a
+    cancelled or reclaimed job is never overwritten by a stale worker.
+    """
+
     def __init__(self, **kwargs):
         self.id = kwargs.get('_id')
         self.user_id = kwargs.get('user_id')
@@ -123,20 +138,46 @@ class AnalysisJobModel:
         self.updated_at = kwargs.get('updated_at', datetime.utcnow())
         self.result = kwargs.get('result')
         self.error = kwargs.get('error')
+        self.progress = kwargs.get('progress', 0.0)
+        self.file_paths = kwargs.get('file_paths', [])
+        self.work_dir = kwargs.get('work_dir')
+        self.attempts = kwargs.get('attempts', 0)
+        self.max_attempts = kwargs.get('max_attempts', settings.ANALYSIS_MAX_ATTEMPTS)
+        self.available_at = kwargs.get('available_at')
+        self.worker_id = kwargs.get('worker_id')
+        self.lease_expires_at = kwargs.get('lease_expires_at')
 
     @classmethod
-    async def create(cls, user_id: str):
+    async def create(
+        cls,
+        user_id: str,
+        file_paths: Optional[List[str]] = None,
+        work_dir: Optional[str] = None,
+        job_id: Optional[ObjectId] = None
+    ):
+        """Create a job and enqueue it for the analysis workers"""
         db = get_database()
         if db is None:
             raise Exception("Database not connected")
+        now = datetime.utcnow()
         job_data = {
             "user_id": ObjectId(user_id),
             "status": "pending",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
+            "created_at": now,
+            "updated_at": now,
             "result": None,
-            "error": None
+            "error": None,
+            "progress": 0.0,
+            "file_paths": file_paths or [],
+            "work_dir": work_dir,
+            "attempts": 0,
+            "max_attempts": settings.ANALYSIS_MAX_ATTEMPTS,
+            "available_at": now,
+            "worker_id": None,
+            "lease_expires_at": None
         }
+        if job_id is not None:
+            job_data["_id"] = job_id
         result = await db.analysis_jobs.insert_one(job_data)
         job_data['_id'] = result.inserted_id
         return cls(**job_data)
@@ -155,6 +196,116 @@ class AnalysisJobModel:
             print(f"Error finding analysis job by ID: {e}")
         return None
 
+    @classmethod
+    async def claim_next(cls, worker_id: str, lease_seconds: float):
+        """
+        Atomically claim the oldest runnable job for a worker.
+
+        Runnable means pending and past its retry backoff, or processing with
+        an expired lease. Each claim counts as an attempt.
+
+        Returns:
+            Optional[AnalysisJobModel]: The claimed job, or None if the queue is empty
+        """
+        db = get_database()
+        if db is None:
+            raise Exception("Database not connected")
+        now = datetime.utcnow()
+        job_data = await db.analysis_jobs.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                {"status": "processing", "lease_expires_at": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "processing",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "heartbeat_at": now,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", ASCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return cls(**job_data) if job_data else None
+
+    def _owned(self) -> Dict[str, Any]:
+        """Filter matching this job only while this worker still holds it"""
+        query = {"_id": self.id, "status": "processing"}
+        if self.worker_id is not None:
+            query["worker_id"] = self.worker_id
+        return query
+
+    async def _update_owned(self, update: Dict[str, Any]) -> bool:
+        db = get_database()
+        if db is None:
+            raise Exception("Database not connected")
+        self.updated_at = datetime.utcnow()
+        update.setdefault("$set", {})["updated_at"] = self.updated_at
+        result = await db.analysis_jobs.update_one(self._owned(), update)
+        return result.matched_count == 1
+
+    async def heartbeat(self, lease_seconds: float) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Returns:
+            bool: False if the job was cancelled or claimed by another worker
+        """
+        now = datetime.utcnow()
+        self.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        return await self._update_owned({"$set": {"lease_expires_at": self.lease_expires_at, "heartbeat_at": now}})
+
+    async def complete(self, result: dict) -> bool:
+        """Store the result of a running job"""
+        self.status, self.result, self.progress = "completed", result, 1.0
+        return await self._update_owned({"$set": {
+            "status": "completed", "result": result, "progress": 1.0, "lease_expires_at": None
+        }})
+
+    async def fail(self, error: str) -> bool:
+        """Fail a running job permanently"""
+        self.status, self.error = "failed", error
+        return await self._update_owned({"$set": {"status": "failed", "error": error, "lease_expires_at": None}})
+
+    async def retry_later(self, error: str, delay_seconds: float) -> bool:
+        """Put a running job back in the queue after a delay, keeping the error for reference"""
+        self.status, self.error = "pending", error
+        self.available_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        return await self._update_owned({"$set": {
+            "status": "pending", "error": error, "progress": 0.0,
+            "available_at": self.available_at, "worker_id": None, "lease_expires_at": None
+        }})
+
+    async def release(self) -> bool:
+        """Hand a running job back to the queue without counting the attempt (worker shutdown)"""
+        self.status = "pending"
+        return await self._update_owned({
+            "$set": {"status": "pending", "available_at": datetime.utcnow(), "worker_id": None, "lease_expires_at": None},
+            "$inc": {"attempts": -1}
+        })
+
+    async def cancel(self) -> bool:
+        """
+        Cancel a pending or processing job.
+
+        Returns:
+            bool: False if the job had already finished
+        """
+        db = get_database()
+        if db is None:
+            raise Exception("Database not connected")
+        self.updated_at = datetime.utcnow()
+        result = await db.analysis_jobs.update_one(
+            {"_id": self.id, "status": {"$in": ["pending", "processing"]}},
+            {"$set": {"status": "cancelled", "updated_at": self.updated_at, "lease_expires_at": None}}
+        )
+        if result.matched_count == 1:
+            self.status = "cancelled"
+        return result.matched_count == 1
+
     async def update_status(self, status: str, result: Optional[dict] = None, error: Optional[str] = None):
         db = get_database()
         if db is None:
@@ -170,6 +321,40 @@ class AnalysisJobModel:
             update_data["error"] = error
         await db.analysis_jobs.update_one({"_id": self.id}, {"$set": update_data})
 
+    async def update_progress(self, progress: float) -> bool:
+        """
+        Record progress of a processing job.
+
+        Returns:
+            bool: False if the job is no longer processing here (e.g. it was cancelled)
+        """
+        self.progress = progress
+        return await self._update_owned({"$set": {"progress": progress}})
+
+    @classmethod
+    async def queue_stats(cls) -> Dict[str, Any]:
+        """Count jobs by status and report the queue's backlog, for scaling workers"""
+        db = get_database()
+        if db is None:
+            raise Exception("Database not connected")
+        now = datetime.utcnow()
+        counts = {status: 0 for status in ("pending", "processing", "completed", "failed", "cancelled")}
+        async for row in db.analysis_jobs.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        ready = await db.analysis_jobs.count_documents({"status": "pending", "available_at": {"$lte": now}})
+        expired = await db.analysis_jobs.count_documents({"status": "processing", "lease_expires_at": {"$lt": now}})
+        oldest = await db.analysis_jobs.find_one(
+            {"status": "pending", "available_at": {"$lte": now}},
+            sort=[("available_at", ASCENDING)]
+        )
+        return {
+            "counts": counts,
+            "queue_depth": ready + expired,
+            "waiting_for_retry": counts["pending"] - ready,
+            "expired_leases": expired,
+            "oldest_wait_seconds": (now - oldest["available_at"]).total_seconds() if oldest else 0.0
+        }
+
     def to_dict(self):
         return {
             "id": str(self.id),
@@ -178,7 +363,9 @@ class AnalysisJobModel:
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "result": self.result,
-            "error": self.error
+            "error": self.error,
+            "progress": self.progress,
+            "attempts": self.attempts
         }
 
 # User model for MongoDB
@@ -447,6 +634,40 @@ class PredictionHistoryModel:
         history_data['_id'] = result.inserted_id
         return cls(**history_data)
     
+    @classmethod
+    async def create_many(cls, user_id: str, entries: List[Dict[str, Any]]):
+        """Create several prediction history entries with a single insert_many"""
+        db = get_database()
+        
+        try:
+            user_id_obj = ObjectId(user_id)
+        except Exception as e:
+            raise Exception(f"Invalid user_id format: {str(e)}")
+        
+        if not entries:
+            return []
+        created_at = datetime.utcnow()
+        documents = [
+            {
+                "user_id": user_id_obj,
+                "filename": entry['filename'],
+                "disease": entry['disease'],
+                "confidence": entry['confidence'],
+                "severity": entry['severity'],
+                "crop_type": entry['crop_type'],
+                "image_url": entry.get('image_url'),
+                "recommendations": entry.get('recommendations'),
+                "created_at": created_at
+            }
+            for entry in entries
+        ]
+        if db is None:
+            raise Exception("Database not connected")
+        result = await db.prediction_history.insert_many(documents, ordered=False)
+        for document, inserted_id in zip(documents, result.inserted_ids):
+            document['_id'] = inserted_id
+        return [cls(**document) for document in documents]
+    
     @classmethod
     async def find_by_user_id(cls, user_id: str, limit: int = 50):
         """Find prediction history for a user"""
@@ -503,4 +724,111 @@ class PredictionHistoryModel:
             "image_url": self.image_url,
             "recommendations": self.recommendations,  # Include LLM recommendations
             "created_at": self.created_at
-        } 
\ No newline at end of file
+        }
+
+class RecommendationModel:
+    """
+    Persisted LLM disease recommendations, one document per recommendations cache key.
+
+    Written by the warm-up job (app.services.recommendation_warmup) so every
+    worker, and the next deployment, can answer without waiting on the LLM.
+    Stale documents are still served until they are refreshed, and
+    claim_refresh lets one worker at a time regenerate an entry. Without a
+    database nothing is persisted and every worker refreshes on its own.
+    """
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('_id')
+        self.disease_name = kwargs.get('disease_name')
+        self.crop_type = kwargs.get('crop_type')
+        self.confidence = kwargs.get('confidence')
+        self.value = kwargs.get('value')
+        self.generated_at = kwargs.get('generated_at')
+
+    @classmethod
+    async def find_by_key(cls, key: str):
+        db = get_database()
+        if db is None:
+            return None
+        try:
+            data = await db.recommendations.find_one({"_id": key, "value": {"$ne": None}})
+            if data:
+                return cls(**data)
+        except Exception as e:
+            print(f"Error finding recommendations by key: {e}")
+        return None
+
+    @classmethod
+    async def find_all(cls):
+        """Get every persisted recommendation that has been generated"""
+        db = get_database()
+        if db is None:
+            return []
+        cursor = db.recommendations.find({"value": {"$ne": None}})
+        return [cls(**data) async for data in cursor]
+
+    @classmethod
+    async def claim_refresh(cls, key: str, stale_before: datetime, lease_seconds: float) -> bool:
+        """
+        Atomically claim the right to regenerate an entry.
+
+        Succeeds when the entry is missing or was generated before
+        ``stale_before``, and no other worker holds an unexpired claim.
+
+        Returns:
+            bool: True if this worker should regenerate the entry
+        """
+        db = get_database()
+        if db is None:
+            return True
+        now = datetime.utcnow()
+        try:
+            # Upsert inserts a claim for a missing key; an existing fresh or claimed one collides on _id
+            await db.recommendations.find_one_and_update(
+                {
+                    "_id": key,
+                    "$and": [
+                        {"$or": [{"generated_at": None}, {"generated_at": {"$lt": stale_before}}]},
+                        {"$or": [{"refresh_lease_until": None}, {"refresh_lease_until": {"$lt": now}}]}
+                    ]
+                },
+                {"$set": {"refresh_lease_until": now + timedelta(seconds=lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @classmethod
+    async def save(cls, key: str, disease_name: str, crop_type: str, confidence: float, value: Dict[str, Any]):
+        """Store freshly generated recommendations and release the refresh claim"""
+        db = get_database()
+        if db is None:
+            return None
+        data = {
+            "disease_name": disease_name,
+            "crop_type": crop_type,
+            "confidence": confidence,
+            "value": value,
+            "generated_at": datetime.utcnow(),
+            "refresh_lease_until": None
+        }
+        await db.recommendations.update_one({"_id": key}, {"$set": data}, upsert=True)
+        return cls(_id=key, **data)
+
+    @classmethod
+    async def release_claim(cls, key: str):
+        """Give up a refresh claim after a failed generation so another attempt can start"""
+        db = get_database()
+        if db is None:
+            return
+        await db.recommendations.update_one({"_id": key}, {"$set": {"refresh_lease_until": None}})
+
+    @classmethod
+    async def delete_all(cls) -> int:
+        """Delete every persisted recommendation, returning how many were removed"""
+        db = get_database()
+        if db is None:
+            return 0
+        result = await db.recommendations.delete_many({})
+        return result.deleted_count
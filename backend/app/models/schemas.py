@@ -57,6 +57,7 @@ class HealthResponse(BaseModel):
     model_loaded: bool = Field(..., description="Whether model is loaded")
     supported_classes: int = Field(..., description="Number of supported classes")
     classes: List[str] = Field(..., description="List of all class names")
+    model_health: Optional[Dict[str, Any]] = Field(None, description="Background model health monitor state")
 
 class BasicHealthResponse(BaseModel):
     """Basic health check response"""
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import traceback
 import re
 import json
 from fastapi.responses import StreamingResponse, Response
-import requests
 from app.services.alleai_service import alleai_service
+from app.services.http_client import http_client
+from app.utils.disconnect import cancel_on_disconnect
+from app.utils.sse import chat_event_response
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -135,7 +137,7 @@ def clean_text_response(text: str) -> str:
     return text
 
 @router.post("/generate-title", response_model=ChatResponse)
-async def generate_title(request: PromptRequest):
+async def generate_title(request: PromptRequest, http_request: Request):
     try:
         if not alleai_service.is_available():
             raise HTTPException(
@@ -147,23 +149,25 @@ async def generate_title(request: PromptRequest):
         title_prompt = f"Generate a concise, professional title for this topic: {request.prompt}. The title should be clear, descriptive, and suitable for agricultural content. Return ONLY the title as plain text, no JSON formatting, no quotes, no additional text, no markdown."
         
         models = request.models or ["gpt-4o"]
-        result = await alleai_service.chat_with_ai(
+        result = await cancel_on_disconnect(http_request, alleai_service.chat_with_ai(
             user_message=title_prompt,
             conversation_history=[],
             models=models
-        )
+        ))
         
         # Clean the response to get just the title
         title = clean_text_response(result)
         
         return {"result": title}
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error in /ai/generate-title:", e)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate-description", response_model=ChatResponse)
-async def generate_description(request: PromptRequest):
+async def generate_description(request: PromptRequest, http_request: Request):
     try:
         if not alleai_service.is_available():
             raise HTTPException(
@@ -175,16 +179,18 @@ async def generate_description(request: PromptRequest):
         description_prompt = f"Write a comprehensive, informative description for this agricultural topic: {request.prompt}. The description should be 2-3 paragraphs long, include practical information, and be written in a professional but accessible tone suitable for farmers and agricultural professionals. Focus on practical applications and benefits. Return the description as natural text with proper formatting, no JSON, no markdown, just well-structured paragraphs."
         
         models = request.models or ["gpt-4o"]
-        result = await alleai_service.chat_with_ai(
+        result = await cancel_on_disconnect(http_request, alleai_service.chat_with_ai(
             user_message=description_prompt,
             conversation_history=[],
             models=models
-        )
+        ))
         
         # Clean the response to ensure it's plain text
         description = clean_text_response(result)
         
         return {"result": description}
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error in /ai/generate-description:", e)
         traceback.print_exc()
@@ -215,20 +221,43 @@ async def generate_image(request: PromptRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+class UpstreamStreamingResponse(StreamingResponse):
+    """Stream an aiohttp response body, releasing its connection however the response ends"""
+
+    def __init__(self, upstream, **kwargs):
+        super().__init__(upstream.content.iter_chunked(64 * 1024), **kwargs)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Also runs when the client disconnects part way, which skips background tasks
+            self.upstream.release()
+
 @router.get("/proxy-image")
-def proxy_image(url: str):
+async def proxy_image(url: str):
     try:
-        r = requests.get(url, stream=True)
-        # Guess content type from headers, fallback to image/png
-        content_type = r.headers.get('content-type', 'image/png')
-        headers = {"Access-Control-Allow-Origin": "*"}
-        return StreamingResponse(r.raw, media_type=content_type, headers=headers)
+        session = await http_client.get_session()
+        r = await session.get(url)
     except Exception as e:
         print("Error proxying image:", e)
         return Response(content="Failed to fetch image", status_code=500)
+    if not r.ok:
+        print(f"Error proxying image: upstream answered {r.status}")
+        r.release()
+        return Response(content="Failed to fetch image", status_code=502)
+    # Guess content type from headers, fallback to image/png
+    content_type = r.headers.get('content-type', 'image/png')
+    headers = {"Access-Control-Allow-Origin": "*"}
+    return UpstreamStreamingResponse(r, media_type=content_type, headers=headers)
+
+def enhance_chat_prompt(prompt: str) -> str:
+    # Enhance the prompt to request natural text responses
+    return f"{prompt}\n\nPlease provide a natural, conversational response. Use proper formatting with paragraphs, bullet points where appropriate, and clear explanations. Avoid JSON formatting or technical jargon unless specifically requested."
 
 @router.post("/chat")
-async def ai_chat(request: PromptRequest):
+async def ai_chat(request: PromptRequest, http_request: Request):
     """General AI chat endpoint"""
     try:
         if not alleai_service.is_available():
@@ -237,25 +266,48 @@ async def ai_chat(request: PromptRequest):
                 detail="AI service is not available. Please configure AlleAI API key."
             )
         
-        # Enhance the prompt to request natural text responses
-        enhanced_prompt = f"{request.prompt}\n\nPlease provide a natural, conversational response. Use proper formatting with paragraphs, bullet points where appropriate, and clear explanations. Avoid JSON formatting or technical jargon unless specifically requested."
-        
         models = request.models or ["gpt-4o"]
-        result = await alleai_service.chat_with_ai(
-            user_message=enhanced_prompt,
+        result = await cancel_on_disconnect(http_request, alleai_service.chat_with_ai(
+            user_message=enhance_chat_prompt(request.prompt),
             conversation_history=[],
             models=models
-        )
+        ))
         
         # Clean the response to ensure it's natural text
         cleaned_result = clean_text_response(result)
         
         return {"result": cleaned_result}
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error in /ai/chat:", e)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/stream")
+async def ai_chat_stream(request: PromptRequest):
+    """General AI chat endpoint streaming the reply as Server-Sent Events (token, done, error)"""
+    try:
+        if not alleai_service.is_available():
+            raise HTTPException(
+                status_code=503,
+                detail="AI service is not available. Please configure AlleAI API key."
+            )
+        
+        models = request.models or ["gpt-4o"]
+        # The done event carries the same text /ai/chat would return
+        return chat_event_response(alleai_service.stream_chat_with_ai(
+            user_message=enhance_chat_prompt(request.prompt),
+            conversation_history=[],
+            models=models
+        ), finalize=clean_text_response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("Error in /ai/chat/stream:", e)
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/disease-analysis")
 async def disease_analysis(request: PromptRequest):
     """Specialized endpoint for disease analysis"""
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import logging
 
 from app.services.alleai_service import alleai_service
 from app.utils.auth import get_current_active_user
+from app.utils.disconnect import cancel_on_disconnect
+from app.utils.sse import chat_event_response
 from app.models.database import User, ChatHistoryModel
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
@@ -58,6 +60,7 @@ async def get_chat_status():
             "connection_status": connection_status,
             "models": alleai_service.get_available_models() if is_available else [],
             "api_key_configured": bool(alleai_service.api_key),
+            "chat_stats": alleai_service.get_chat_stats(),
             "message": "Chat service is ready" if is_available else "Chat service not configured"
         }
     except Exception as e:
@@ -144,7 +147,8 @@ async def test_simple_chat():
 
 @router.post("/", response_model=ChatResponse)
 async def chat_with_ai(
-    request: ChatRequest
+    request: ChatRequest,
+    http_request: Request
     # current_user: User = Depends(get_current_active_user)  # REMOVE auth for open chat
 ):
     """Chat with AI assistant using enhanced AlleAI service"""
@@ -165,11 +169,12 @@ async def chat_with_ai(
             })
         logger.info(f"Sending request to enhanced AlleAI service with {len(conversation_history)} history messages")
         # Use the enhanced chat_with_ai method with model selection
-        response_content = await alleai_service.chat_with_ai(
+        # Abandoned chats stop their LLM call instead of holding a chat slot
+        response_content = await cancel_on_disconnect(http_request, alleai_service.chat_with_ai(
             user_message=request.message,
             conversation_history=conversation_history,
             models=request.models
-        )
+        ))
         if not response_content:
             logger.error("No response content received from AlleAI")
             raise Exception("No response received from AI")
@@ -189,6 +194,40 @@ async def chat_with_ai(
             detail=f"Failed to get AI response: {str(e)}"
         )
 
+@router.post("/stream")
+async def stream_chat_with_ai(request: ChatRequest):
+    """
+    Chat with the AI assistant, streaming the reply as Server-Sent Events.
+
+    Emits ``token`` events ({"text": ...}) as the reply is generated and a
+    final ``done`` event ({"message": ...}) with the whole reply, or an
+    ``error`` event if it fails part way. A client that disconnects stops
+    the upstream call.
+    """
+    try:
+        logger.info(f"Streaming chat request (unauthenticated), message: {request.message[:50]}...")
+        if not alleai_service.is_available():
+            logger.warning("AlleAI service not available for chat")
+            raise HTTPException(
+                status_code=503,
+                detail="Chat service is not available. Please configure AlleAI API key."
+            )
+        conversation_history = [{"role": msg.role, "content": msg.content} for msg in request.conversation_history]
+        return chat_event_response(alleai_service.stream_chat_with_ai(
+            user_message=request.message,
+            conversation_history=conversation_history,
+            models=request.models
+        ))
+    except HTTPException as e:
+        logger.error(f"HTTP exception in chat stream: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to start AI response: {str(e)}"
+        )
+
 @router.post("/test-chat")
 async def test_chat_functionality():
     """Test chat functionality with a simple message"""
@@ -17,11 +17,13 @@ async def root():
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Detailed health check"""
+    monitor = prediction_service.health_monitor
     return HealthResponse(
-        status="healthy" if prediction_service.is_model_loaded() else "unhealthy",
+        status="healthy" if monitor.is_healthy() else "unhealthy",
         model_loaded=prediction_service.is_model_loaded(),
         supported_classes=len(IDX_TO_CLASS),
-        classes=list(IDX_TO_CLASS.values())
+        classes=list(IDX_TO_CLASS.values()),
+        model_health=monitor.get_status()
     )
 
 @router.get("/classes", response_model=ClassesResponse)
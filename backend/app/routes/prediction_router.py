@@ -1,25 +1,284 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 import numpy as np
 from PIL import Image
+import asyncio
+import base64
 import io
+import json
 import logging
 import os
+import shutil
+import time
 import tempfile
 import zipfile
-from typing import Dict, Any, List, Optional
+import zlib
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from datetime import datetime
+from bson import ObjectId
 
 from app.models.schemas import PredictionResponse, ErrorResponse, EnhancedPredictionResponse, DiseaseRecommendations
 from app.services.prediction_service import prediction_service
+from app.services.inference_engine import inference_engine
+from app.services.inference_executor import inference_executor, InferenceQueueFullError
+from app.services.prediction_cache import prediction_cache
+from app.services.analysis_worker import analysis_worker
+from app.services.scene_cache import scene_cache
+from app.services.multispectral_service import SOIL_COLORS
+from app.services.layer_store import layer_store, sign_layer, verify_layer_signature
+from app.services.analysis_pool import (
+    analysis_pool,
+    AnalysisPoolFullError,
+    AnalysisTimeoutError
+)
 from app.services.alleai_service import alleai_service
+from app.services.recommendation_warmup import crop_type_from_class, recommendation_warmer
 from app.config import settings, IDX_TO_CLASS
 from app.utils.auth import get_current_active_user
+from app.utils.image_decode import decode_image
+from app.utils.uploads import read_upload, save_upload
+from app.utils.raster_render import LUTS, class_colorbar, colorbar
 from app.models.database import User, PredictionHistoryModel, AnalysisJobModel
 
 router = APIRouter(prefix="/predict", tags=["Prediction"])
 logger = logging.getLogger(__name__)
 
+def _decode_image(image_data: bytes) -> np.ndarray:
+    """Decode uploaded bytes to a reduced RGB array (CPU-bound, runs in the inference executor)"""
+    return decode_image(image_data, settings.IMAGE_SIZE)
+
+def _analysis_busy_response(error: AnalysisPoolFullError) -> HTTPException:
+    """Build the 503 returned when the analysis worker pool is saturated"""
+    return HTTPException(
+        status_code=503,
+        detail="Analysis workers are busy, please retry later",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def _queue_full_response(error: InferenceQueueFullError) -> HTTPException:
+    """Build the 503 returned when the inference queue is saturated"""
+    return HTTPException(
+        status_code=503,
+        detail="Prediction service is busy, please retry shortly",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+BATCH_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+async def _read_batch_uploads(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """
+    Collect (filename, bytes) pairs from image uploads and zip archives.
+
+    Zip members are size-checked from the archive directory before being
+    extracted, so an oversized (or zip-bomb) archive is rejected up front.
+    Archives are listed and extracted in a worker thread, and each upload is
+    read with only the part of the batch size limit not used yet.
+
+    Raises:
+        HTTPException: 400 for unsupported files and unreadable archives, 413
+            when the image count or total size exceeds the batch limits
+    """
+    images: List[Tuple[str, bytes]] = []
+    total_size = 0
+
+    def batch_too_large() -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"Batch too large. Maximum size: {settings.BATCH_PREDICTION_MAX_TOTAL_SIZE} bytes"
+        )
+
+    def add(filename: str, size: int) -> None:
+        nonlocal total_size
+        total_size += size
+        if len(images) >= settings.BATCH_PREDICTION_MAX_IMAGES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many images. Maximum per batch: {settings.BATCH_PREDICTION_MAX_IMAGES}"
+            )
+        if total_size > settings.BATCH_PREDICTION_MAX_TOTAL_SIZE:
+            raise batch_too_large()
+
+    def extract_zip(data: bytes, filename: str) -> None:
+        # Runs in a worker thread: decompressing up to the batch budget would stall the event loop
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                        continue
+                    if not name.lower().endswith(BATCH_IMAGE_EXTENSIONS):
+                        continue
+                    add(name, info.file_size)
+                    images.append((name, archive.read(info)))
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError, zlib.error, EOFError):
+            # Corrupt, truncated, encrypted or unsupported-compression members surface as these
+            raise HTTPException(status_code=400, detail=f"Invalid zip archive: {filename}")
+
+    for upload in files:
+        filename = upload.filename or "upload"
+        try:
+            # Each upload only gets what is left of the batch budget
+            data = await read_upload(upload, settings.BATCH_PREDICTION_MAX_TOTAL_SIZE - total_size)
+        except HTTPException as e:
+            if e.status_code == 413:
+                raise batch_too_large()
+            raise
+        if filename.lower().endswith('.zip') or upload.content_type in ("application/zip", "application/x-zip-compressed"):
+            await asyncio.to_thread(extract_zip, data, filename)
+        elif upload.content_type and upload.content_type.startswith('image/'):
+            add(filename, len(data))
+            images.append((filename, data))
+        else:
+            raise HTTPException(status_code=400, detail=f"File must be an image or a zip of images: {filename}")
+
+    return images
+
+def _ndjson(payload: Dict[str, Any]) -> str:
+    return json.dumps(jsonable_encoder(payload)) + "\n"
+
+async def _stream_batch_predictions(
+    images: List[Tuple[str, bytes]],
+    top_k: int,
+    models: Optional[List[str]],
+    user: User
+) -> AsyncIterator[str]:
+    """
+    Decode, predict and stream a batch of images as NDJSON lines.
+
+    Decoding runs in parallel (bounded by the inference executor's worker
+    count); decoded images are grouped into chunks and run as batched tensors
+    as soon as a chunk fills. Lines emitted:
+
+    - ``{"type": "prediction", ...}`` per image, in completion order (``index``
+      refers to the position in the upload)
+    - ``{"type": "recommendations", ...}`` once per distinct predicted class,
+      since the LLM is called only once per class in the batch
+    - ``{"type": "summary", ...}`` last, after history is written with a
+      single insert_many
+    """
+    loop = asyncio.get_running_loop()
+    decode_slots = asyncio.Semaphore(inference_executor.max_workers)
+
+    async def decode(index: int, data: bytes):
+        async with decode_slots:
+            try:
+                return index, await loop.run_in_executor(inference_executor, _decode_image, data), None
+            except Exception as e:
+                return index, None, e
+
+    decode_tasks = [asyncio.create_task(decode(index, data)) for index, (_, data) in enumerate(images)]
+    recommendation_tasks: Dict[str, asyncio.Task] = {}
+    top_predictions: Dict[int, Any] = {}
+    failed = 0
+
+    def error_line(index: int, error: Exception) -> str:
+        payload = {"type": "prediction", "index": index, "filename": images[index][0], "success": False}
+        if isinstance(error, InferenceQueueFullError):
+            payload.update(error="Prediction service is busy, please retry shortly", retry_after=error.retry_after)
+        else:
+            payload["error"] = f"Prediction failed: {str(error)}"
+        return _ndjson(payload)
+
+    async def fetch_recommendations(class_name: str, confidence: float, crop_type: str):
+        try:
+            return class_name, await alleai_service.get_disease_recommendations(class_name, confidence, crop_type, models), None
+        except Exception as e:
+            return class_name, None, e
+
+    async def run_chunk(chunk: List[Tuple[int, np.ndarray]]) -> List[str]:
+        nonlocal failed
+        try:
+            results = await inference_engine.predict_batch([array for _, array in chunk], top_k)
+        except InferenceQueueFullError as e:
+            results = [e] * len(chunk)
+
+        lines = []
+        for (index, _), result in zip(chunk, results):
+            if isinstance(result, Exception) or not result:
+                failed += 1
+                lines.append(error_line(index, result if isinstance(result, Exception) else RuntimeError("No predictions")))
+                continue
+            top_prediction = result[0]
+            crop_type = crop_type_from_class(top_prediction.class_name)
+            top_predictions[index] = (top_prediction, crop_type)
+            if top_prediction.class_name not in recommendation_tasks:
+                recommendation_tasks[top_prediction.class_name] = asyncio.create_task(
+                    fetch_recommendations(top_prediction.class_name, top_prediction.confidence, crop_type)
+                )
+            lines.append(_ndjson({
+                "type": "prediction",
+                "index": index,
+                "filename": images[index][0],
+                "success": True,
+                "predictions": result,
+                "crop_type": crop_type
+            }))
+        return lines
+
+    try:
+        chunk: List[Tuple[int, np.ndarray]] = []
+        remaining = len(decode_tasks)
+        for next_decoded in asyncio.as_completed(decode_tasks):
+            index, array, error = await next_decoded
+            remaining -= 1
+            if error is not None:
+                failed += 1
+                yield error_line(index, error)
+            else:
+                chunk.append((index, array))
+            if chunk and (len(chunk) >= inference_engine.max_batch_size or remaining == 0):
+                for line in await run_chunk(chunk):
+                    yield line
+                chunk = []
+
+        # One recommendation per distinct class, streamed as each completes
+        recommendations: Dict[str, Optional[Dict[str, Any]]] = {}
+        for next_recommendation in asyncio.as_completed(list(recommendation_tasks.values())):
+            class_name, result, error = await next_recommendation
+            recommendations[class_name] = result
+            payload = {"type": "recommendations", "class": class_name, "recommendations": result}
+            if error is not None:
+                logger.error(f"Error getting LLM recommendations for {class_name}: {str(error)}")
+                payload["error"] = f"Failed to generate disease recommendations: {str(error)}"
+            yield _ndjson(payload)
+
+        # Save all successful predictions in one round-trip
+        history_saved = False
+        entries = []
+        for index, (top_prediction, crop_type) in sorted(top_predictions.items()):
+            class_recommendations = recommendations.get(top_prediction.class_name)
+            entries.append({
+                "filename": images[index][0],
+                "disease": top_prediction.class_name,
+                "confidence": top_prediction.confidence,
+                "severity": (class_recommendations or {}).get("severity_level", "Unknown"),
+                "crop_type": crop_type,
+                "recommendations": class_recommendations
+            })
+        if entries:
+            try:
+                await PredictionHistoryModel.create_many(str(user.id), entries)
+                history_saved = True
+                logger.info(f"Saved {len(entries)} batch predictions to history for user {user.email}")
+            except Exception as e:
+                logger.error(f"Failed to save batch prediction history: {str(e)}")
+                # Don't fail the batch if history saving fails
+
+        yield _ndjson({
+            "type": "summary",
+            "total": len(images),
+            "succeeded": len(top_predictions),
+            "failed": failed,
+            "distinct_classes": len(recommendation_tasks),
+            "history_saved": history_saved
+        })
+    finally:
+        # Client disconnects close the generator; don't leave work running
+        for task in decode_tasks + list(recommendation_tasks.values()):
+            if not task.done():
+                task.cancel()
+
 @router.get("/test-llm")
 async def test_llm_endpoint():
     """Test endpoint to verify LLM integration"""
@@ -100,7 +359,10 @@ async def get_cache_stats():
         stats = alleai_service.get_cache_stats()
         return {
             "status": "success",
-            "cache_stats": stats
+            "cache_stats": stats,
+            "recommendation_warmup": recommendation_warmer.get_status(),
+            "prediction_cache_stats": prediction_cache.get_stats(),
+            "scene_cache_stats": await asyncio.to_thread(scene_cache.get_stats)
         }
     except Exception as e:
         logger.error(f"Error getting cache stats: {str(e)}")
@@ -111,9 +373,11 @@ async def get_cache_stats():
 
 @router.delete("/cache")
 async def clear_cache():
-    """Clear the recommendations cache"""
+    """Clear the recommendations cache, persisted recommendations included"""
     try:
-        alleai_service.clear_cache()
+        await alleai_service.clear_cache()
+        # Regenerated on the next warm-up pass, or on demand by /predict until then
+        recommendation_warmer.forget_generated()
         return {
             "status": "success",
             "message": "Cache cleared successfully"
@@ -125,6 +389,23 @@ async def clear_cache():
             detail=f"Failed to clear cache: {str(e)}"
         )
 
+@router.get("/engine/stats")
+async def get_engine_stats():
+    """Get inference batching, queue depth and queue wait statistics"""
+    try:
+        return {
+            "status": "success",
+            "engine_stats": inference_engine.get_stats(),
+            "executor_stats": inference_executor.get_stats(),
+            "analysis_pool_stats": analysis_pool.get_stats()
+        }
+    except Exception as e:
+        logger.error(f"Error getting engine stats: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get engine stats: {str(e)}"
+        )
+
 @router.post("/", response_model=EnhancedPredictionResponse)
 async def predict_disease(
     file: UploadFile = File(..., description="Image file (jpg, jpeg, png)"),
@@ -138,17 +419,26 @@ async def predict_disease(
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read and validate image
-        image_data = await file.read()
-        if len(image_data) > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File too large")
+        # Read and validate image (rejected as soon as it passes the image limit)
+        image_data = await read_upload(file, settings.MAX_IMAGE_UPLOAD_SIZE)
         
-        # Process image
-        image = Image.open(io.BytesIO(image_data))
-        image = image.convert('RGB')
+        # Re-uploads and retries of the same photo skip decoding and inference
+        image_hash = prediction_cache.hash_image(image_data)
+        predictions = await prediction_cache.get(image_hash, top_k)
         
-        # Get predictions
-        predictions = prediction_service.predict_disease_from_image(image, top_k)
+        if predictions is None:
+            # Decode off the event loop, then predict (batched with concurrent requests)
+            try:
+                loop = asyncio.get_running_loop()
+                image_array = await loop.run_in_executor(inference_executor, _decode_image, image_data)
+                predictions = await inference_engine.predict(image_array, top_k)
+            except InferenceQueueFullError as e:
+                logger.warning("Inference queue full, rejecting prediction request")
+                raise _queue_full_response(e)
+            if predictions:
+                await prediction_cache.set(image_hash, top_k, predictions)
+        else:
+            logger.info(f"Prediction cache hit for {file.filename}")
         
         if not predictions:
             raise HTTPException(status_code=500, detail="Failed to get predictions")
@@ -167,17 +457,7 @@ async def predict_disease(
             try:
                 # Extract crop type from disease name
                 disease_name = top_prediction.class_name
-                crop_type = "Unknown Crop"
-                if disease_name:
-                    lower_disease = disease_name.lower()
-                    if "cashew" in lower_disease:
-                        crop_type = "Cashew"
-                    elif "cassava" in lower_disease:
-                        crop_type = "Cassava"
-                    elif "maize" in lower_disease:
-                        crop_type = "Maize"
-                    elif "tomato" in lower_disease:
-                        crop_type = "Tomato"
+                crop_type = crop_type_from_class(disease_name)
                 
                 # Get comprehensive LLM recommendations - this is now mandatory
                 recommendations_data = await alleai_service.get_disease_recommendations(
@@ -229,94 +509,245 @@ async def predict_disease(
             detail=f"Prediction failed: {str(e)}"
         )
 
+@router.post("/batch")
+async def predict_disease_batch(
+    files: List[UploadFile] = File(..., description="Image files (jpg, jpeg, png) and/or zip archives of images"),
+    top_k: int = Query(3, ge=1, le=len(IDX_TO_CLASS), description="Number of top predictions per image"),
+    models: Optional[List[str]] = Query(None, description="AI models to use for recommendations"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Predict diseases for many leaf photos in one request.
+    
+    - **files**: Images and/or zip archives of images
+    - **Response**: NDJSON stream with one ``prediction`` line per image as it
+      completes, one ``recommendations`` line per distinct predicted class, and
+      a final ``summary`` line
+    - **Authentication**: Required
+    """
+    try:
+        images = await _read_batch_uploads(files)
+        if not images:
+            raise HTTPException(status_code=400, detail="No images found in upload")
+        
+        # LLM is required for disease analysis, same as single predictions
+        if not alleai_service.is_available():
+            logger.error("AlleAI service not available - LLM is required for disease analysis")
+            raise HTTPException(
+                status_code=503,
+                detail="LLM service is required for disease analysis but not available. Please configure AlleAI API key."
+            )
+        
+        logger.info(f"Batch prediction of {len(images)} images for user {current_user.email}")
+        return StreamingResponse(
+            _stream_batch_predictions(images, top_k, models, current_user),
+            media_type="application/x-ndjson"
+        )
+    
+    except HTTPException as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected batch prediction error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
+
+async def _save_uploads(files: List[UploadFile], directory: str, max_total_size: int) -> List[str]:
+    """Stream uploads to directory, enforcing a combined size limit"""
+    file_paths = []
+    remaining = max_total_size
+    for upload in files:
+        try:
+            path, size = await save_upload(upload, directory, remaining)
+        except HTTPException as e:
+            if e.status_code == 413:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Total upload too large. Maximum size: {max_total_size} bytes"
+                )
+            raise
+        remaining -= size
+        file_paths.append(path)
+    return file_paths
+
+def _set_layer_images(results: Dict[str, Any], sources: Dict[str, str]) -> Dict[str, Any]:
+    """Fill suitability_images/soil_type_image/best_crop_image from per-layer sources"""
+    if "layers" not in results:
+        return results  # limited (metadata-only) analysis
+    results = dict(results)
+    results["suitability_images"] = {
+        name[len("suitability_"):]: source for name, source in sources.items() if name.startswith("suitability_")
+    }
+    results["soil_type_image"] = sources.get("soil_type")
+    results["best_crop_image"] = sources.get("best_crop")
+    return results
+
+def _with_layer_urls(request: Request, job_id: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Point a job's layers at signed download URLs (img tags cannot send the bearer token)"""
+    expires = int(time.time()) + settings.LAYER_URL_TTL_SECONDS
+    urls = {}
+    for name in results.get("layers", {}):
+        url = request.url_for("get_multispectral_layer", job_id=job_id, name=name)
+        urls[name] = f"{url}?expires={expires}&signature={sign_layer(job_id, name, expires)}"
+    return _set_layer_images(results, urls)
+
+async def _with_inline_layers(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Embed layers as data URIs, for responses that have no job to address them by"""
+    images = {}
+    for name, ref in results.get("layers", {}).items():
+        data = await asyncio.to_thread(layer_store.read, ref)
+        images[name] = f"data:{ref['media_type']};base64,{base64.b64encode(data).decode()}"
+    return _set_layer_images(results, images)
+
 @router.post("/multispectral/async", response_model=Dict[str, Any])
 async def submit_multispectral_job(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(..., description="Multispectral data files (.txt, .zip, or band files)"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Submit a multispectral analysis job (async).
-    Returns a job_id immediately. Use /multispectral/status/{job_id} to check status/result.
+    Returns a job_id immediately. Use /multispectral/status/{job_id} to check status/result
+    and /multispectral/cancel/{job_id} to stop it.
+
+    The job is queued in MongoDB and run by an analysis worker (app.worker), so
+    uploads go to ANALYSIS_STORAGE_DIR, which workers on other hosts must share.
     """
-    # Create job in DB
-    job = await AnalysisJobModel.create(user_id=str(current_user.id))
-    job_id = str(job.id)
-    # Save files to temp dir for background processing
-    import tempfile, shutil
-    temp_dir = tempfile.mkdtemp()
-    file_paths = []
-    for upload in files:
-        file_path = os.path.join(temp_dir, upload.filename)
-        contents = await upload.read()
-        with open(file_path, 'wb') as f:
-            f.write(contents)
-        file_paths.append(file_path)
-    # Launch background task
-    background_tasks.add_task(process_multispectral_job, job_id, file_paths)
-    return {"job_id": job_id, "status": "pending"}
-
-async def process_multispectral_job(job_id: str, file_paths: list):
-    from app.services.multispectral_service import MultispectralAnalyzer
-    import os
-    import traceback
+    job_id = ObjectId()
+    work_dir = os.path.join(settings.ANALYSIS_STORAGE_DIR, str(job_id))
+    os.makedirs(work_dir, exist_ok=True)
     try:
-        job = await AnalysisJobModel.find_by_id(job_id)
-        if not job:
-            return
-        await job.update_status("processing")
-        # Find MTL file
-        mtl_path = None
-        for path in file_paths:
-            if path.lower().endswith('.txt') and '_mtl' in path.lower():
-                mtl_path = path
-                break
-        if not mtl_path:
-            await job.update_status("failed", error="No MTL .txt metadata file found among uploads.")
-            return
-        analyzer = MultispectralAnalyzer()
-        results = await analyzer.analyze_from_mtl(mtl_path)
-        # Save to history (tag as multispectral)
-        try:
-            from app.models.database import PredictionHistoryModel
-            # You may want to extract user_id from job
-            user_id = str(job.user_id)
-            await PredictionHistoryModel.create(
-                user_id=user_id,
-                filename=os.path.basename(mtl_path),
-                disease=results.get('prediction', 'Multispectral Analysis'),
-                confidence=results.get('confidence', 0),
-                severity=results.get('severity', 'N/A'),
-                crop_type=results.get('best_crop', 'N/A'),
-                image_url=None,
-                is_multispectral=True
-            )
-        except Exception as hist_err:
-            print(f"Failed to save multispectral result to history: {hist_err}")
-        await job.update_status("completed", result={
-            "status": results.get("status", "success"),
-            "filename": mtl_path,
-            "analysis_type": "multispectral",
-            "results": results
-        })
+        file_paths = await _save_uploads(files, work_dir, settings.MAX_FILE_SIZE)
+        job = await AnalysisJobModel.create(
+            user_id=str(current_user.id),
+            file_paths=file_paths,
+            work_dir=work_dir,
+            job_id=job_id
+        )
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return {"job_id": str(job.id), "status": job.status}
+
+@router.delete("/multispectral/cache", response_model=Dict[str, Any])
+async def invalidate_multispectral_cache(
+    product_id: Optional[str] = Query(None, description="Only drop results for this Landsat product ID"),
+    stale_only: bool = Query(False, description="Only drop results computed with other crop parameters"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Invalidate cached multispectral analysis results"""
+    try:
+        removed = await asyncio.to_thread(scene_cache.invalidate, product_id, stale_only)
+        return {"status": "success", "removed": removed}
     except Exception as e:
-        tb = traceback.format_exc()
-        job = await AnalysisJobModel.find_by_id(job_id)
-        if job:
-            await job.update_status("failed", error=f"Analysis failed: {str(e)}\n{tb}")
-    finally:
-        # Clean up temp files
-        import shutil
-        temp_dir = os.path.dirname(file_paths[0]) if file_paths else None
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        logger.error(f"Error invalidating scene cache: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to invalidate scene cache: {str(e)}"
+        )
+
+@router.get("/multispectral/queue/stats", response_model=Dict[str, Any])
+async def get_multispectral_queue_stats():
+    """Get analysis job queue depth and status counts, for scaling analysis workers"""
+    try:
+        return {
+            "status": "success",
+            "queue_stats": await AnalysisJobModel.queue_stats(),
+            "embedded_worker_stats": analysis_worker.get_stats() if settings.ANALYSIS_EMBEDDED_WORKER else None
+        }
+    except Exception as e:
+        logger.error(f"Error getting queue stats: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get queue stats: {str(e)}"
+        )
+
+@router.get("/multispectral/colorbars/{name}.png")
+async def get_multispectral_colorbar(name: str):
+    """
+    Get the legend for multispectral maps: a colormap name (e.g. RdYlGn) or ``soil``.
+
+    Tick values come with each analysis under ``image_legends``.
+    """
+    if name == "soil":
+        content = class_colorbar(tuple(SOIL_COLORS))
+    elif name in LUTS:
+        content = colorbar(name)
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown colorbar: {name}")
+    return Response(
+        content=content,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=86400, immutable"}
+    )
 
 @router.get("/multispectral/status/{job_id}", response_model=Dict[str, Any])
-async def get_multispectral_job_status(job_id: str, current_user: User = Depends(get_current_active_user)):
+async def get_multispectral_job_status(
+    job_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get a multispectral job's status and, once completed, its result.
+
+    Map images are not embedded: suitability_images and soil_type_image hold
+    signed /multispectral/{job_id}/layers/{name} URLs valid for LAYER_URL_TTL_SECONDS.
+    """
     job = await AnalysisJobModel.find_by_id(job_id)
     if not job or str(job.user_id) != str(current_user.id):
         raise HTTPException(status_code=404, detail="Job not found")
-    return job.to_dict()
+    job_dict = job.to_dict()
+    if job.status == "completed" and job.result and job.result.get("results"):
+        job_dict["result"] = {**job.result, "results": _with_layer_urls(request, job_id, job.result["results"])}
+    return job_dict
+
+@router.get("/multispectral/{job_id}/layers/{name}")
+async def get_multispectral_layer(
+    job_id: str,
+    name: str,
+    request: Request,
+    expires: int = Query(..., description="Expiry of the signed URL (epoch seconds)"),
+    signature: str = Query(..., description="URL signature from the job status")
+):
+    """
+    Get one rendered map of a completed multispectral job (suitability_<crop> or soil_type).
+
+    Authorized by the signed URL from /multispectral/status/{job_id}. Layers are
+    content-addressed, so the ETag is the content digest and a matching
+    If-None-Match gets 304.
+    """
+    if not verify_layer_signature(job_id, name, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired layer URL")
+    job = await AnalysisJobModel.find_by_id(job_id)
+    ref = ((job.result or {}).get("results") or {}).get("layers", {}).get(name) if job else None
+    if ref is None:
+        raise HTTPException(status_code=404, detail="Layer not found")
+
+    etag = f'"{ref["digest"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400, immutable"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    try:
+        content = await asyncio.to_thread(layer_store.read, ref)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Layer has expired; re-run the analysis")
+    return Response(content=content, media_type=ref["media_type"], headers=headers)
+
+@router.post("/multispectral/cancel/{job_id}", response_model=Dict[str, Any])
+async def cancel_multispectral_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """Cancel a pending or processing multispectral job, terminating its worker process"""
+    job = await AnalysisJobModel.find_by_id(job_id)
+    if not job or str(job.user_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    was_pending = job.status == "pending"
+    if not await job.cancel():
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    if was_pending and job.work_dir:
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+    # A running job's worker notices at its next heartbeat or progress update
+    analysis_pool.cancel(job_id)
+    return {"job_id": job_id, "status": "cancelled"}
 
 @router.post("/multispectral", response_model=Dict[str, Any])
 async def analyze_multispectral(
@@ -338,27 +769,14 @@ async def analyze_multispectral(
                 status_code=400,
                 detail="At least one file must be uploaded (.txt, .zip, or band files)"
             )
-        # Check file sizes
-        total_size = 0
-        for f in files:
-            contents = await f.read()
-            total_size += len(contents)
-            f.file.seek(0)
-        if total_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Total upload too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-            )
         # Create temporary directory for processing
         with tempfile.TemporaryDirectory() as temp_dir:
+            # Each file is streamed to disk once, against the total size budget
+            file_paths = await _save_uploads(files, temp_dir, settings.MAX_FILE_SIZE)
             mtl_path = None
             # If a .zip is present, process as before
-            zip_file = next((f for f in files if f.filename.lower().endswith('.zip')), None)
-            if zip_file:
-                zip_path = os.path.join(temp_dir, zip_file.filename)
-                contents = await zip_file.read()
-                with open(zip_path, 'wb') as f:
-                    f.write(contents)
+            zip_path = next((path for path in file_paths if path.lower().endswith('.zip')), None)
+            if zip_path:
                 with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                     zip_ref.extractall(temp_dir)
                 # Find the .txt file (metadata)
@@ -372,27 +790,27 @@ async def analyze_multispectral(
                 if not mtl_path:
                     raise HTTPException(status_code=400, detail="No MTL .txt metadata file found in zip.")
             else:
-                # Save all files to temp_dir
-                for upload in files:
-                    file_path = os.path.join(temp_dir, upload.filename)
-                    contents = await upload.read()
-                    with open(file_path, 'wb') as f:
-                        f.write(contents)
-                    if upload.filename.lower().endswith('.txt') and '_mtl' in upload.filename.lower():
-                        mtl_path = file_path
+                mtl_path = next(
+                    (path for path in file_paths
+                     if path.lower().endswith('.txt') and '_mtl' in os.path.basename(path).lower()),
+                    None
+                )
                 if not mtl_path:
                     raise HTTPException(status_code=400, detail="No MTL .txt metadata file found among uploads.")
-            # Import multispectral analysis functions
+            # Analyze in a worker process so other requests keep being served
             try:
-                from app.services.multispectral_service import MultispectralAnalyzer
-                analyzer = MultispectralAnalyzer()
-                results = await analyzer.analyze_from_mtl(mtl_path)
+                results = await analysis_pool.run(mtl_path)
                 return {
                     "status": results.get("status", "success"),
                     "filename": mtl_path,
                     "analysis_type": "multispectral",
-                    "results": results
+                    "results": await _with_inline_layers(results)
                 }
+            except AnalysisPoolFullError as e:
+                raise _analysis_busy_response(e)
+            except AnalysisTimeoutError as e:
+                logger.error(f"Multispectral analysis timed out: {str(e)}")
+                raise HTTPException(status_code=504, detail="Analysis timed out")
             except ImportError:
                 raise HTTPException(
                     status_code=501,
@@ -1 +1,11 @@
-from .prediction_service import PredictionService, prediction_service
\ No newline at end of file
+import importlib
+
+def __getattr__(name):
+    # Loaded on first use: importing any app.services module (e.g. in an analysis
+    # worker process) must not load the ONNX classifier
+    if name in ("PredictionService", "prediction_service"):
+        value = getattr(importlib.import_module(f"{__name__}.prediction_service"), name)
+        # As the eager import did, the instance replaces the submodule attribute
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
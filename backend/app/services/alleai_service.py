@@ -2,8 +2,15 @@ import os
 import logging
 import aiohttp
 import json
-from typing import Dict, Any, Optional, List
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+import numpy as np
 from app.config import settings
+from app.models.database import RecommendationModel
+from app.services.cache import LayeredCache, approximate_size
+from app.services.http_client import http_client
 import asyncio
 import re
 
@@ -11,6 +18,106 @@ logger = logging.getLogger(__name__)
 
 OPENROUTER_API_KEY = "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"
 
+class ResponseStreamCleaner:
+    """
+    Apply AlleAIService._clean_response to a reply that arrives in pieces.
+
+    _clean_response works on the whole text, so each feed re-cleans the
+    settled part of the reply and returns only what that adds to the text
+    already returned. The settled part ends at the last whitespace received
+    and before anything later pieces could still change:
+
+    - an unclosed ``{`` or ``[`` (the span may yet be removed)
+    - an unclosed ``"`` or a trailing ``"key":`` (may yet be a JSON pair)
+
+    Both are looked for after the removals before them, as _clean_response
+    does them in turn: ``a [b {c] d}`` leaves an unclosed ``[``.
+
+    A reply that starts with ``{`` may be a JSON object that is reformatted
+    as a whole, so it is held back until finish.
+    """
+
+    # The JSON-like artifacts _clean_response removes, in its order, each with
+    # a pattern for the start of one that has not been closed yet
+    _ARTIFACTS = (
+        (re.compile(r'\{[^}]*\}'), re.compile(r'\{[^}]*\Z')),
+        (re.compile(r'\[[^\]]*\]'), re.compile(r'\[[^\]]*\Z')),
+        (re.compile(r'"[^"]*":\s*"[^"]*"'), re.compile(r'"[^"]*(?:"(?::\s*(?:"[^"]*)?)?)?\Z')),
+    )
+
+    def __init__(self):
+        self._raw = ""
+        self._settled = 0
+        self._sent = ""
+
+    def feed(self, delta: str) -> str:
+        """
+        Add a piece of the raw reply.
+
+        Args:
+            delta (str): Text received from the model
+
+        Returns:
+            str: Cleaned text that can be shown now (may be empty)
+        """
+        self._raw += delta
+        settled = self._settled_length()
+        if settled <= self._settled:
+            return ""
+        self._settled = settled
+        return self._emit(AlleAIService._clean_response(self._raw[:settled]))
+
+    def finish(self) -> str:
+        """Clean the complete reply and return the text not returned yet"""
+        cleaned = AlleAIService._clean_response(self._raw)
+        if not cleaned.startswith(self._sent):
+            logger.warning("Streamed reply diverged from the cleaned full reply")
+        return self._emit(cleaned)
+
+    def _settled_length(self) -> int:
+        raw = self._raw
+        head = raw.lstrip().replace('```json', '').replace('```', '').lstrip()
+        if not head or head.startswith('{'):
+            return 0
+        cut = len(raw) - 1
+        while cut > 0 and not raw[cut].isspace():
+            cut -= 1
+        if cut <= 0:
+            return 0
+        # Apply _clean_response's removals in order and stop before the first
+        # match that later text could still complete
+        text, removed, unfinished = raw[:cut], [], None
+        for pattern, partial in self._ARTIFACTS:
+            spans = [match.span() for match in pattern.finditer(text)]
+            tail = partial.search(text, spans[-1][1] if spans else 0)
+            if tail:
+                unfinished = (len(removed), tail.start())
+                text = text[:tail.start()]
+            removed.append(spans)
+            text = pattern.sub('', text)
+        if unfinished is None:
+            return cut
+        # Map the position back through the removals that came before it
+        stage, position = unfinished
+        for spans in reversed(removed[:stage]):
+            for start, end in spans:
+                if start > position:
+                    break
+                position += end - start
+        return position
+
+    def _emit(self, cleaned: str) -> str:
+        if not cleaned.startswith(self._sent):
+            # Text already sent can't be taken back; still send what follows it
+            common = 0
+            while common < min(len(cleaned), len(self._sent)) and cleaned[common] == self._sent[common]:
+                common += 1
+            self._sent = cleaned
+            return cleaned[common:]
+        delta = cleaned[len(self._sent):]
+        self._sent = cleaned
+        return delta
+
 class AlleAIService:
     """Enhanced service for handling AlleAI LLM interactions with agricultural expertise"""
 
@@ -27,8 +134,26 @@ class AlleAIService:
         self.api_url = "https://api.alle-ai.com/api/v1/chat/completions"
         self.default_models = ["gpt-4o", "yi-large"]
         
-        # Simple in-memory cache for recommendations
-        self._recommendations_cache = {}
+        # Recommendations depend on the disease, crop and confidence band, not on the exact confidence
+        self._recommendations_cache = LayeredCache(
+            "recommendations",
+            max_entries=settings.RECOMMENDATIONS_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RECOMMENDATIONS_CACHE_TTL_SECONDS,
+            shared=settings.RECOMMENDATIONS_CACHE_SHARED,
+            size_of=approximate_size
+        )
+        
+        # Chat calls are plain coroutines on the shared HTTP session; this semaphore is their only limit
+        self._chat_slots: Optional[asyncio.Semaphore] = None
+        self._chats_in_flight = 0
+        self._chats_waiting = 0
+        self._chats_completed = 0
+        self._chats_cancelled = 0
+        self._chats_failed = 0
+        self._chats_streamed = 0
+        # Time until the user sees the first text: first streamed chunk, or the whole reply when not streaming
+        self._recent_ttft = deque(maxlen=1000)
+        self._recent_response_times = deque(maxlen=1000)
         
         logger.info(f"Initializing AlleAI service with API key: {self.api_key[:20] if self.api_key else 'None'}...")
         
@@ -45,16 +170,62 @@ class AlleAIService:
         logger.warning("OpenRouter API key not configured for chat.")
         return False
     
-    def clear_cache(self):
-        """Clear the recommendations cache"""
-        self._recommendations_cache.clear()
-        logger.info("Recommendations cache cleared")
+    async def clear_cache(self):
+        """
+        Clear the recommendations cache in every layer, including the
+        recommendations persisted by the warm-up job, so nothing cleared is
+        loaded back and served again.
+        """
+        await self._recommendations_cache.clear()
+        deleted = await RecommendationModel.delete_all()
+        logger.info(f"Recommendations cache cleared ({deleted} persisted recommendations deleted)")
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+        """Get recommendations cache statistics (size, hit ratio, evictions, memory)"""
+        stats = self._recommendations_cache.get_stats()
+        stats["cache_size"] = stats["size"]
+        stats["confidence_bucket"] = settings.RECOMMENDATIONS_CONFIDENCE_BUCKET
+        return stats
+    
+    @staticmethod
+    def recommendations_cache_key(disease_name: str, confidence: float, crop_type: str) -> str:
+        """
+        Cache key for disease recommendations.
+
+        The raw confidence differs on almost every prediction, so it is
+        reduced to its RECOMMENDATIONS_CONFIDENCE_BUCKET band (or left out
+        when the bucket is 0).
+
+        Args:
+            disease_name (str): Predicted disease class
+            confidence (float): Prediction confidence, 0-1
+            crop_type (str): Crop the disease affects
+
+        Returns:
+            str: The cache key
+        """
+        bucket = settings.RECOMMENDATIONS_CONFIDENCE_BUCKET
+        if bucket <= 0:
+            return f"{disease_name}|{crop_type}"
+        band = int(min(max(confidence, 0.0), 1.0 - 1e-9) // bucket)
+        return f"{disease_name}|{crop_type}|{band}"
+    
+    def get_chat_stats(self) -> Dict[str, Any]:
+        """Get chat concurrency counters and latency metrics"""
+        ttft = np.array(self._recent_ttft) * 1000 if self._recent_ttft else None
+        response_times = np.array(self._recent_response_times) * 1000 if self._recent_response_times else None
         return {
-            "cache_size": len(self._recommendations_cache),
-            "cached_keys": list(self._recommendations_cache.keys())
+            "max_concurrency": settings.CHAT_MAX_CONCURRENCY,
+            "in_flight": self._chats_in_flight,
+            "waiting": self._chats_waiting,
+            "completed": self._chats_completed,
+            "streamed": self._chats_streamed,
+            "cancelled": self._chats_cancelled,
+            "failed": self._chats_failed,
+            "ttft_ms_p50": float(np.percentile(ttft, 50)) if ttft is not None else 0.0,
+            "ttft_ms_p95": float(np.percentile(ttft, 95)) if ttft is not None else 0.0,
+            "response_ms_p50": float(np.percentile(response_times, 50)) if response_times is not None else 0.0,
+            "response_ms_p95": float(np.percentile(response_times, 95)) if response_times is not None else 0.0
         }
     
     def get_available_models(self) -> List[str]:
@@ -177,8 +348,13 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
         else:
             return "I'm here to help with your agricultural questions! I can assist with plant diseases, soil health, pest management, irrigation, and general farming practices.\n\nWhat specific agricultural challenge are you facing today? I'd be happy to provide some practical advice based on your situation. You can ask me about:\n\n• Disease identification and treatment\n• Soil health and fertilization\n• Pest management strategies\n• Watering and irrigation\n• Organic farming methods\n• Crop management tips"
     
-    async def _make_alleai_request(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1000, models: Optional[List[str]] = None) -> str:
-        """Make a request to AlleAI API with enhanced error handling"""
+    async def _make_alleai_request(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1000, models: Optional[List[str]] = None, clean: bool = True) -> str:
+        """
+        Make a request to AlleAI API with enhanced error handling.
+
+        Replies are passed through _clean_response unless ``clean`` is False,
+        which callers that parse the raw reply (e.g. JSON recommendations) need.
+        """
         if not self.api_key:
             logger.error("AlleAI API key not configured")
             raise Exception("AlleAI API key not configured")
@@ -187,140 +363,139 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
         logger.info(f"Making AlleAI request with {len(messages)} messages, models={models}, temperature={temperature}, max_tokens={max_tokens}")
         
         try:
-            async with aiohttp.ClientSession() as session:
-                logger.info("Created aiohttp session")
+            session = await http_client.get_session()
+            
+            # Convert messages to AlleAI format - FIXED for AlleAI
+            alleai_messages = []
+            
+            # Combine system and user messages properly
+            system_content = ""
+            user_content = ""
+            
+            for msg in messages:
+                if msg["role"] == "system":
+                    system_content += msg["content"] + "\n\n"
+                elif msg["role"] == "user":
+                    user_content += msg["content"] + "\n"
+                elif msg["role"] == "assistant":
+                    # For assistant messages, we'll include them as context
+                    user_content += f"Previous response: {msg['content']}\n"
+            
+            # Create the final user message with system context
+            final_user_content = system_content + user_content
+
+            alleai_messages.append({
+                "user": [
+                    {
+                        "type": "text",
+                        "text": final_user_content.strip()
+                    }
+                ]
+            })
+            
+            # Use the AlleAI-specific format
+            payload = {
+                "models": models,
+                "messages": alleai_messages,
+                "web_search": False,
+                "combination": False,
+                "summary": False,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "top_p": 1,
+                "frequency_penalty": 0.2,
+                "presence_penalty": 0.3,
+                "stream": False
+            }
+            
+            logger.info(f"Sending request to AlleAI API with payload: {json.dumps(payload, indent=2)}")
+            logger.info(f"API Key (first 10 chars): {self.api_key[:10] if self.api_key else 'None'}...")
+            logger.info(f"API URL: {self.api_url}")
+            
+            async with session.post(
+                url=self.api_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)  # Add timeout
+            ) as response:
                 
-                # Convert messages to AlleAI format - FIXED for AlleAI
-                alleai_messages = []
+                logger.info(f"AlleAI API response status: {response.status}")
                 
-                # Combine system and user messages properly
-                system_content = ""
-                user_content = ""
+                if response.status == 402:
+                    logger.warning("AlleAI API returned 402 - Payment required. Using fallback response.")
+                    # Get the last user message for fallback
+                    user_message = ""
+                    for msg in reversed(messages):
+                        if msg["role"] == "user":
+                            user_message = msg["content"]
+                            break
+                    return self._get_fallback_response(user_message)
                 
-                for msg in messages:
-                    if msg["role"] == "system":
-                        system_content += msg["content"] + "\n\n"
-                    elif msg["role"] == "user":
-                        user_content += msg["content"] + "\n"
-                    elif msg["role"] == "assistant":
-                        # For assistant messages, we'll include them as context
-                        user_content += f"Previous response: {msg['content']}\n"
+                if not response.ok:
+                    error_text = await response.text()
+                    logger.error(f"AlleAI API error: {response.status} - {error_text}")
+                    logger.error(f"Request headers: {dict(response.request_info.headers)}")
+                    logger.error(f"API Key used: {self.api_key[:10] if self.api_key else 'None'}...")
+                    
+                    # Try to get more specific error information
+                    try:
+                        error_data = json.loads(error_text)
+                        error_message = error_data.get('error', {}).get('message', error_text)
+                        logger.error(f"Parsed error message: {error_message}")
+                    except:
+                        error_message = error_text
+                    
+                    raise Exception(f"AlleAI API error: {response.status} - {error_message}")
                 
-                # Create the final user message with system context
-                final_user_content = system_content + user_content
-
-                alleai_messages.append({
-                    "user": [
-                        {
-                            "type": "text",
-                            "text": final_user_content.strip()
-                        }
-                    ]
-                })
+                response_data = await response.json()
+                logger.info(f"AlleAI API response data: {json.dumps(response_data, indent=2)}")
                 
-                # Use the AlleAI-specific format
-                payload = {
-                    "models": models,
-                    "messages": alleai_messages,
-                    "web_search": False,
-                    "combination": False,
-                    "summary": False,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                    "top_p": 1,
-                    "frequency_penalty": 0.2,
-                    "presence_penalty": 0.3,
-                    "stream": False
-                }
+                # Handle AlleAI response format - FIXED extraction
+                content = None
                 
-                logger.info(f"Sending request to AlleAI API with payload: {json.dumps(payload, indent=2)}")
-                logger.info(f"API Key (first 10 chars): {self.api_key[:10] if self.api_key else 'None'}...")
-                logger.info(f"API URL: {self.api_url}")
+                # AlleAI typically returns in this format:
+                # {"responses": {"responses": {"model_name": "response_text"}}}
+                if isinstance(response_data, dict):
+                    if "responses" in response_data:
+                        responses_obj = response_data["responses"]
+                        if isinstance(responses_obj, dict) and "responses" in responses_obj:
+                            model_responses = responses_obj["responses"]
+                            if isinstance(model_responses, dict):
+                                # Get the first model's response
+                                for model_name, response_text in model_responses.items():
+                                    if isinstance(response_text, str) and response_text.strip():
+                                        content = response_text
+                                        break
+                
+                # Fallback to other possible formats
+                if not content:
+                    if response_data.get("choices") and response_data["choices"]:
+                        # Standard OpenAI-like format
+                        content = response_data["choices"][0]["message"]["content"]
+                    elif response_data.get("message"):
+                        # Direct message format
+                        content = response_data["message"]
+                    elif response_data.get("content"):
+                        # Direct content format
+                        content = response_data["content"]
+                    elif response_data.get("response"):
+                        # Alternative response format
+                        content = response_data["response"]
+                    elif response_data.get("text"):
+                        # AlleAI specific format
+                        content = response_data["text"]
+                
+                if not content:
+                    logger.error("No response content found in AlleAI API response")
+                    logger.error(f"Response structure: {json.dumps(response_data, indent=2)}")
+                    raise Exception("No response content from AlleAI API")
+                
+                logger.info(f"Successfully received response from AlleAI API, content length: {len(content)}")
+                return self._clean_response(content) if clean else content
                 
-                async with session.post(
-                    url=self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)  # Add timeout
-                ) as response:
-                    
-                    logger.info(f"AlleAI API response status: {response.status}")
-                    
-                    if response.status == 402:
-                        logger.warning("AlleAI API returned 402 - Payment required. Using fallback response.")
-                        # Get the last user message for fallback
-                        user_message = ""
-                        for msg in reversed(messages):
-                            if msg["role"] == "user":
-                                user_message = msg["content"]
-                                break
-                        return self._get_fallback_response(user_message)
-                    
-                    if not response.ok:
-                        error_text = await response.text()
-                        logger.error(f"AlleAI API error: {response.status} - {error_text}")
-                        logger.error(f"Request headers: {dict(response.request_info.headers)}")
-                        logger.error(f"API Key used: {self.api_key[:10] if self.api_key else 'None'}...")
-                        
-                        # Try to get more specific error information
-                        try:
-                            error_data = json.loads(error_text)
-                            error_message = error_data.get('error', {}).get('message', error_text)
-                            logger.error(f"Parsed error message: {error_message}")
-                        except:
-                            error_message = error_text
-                        
-                        raise Exception(f"AlleAI API error: {response.status} - {error_message}")
-                    
-                    response_data = await response.json()
-                    logger.info(f"AlleAI API response data: {json.dumps(response_data, indent=2)}")
-                    
-                    # Handle AlleAI response format - FIXED extraction
-                    content = None
-                    
-                    # AlleAI typically returns in this format:
-                    # {"responses": {"responses": {"model_name": "response_text"}}}
-                    if isinstance(response_data, dict):
-                        if "responses" in response_data:
-                            responses_obj = response_data["responses"]
-                            if isinstance(responses_obj, dict) and "responses" in responses_obj:
-                                model_responses = responses_obj["responses"]
-                                if isinstance(model_responses, dict):
-                                    # Get the first model's response
-                                    for model_name, response_text in model_responses.items():
-                                        if isinstance(response_text, str) and response_text.strip():
-                                            content = response_text
-                                            break
-                    
-                    # Fallback to other possible formats
-                    if not content:
-                        if response_data.get("choices") and response_data["choices"]:
-                            # Standard OpenAI-like format
-                            content = response_data["choices"][0]["message"]["content"]
-                        elif response_data.get("message"):
-                            # Direct message format
-                            content = response_data["message"]
-                        elif response_data.get("content"):
-                            # Direct content format
-                            content = response_data["content"]
-                        elif response_data.get("response"):
-                            # Alternative response format
-                            content = response_data["response"]
-                        elif response_data.get("text"):
-                            # AlleAI specific format
-                            content = response_data["text"]
-                    
-                    if not content:
-                        logger.error("No response content found in AlleAI API response")
-                        logger.error(f"Response structure: {json.dumps(response_data, indent=2)}")
-                        raise Exception("No response content from AlleAI API")
-                    
-                    logger.info(f"Successfully received response from AlleAI API, content length: {len(content)}")
-                    return self._clean_response(content)
-                    
         except aiohttp.ClientError as e:
             logger.error(f"Network error calling AlleAI API: {str(e)}")
             # Use fallback for network errors
@@ -386,7 +561,14 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
         return text
 
     async def get_disease_recommendations(self, disease_name: str, confidence: float, crop_type: str, models: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Get comprehensive treatment, prevention, and immediate action recommendations for a disease"""
+        """
+        Get comprehensive treatment, prevention, and immediate action recommendations for a disease.
+
+        Answered from the recommendations cache, then from the recommendations
+        persisted by the warm-up job (RecommendationModel), and only then by
+        the LLM, so predictions for known classes do not wait on the LLM once
+        the warm-up has run.
+        """
         
         logger.info(f"Getting disease recommendations for {disease_name} ({confidence:.1%} confidence) on {crop_type}")
         
@@ -395,14 +577,52 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
             fallback_recommendations = self._get_structured_fallback_recommendations(disease_name, confidence, crop_type)
             return fallback_recommendations
         
-        # Create cache key
-        cache_key = f"{disease_name}_{confidence}_{crop_type}"
+        cache_key = self.recommendations_cache_key(disease_name, confidence, crop_type)
         
         # Check cache first
-        if cache_key in self._recommendations_cache:
+        cached = await self._recommendations_cache.get(cache_key)
+        if cached is not None:
             logger.info(f"Using cached recommendations for {disease_name}")
-            return self._recommendations_cache[cache_key]
+            return cached
         
+        # Stale persisted recommendations are served while the warm-up job refreshes them
+        persisted = await RecommendationModel.find_by_key(cache_key)
+        if persisted is not None:
+            logger.info(f"Using persisted recommendations for {disease_name}")
+            await self._recommendations_cache.set(cache_key, persisted.value)
+            return persisted.value
+        
+        recommendations, is_fallback = await self.generate_disease_recommendations(disease_name, confidence, crop_type, models)
+        if is_fallback:
+            # Cache the fallback briefly so a transient LLM failure is retried soon
+            await self._recommendations_cache.set(
+                cache_key, recommendations, ttl_seconds=settings.RECOMMENDATIONS_CACHE_FALLBACK_TTL_SECONDS
+            )
+        else:
+            await self._recommendations_cache.set(cache_key, recommendations)
+            logger.info(f"Cached recommendations for {disease_name}")
+        return recommendations
+
+    async def store_disease_recommendations(self, disease_name: str, confidence: float, crop_type: str, recommendations: Dict[str, Any]) -> None:
+        """Put freshly generated recommendations in the cache (used by the warm-up job)"""
+        await self._recommendations_cache.set(
+            self.recommendations_cache_key(disease_name, confidence, crop_type), recommendations
+        )
+
+    async def generate_disease_recommendations(self, disease_name: str, confidence: float, crop_type: str, models: Optional[List[str]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Ask the LLM for disease recommendations, bypassing every cache.
+
+        Args:
+            disease_name (str): Predicted disease class
+            confidence (float): Prediction confidence, 0-1
+            crop_type (str): Crop the disease affects
+            models (Optional[List[str]]): AlleAI models to ask
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: The recommendations, and whether they are
+            the canned fallback because the LLM failed or answered unusably
+        """
         try:
             # Use the specialized disease analysis prompt
             prompt = self._get_disease_analysis_prompt(disease_name, confidence, crop_type)
@@ -419,7 +639,8 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
                 messages=messages, 
                 temperature=0.3, 
                 max_tokens=1200,
-                models=models
+                models=models,
+                clean=False  # _clean_response would turn the JSON answer into markdown
             )
             
             logger.info(f"Received response from AlleAI for {disease_name}")
@@ -442,11 +663,7 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
                         if field in fallback:
                             recommendations[field] = fallback[field]
                 
-                # Cache the recommendations
-                self._recommendations_cache[cache_key] = recommendations
-                logger.info(f"Cached recommendations for {disease_name}")
-                
-                return recommendations
+                return recommendations, False
                 
             except json.JSONDecodeError as json_error:
                 logger.error(f"Failed to parse JSON response from LLM: {str(json_error)}")
@@ -466,28 +683,18 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
                             if field not in recommendations:
                                 recommendations[field] = fallback[field]
                         
-                        # Cache the recommendations
-                        self._recommendations_cache[cache_key] = recommendations
-                        
-                        return recommendations
+                        return recommendations, False
                     except Exception as e2:
                         logger.error(f"Failed to parse extracted JSON: {str(e2)}")
                 
                 # If all JSON parsing fails, use fallback
                 logger.warning(f"Using fallback recommendations for {disease_name} due to JSON parsing failure")
-                fallback_recommendations = self._get_structured_fallback_recommendations(disease_name, confidence, crop_type)
-                self._recommendations_cache[cache_key] = fallback_recommendations
-                return fallback_recommendations
+                return self._get_structured_fallback_recommendations(disease_name, confidence, crop_type), True
                 
         except Exception as e:
             logger.error(f"Error getting LLM recommendations for {disease_name}: {str(e)}")
             logger.warning(f"Using fallback recommendations for {disease_name} due to LLM failure")
-            fallback_recommendations = self._get_structured_fallback_recommendations(disease_name, confidence, crop_type)
-            
-            # Cache the fallback recommendations
-            self._recommendations_cache[cache_key] = fallback_recommendations
-            
-            return fallback_recommendations
+            return self._get_structured_fallback_recommendations(disease_name, confidence, crop_type), True
 
     def _get_structured_fallback_recommendations(self, disease_name: str, confidence: float, crop_type: str) -> Dict[str, Any]:
         """Get structured fallback recommendations when LLM is unavailable"""
@@ -539,50 +746,171 @@ Please provide a comprehensive analysis for {disease_name} affecting {crop_type}
                 "professional_help": "Consult agricultural extension if symptoms worsen or spread rapidly"
             }
 
-    async def chat_with_ai(self, user_message: str, conversation_history: Optional[List[dict]] = None, models: Optional[list] = None) -> str:
-        """Chat method using OpenRouter's OpenAI-compatible API for chat completions only, with extra_headers for referer and title."""
-        import asyncio
-        from openai import OpenAI
-
-        # Use OpenRouter API key and endpoint
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
-
-        # Build messages array: system prompt, conversation history, user message
-        messages = []
-        messages.append({
+    def _build_chat_messages(self, user_message: str, conversation_history: Optional[List[dict]] = None) -> List[Dict[str, str]]:
+        """Build the messages array: system prompt, conversation history, user message"""
+        messages = [{
             "role": "system",
             "content": self._get_agricultural_system_prompt()
-        })
+        }]
         if conversation_history:
             messages.extend(conversation_history)
         messages.append({
             "role": "user",
             "content": user_message
         })
+        return messages
 
+    @asynccontextmanager
+    async def _chat_slot(self):
+        """Hold one of the CHAT_MAX_CONCURRENCY upstream chat slots"""
+        if self._chat_slots is None:
+            self._chat_slots = asyncio.Semaphore(settings.CHAT_MAX_CONCURRENCY)
+        self._chats_waiting += 1
         try:
-            # OpenRouter expects synchronous calls, so run in thread pool
-            loop = asyncio.get_event_loop()
-            completion = await loop.run_in_executor(
-                None,
-                lambda: client.chat.completions.create(
-                    extra_headers={
-                        "HTTP-Referer": "https://phamiq.ai/",
-                        "X-Title": "Phamiq AI"
-                    },
-                    model="openai/gpt-4o",
-                    messages=messages,
-                )
-            )
-            # Extract the assistant's response
-            content = completion.choices[0].message.content
-            return content
-        except Exception as e:
-            logger.error(f"Error in OpenRouter chat_with_ai: {str(e)}")
-            return self._get_fallback_response(user_message)
+            await self._chat_slots.acquire()
+        finally:
+            self._chats_waiting -= 1
+        self._chats_in_flight += 1
+        try:
+            yield
+        finally:
+            self._chats_in_flight -= 1
+            self._chat_slots.release()
+
+    async def chat_with_ai(self, user_message: str, conversation_history: Optional[List[dict]] = None, models: Optional[list] = None) -> str:
+        """
+        Chat using OpenRouter's OpenAI-compatible chat completions API.
+
+        The call is a coroutine on the shared HTTP session, so waiting on the
+        LLM holds no thread; at most CHAT_MAX_CONCURRENCY calls run at once and
+        the rest wait for a slot. Cancelling the awaiting task (e.g. when the
+        HTTP client disconnects) aborts the upstream request.
+        """
+        messages = self._build_chat_messages(user_message, conversation_history)
+        started = time.perf_counter()
+        async with self._chat_slot():
+            try:
+                content = await self._openrouter_chat(messages)
+                self._chats_completed += 1
+                elapsed = time.perf_counter() - started
+                # Nothing is shown before the whole reply, so that is also the time to first text
+                self._recent_ttft.append(elapsed)
+                self._recent_response_times.append(elapsed)
+                return content
+            except asyncio.CancelledError:
+                self._chats_cancelled += 1
+                logger.info("OpenRouter chat cancelled")
+                raise
+            except Exception as e:
+                self._chats_failed += 1
+                logger.error(f"Error in OpenRouter chat_with_ai: {str(e)}")
+                return self._get_fallback_response(user_message)
+
+    async def stream_chat_with_ai(self, user_message: str, conversation_history: Optional[List[dict]] = None, models: Optional[list] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat reply as the model produces it.
+
+        Same request and concurrency limit as chat_with_ai, but the reply is
+        cleaned incrementally (ResponseStreamCleaner) and yielded word by word,
+        so the user sees text after the first tokens instead of after the
+        whole completion. The time to the first yielded text is recorded as
+        the chat's TTFT.
+
+        Args:
+            user_message (str): The user's message
+            conversation_history (Optional[List[dict]]): Earlier messages with role and content
+            models (Optional[list]): Accepted for parity with chat_with_ai
+
+        Yields:
+            str: The next piece of the cleaned reply. If the upstream call fails
+            before any text was sent, the fallback response is yielded instead.
+
+        Raises:
+            Exception: If the upstream call fails after part of the reply was sent
+        """
+        messages = self._build_chat_messages(user_message, conversation_history)
+        cleaner = ResponseStreamCleaner()
+        started = time.perf_counter()
+        sent_text = False
+        async with self._chat_slot():
+            try:
+                async for delta in self._openrouter_stream(messages):
+                    text = cleaner.feed(delta)
+                    if text:
+                        if not sent_text:
+                            self._recent_ttft.append(time.perf_counter() - started)
+                            sent_text = True
+                        yield text
+                text = cleaner.finish()
+                if text:
+                    if not sent_text:
+                        self._recent_ttft.append(time.perf_counter() - started)
+                    yield text
+                self._chats_completed += 1
+                self._chats_streamed += 1
+                self._recent_response_times.append(time.perf_counter() - started)
+            except (asyncio.CancelledError, GeneratorExit):
+                self._chats_cancelled += 1
+                logger.info("OpenRouter chat stream cancelled")
+                raise
+            except Exception as e:
+                self._chats_failed += 1
+                logger.error(f"Error in OpenRouter stream_chat_with_ai: {str(e)}")
+                if sent_text:
+                    raise
+                yield self._get_fallback_response(user_message)
+
+    def _openrouter_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://phamiq.ai/",
+            "X-Title": "Phamiq AI"
+        }
+
+    async def _openrouter_chat(self, messages: List[Dict[str, str]]) -> str:
+        """Send one chat completion request to OpenRouter and return the assistant's reply"""
+        session = await http_client.get_session()
+        async with session.post(
+            url=settings.OPENROUTER_API_URL,
+            headers=self._openrouter_headers(),
+            json={"model": settings.OPENROUTER_CHAT_MODEL, "messages": messages},
+            timeout=aiohttp.ClientTimeout(total=settings.CHAT_TIMEOUT_SECONDS)
+        ) as response:
+            if not response.ok:
+                error_text = await response.text()
+                raise Exception(f"OpenRouter API error: {response.status} - {error_text[:500]}")
+            completion = await response.json()
+        # Extract the assistant's response
+        return completion["choices"][0]["message"]["content"]
+
+    async def _openrouter_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Send a streaming chat completion request to OpenRouter and yield the content deltas"""
+        session = await http_client.get_session()
+        async with session.post(
+            url=settings.OPENROUTER_API_URL,
+            headers=self._openrouter_headers(),
+            json={"model": settings.OPENROUTER_CHAT_MODEL, "messages": messages, "stream": True},
+            timeout=aiohttp.ClientTimeout(total=settings.CHAT_TIMEOUT_SECONDS)
+        ) as response:
+            if not response.ok:
+                error_text = await response.text()
+                raise Exception(f"OpenRouter API error: {response.status} - {error_text[:500]}")
+            async for line in response.content:
+                line = line.strip()
+                # Skips blank event separators and ": OPENROUTER PROCESSING" keep-alive comments
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:"):].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise Exception(f"OpenRouter stream error: {chunk['error']}")
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
 
     async def generate_image(self, prompt: str, models: Optional[List[str]] = None) -> str:
         """Generate image using AlleAI image generation endpoint"""
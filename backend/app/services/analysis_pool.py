@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.services.scene_cache import SceneResultCache, scene_cache
+
+logger = logging.getLogger(__name__)
+
+class AnalysisPoolFullError(Exception):
+    """Raised when too many analyses are already running or waiting"""
+
+    def __init__(self, retry_after: int = settings.ANALYSIS_RETRY_AFTER_SECONDS):
+        super().__init__("Analysis queue is full, please retry later")
+        self.retry_after = retry_after
+
+class AnalysisTimeoutError(Exception):
+    """Raised when an analysis runs longer than its timeout"""
+
+class AnalysisCancelledError(Exception):
+    """Raised when an analysis is cancelled before it finishes"""
+
+class AnalysisFailedError(Exception):
+    """
+    Raised when an analysis fails or its worker process dies.
+
+    ``retryable`` is True when the process died without reporting (e.g. it
+    was killed for running out of memory), False when the analysis itself
+    raised and would fail the same way again.
+    """
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+def _run_analysis(mtl_path: str, messages) -> None:
+    """
+    Worker process entry point.
+
+    Posts ("progress", fraction) messages while the scene is processed, then a
+    single ("result", results) or ("error", message) message.
+    """
+    try:
+        # Imported here so an import failure is reported like any other error
+        from app.services.multispectral_service import MultispectralAnalyzer
+
+        results = MultispectralAnalyzer().analyze(
+            mtl_path,
+            progress=lambda fraction: messages.put(("progress", fraction))
+        )
+        messages.put(("result", results))
+    except Exception as e:
+        messages.put(("error", f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+
+class _AnalysisHandle:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.process = None
+        self.cancelled = False
+
+class AnalysisWorkerPool:
+    """
+    Runs multispectral analyses in separate worker processes.
+
+    Each analysis gets its own spawned process, so NumPy, rasterio and
+    rendering work never holds the API process's GIL or event loop, and a
+    runaway or cancelled analysis can be stopped by terminating its process
+    (threads cannot be killed). Spawning costs about 0.4s, mostly NumPy and
+    rasterio imports (the classifier is not loaded), which is negligible
+    next to a scene analysis.
+
+    - At most ``max_workers`` processes run at once; up to ``max_queued``
+      more analyses wait for a slot, beyond that run raises
+      AnalysisPoolFullError
+    - An analysis still running after ``timeout_seconds`` is terminated
+    - cancel(job_id) terminates a running analysis or drops a waiting one
+    - Progress fractions from process_scene are forwarded to a callback
+    - With a SceneResultCache, scenes analyzed before (same product, band
+      contents and crop parameters) are answered from the cache without
+      starting a process
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.ANALYSIS_MAX_WORKERS,
+        max_queued: int = settings.ANALYSIS_MAX_QUEUED,
+        timeout_seconds: float = settings.ANALYSIS_TIMEOUT_SECONDS,
+        poll_interval: float = 0.2,
+        cache: Optional[SceneResultCache] = None
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers (int): Analyses running concurrently
+            max_queued (int): Analyses allowed to wait for a free worker
+            timeout_seconds (float): Default per-analysis timeout
+            poll_interval (float): Seconds between checks of a running worker
+            cache (Optional[SceneResultCache]): Result cache consulted before running
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self.timeout_seconds = timeout_seconds
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self._context = multiprocessing.get_context("spawn")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._handles: Dict[str, _AnalysisHandle] = {}
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+    async def run(
+        self,
+        mtl_path: str,
+        job_id: Optional[str] = None,
+        progress: Optional[Callable[[float], Awaitable[None]]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze a scene in a worker process and return its results.
+
+        Args:
+            mtl_path (str): MTL metadata file next to the band files
+            job_id (Optional[str]): Identifier for cancel (generated if omitted)
+            progress (Optional[Callable[[float], Awaitable[None]]]): Awaited with
+                the completed fraction, at most once per percent
+            timeout (Optional[float]): Seconds before the worker is terminated
+                (defaults to timeout_seconds; queueing time is not counted)
+
+        Returns:
+            Dict[str, Any]: MultispectralAnalyzer.analyze results
+
+        Raises:
+            AnalysisPoolFullError: If the pool is at capacity
+            AnalysisTimeoutError: If the analysis exceeded its timeout
+            AnalysisCancelledError: If cancel was called for job_id
+            AnalysisFailedError: If the analysis raised or its process died
+        """
+        cache_key = await self._cache_key(mtl_path)
+        if cache_key is not None:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"Scene result cache hit for {cache_key}")
+                if progress:
+                    await progress(1.0)
+                return cached
+
+        if not self.has_capacity():
+            self._rejected += 1
+            raise AnalysisPoolFullError()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        handle = _AnalysisHandle(job_id or uuid.uuid4().hex)
+        self._handles[handle.job_id] = handle
+        try:
+            async with self._slots:
+                if handle.cancelled:
+                    raise AnalysisCancelledError(f"Analysis {handle.job_id} was cancelled")
+                self._running += 1
+                try:
+                    results = await self._run_process(handle, mtl_path, progress, timeout or self.timeout_seconds)
+                finally:
+                    self._running -= 1
+        except AnalysisCancelledError:
+            self._cancelled += 1
+            raise
+        except AnalysisTimeoutError:
+            self._timed_out += 1
+            raise
+        except AnalysisFailedError:
+            self._failed += 1
+            raise
+        finally:
+            self._handles.pop(handle.job_id, None)
+
+        if cache_key is not None and results.get("status", "success") != "limited":
+            try:
+                await asyncio.to_thread(self.cache.set, cache_key, results)
+            except Exception as e:
+                logger.warning(f"Failed to cache scene result: {str(e)}")
+        return results
+
+    async def _cache_key(self, mtl_path: str) -> Optional[str]:
+        """Hash the scene's files off the event loop; None when caching does not apply"""
+        if self.cache is None or not self.cache.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self.cache.key_for, mtl_path)
+        except Exception as e:
+            logger.warning(f"Could not build scene cache key for {mtl_path}: {str(e)}")
+            return None
+
+    async def _run_process(self, handle, mtl_path, progress, timeout) -> Dict[str, Any]:
+        messages = self._context.Queue()
+        process = self._context.Process(
+            target=_run_analysis,
+            args=(mtl_path, messages),
+            name=f"analysis-{handle.job_id}",
+            daemon=True
+        )
+        handle.process = process
+        process.start()
+        logger.info(f"Started analysis {handle.job_id} in process {process.pid}")
+
+        deadline = time.monotonic() + timeout
+        reported = -1.0
+        try:
+            while True:
+                # Drain everything the worker has posted so far
+                while True:
+                    try:
+                        kind, payload = messages.get_nowait()
+                    except queue.Empty:
+                        break
+                    if kind == "result":
+                        self._completed += 1
+                        return payload
+                    if kind == "error":
+                        raise AnalysisFailedError(payload)
+                    if progress and (payload - reported >= 0.01 or payload >= 1.0):
+                        reported = payload
+                        await progress(payload)
+
+                if handle.cancelled:
+                    raise AnalysisCancelledError(f"Analysis {handle.job_id} was cancelled")
+                if time.monotonic() > deadline:
+                    raise AnalysisTimeoutError(f"Analysis {handle.job_id} exceeded {timeout:.0f}s")
+                if not process.is_alive() and messages.empty():
+                    raise AnalysisFailedError(
+                        f"Analysis worker exited unexpectedly (exit code {process.exitcode})",
+                        retryable=True
+                    )
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            # Also reached when the awaiting request or job is itself cancelled
+            if process.is_alive():
+                logger.warning(f"Terminating analysis {handle.job_id} (process {process.pid})")
+                process.terminate()
+            # Joining blocks, so wait for the process off the event loop
+            await asyncio.to_thread(process.join, 5)
+            if process.is_alive():
+                process.kill()
+                await asyncio.to_thread(process.join)
+            messages.close()
+
+    def has_capacity(self) -> bool:
+        """Whether run would currently accept another analysis"""
+        return len(self._handles) < self.max_workers + self.max_queued
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a running or waiting analysis started by this process.
+
+        Returns:
+            bool: False if no such analysis is in progress here
+        """
+        handle = self._handles.get(job_id)
+        if handle is None:
+            return False
+        handle.cancelled = True
+        if handle.process is not None and handle.process.is_alive():
+            handle.process.terminate()
+        return True
+
+    def shutdown(self) -> None:
+        """Terminate every running worker process"""
+        for handle in list(self._handles.values()):
+            handle.cancelled = True
+            if handle.process is not None and handle.process.is_alive():
+                handle.process.terminate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool utilization counters"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queued": self.max_queued,
+            "running": self._running,
+            "queued": len(self._handles) - self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "timed_out": self._timed_out,
+            "cancelled": self._cancelled,
+            "rejected": self._rejected
+        }
+
+# Global pool used by the multispectral routes
+analysis_pool = AnalysisWorkerPool(cache=scene_cache)
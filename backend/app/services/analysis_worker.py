@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import traceback
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models.database import AnalysisJobModel, PredictionHistoryModel
+from app.services.analysis_pool import (
+    AnalysisWorkerPool,
+    AnalysisPoolFullError,
+    AnalysisTimeoutError,
+    AnalysisCancelledError,
+    AnalysisFailedError,
+    analysis_pool
+)
+
+logger = logging.getLogger(__name__)
+
+def retry_delay(
+    attempt: int,
+    base: float = settings.ANALYSIS_RETRY_BASE_SECONDS,
+    maximum: float = settings.ANALYSIS_RETRY_MAX_SECONDS
+) -> float:
+    """Exponential backoff before retrying a job whose given (1-based) attempt failed"""
+    return min(maximum, base * 2 ** max(0, attempt - 1))
+
+def find_mtl_path(file_paths: List[str]) -> Optional[str]:
+    """Pick the MTL metadata file among a job's uploads"""
+    for path in file_paths:
+        if path.lower().endswith('.txt') and '_mtl' in os.path.basename(path).lower():
+            return path
+    return None
+
+class AnalysisQueueWorker:
+    """
+    Runs multispectral jobs from the analysis_jobs queue.
+
+    Claims up to ``concurrency`` jobs at a time (AnalysisJobModel.claim_next)
+    and runs each through an AnalysisWorkerPool process, renewing the job's
+    lease every ``heartbeat_seconds``. If the lease cannot be renewed (the
+    job was cancelled or another worker reclaimed it) the analysis is
+    stopped. Failures:
+
+    - timeouts and crashed worker processes are retried with exponential
+      backoff until the job's max_attempts is used up
+    - errors raised by the analysis itself fail the job immediately
+    - on shutdown, running jobs are handed back to the queue without
+      counting the attempt
+
+    Any number of these can run against the same database, in the API
+    process (ANALYSIS_EMBEDDED_WORKER) or standalone via ``python -m app.worker``.
+    """
+
+    def __init__(
+        self,
+        pool: AnalysisWorkerPool,
+        concurrency: Optional[int] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = settings.ANALYSIS_LEASE_SECONDS,
+        heartbeat_seconds: float = settings.ANALYSIS_HEARTBEAT_SECONDS,
+        poll_seconds: float = settings.ANALYSIS_QUEUE_POLL_SECONDS
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            pool (AnalysisWorkerPool): Pool that runs the analyses
+            concurrency (Optional[int]): Jobs held at once (defaults to the pool's max_workers)
+            worker_id (Optional[str]): Lease owner name (defaults to host:pid:random)
+            lease_seconds (float): How long a claim lasts without a heartbeat
+            heartbeat_seconds (float): Interval between lease renewals
+            poll_seconds (float): Wait between queue polls when idle
+        """
+        self.pool = pool
+        self.concurrency = concurrency or pool.max_workers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self._active: Dict[str, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._cancelled = 0
+
+    async def start(self) -> None:
+        """Run the worker loop in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and hand running ones back to the queue"""
+        if self._stopping is not None:
+            self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def run(self) -> None:
+        """Claim and run jobs until stop is called"""
+        self._stopping = asyncio.Event()
+        logger.info(f"Analysis worker {self.worker_id} started (concurrency {self.concurrency})")
+        try:
+            while not self._stopping.is_set():
+                while len(self._active) < self.concurrency and self.pool.has_capacity():
+                    try:
+                        job = await AnalysisJobModel.claim_next(self.worker_id, self.lease_seconds)
+                    except Exception as e:
+                        logger.error(f"Failed to claim analysis job: {str(e)}")
+                        break
+                    if job is None:
+                        break
+                    job_id = str(job.id)
+                    logger.info(f"Claimed analysis job {job_id} (attempt {job.attempts}/{job.max_attempts})")
+                    task = asyncio.create_task(self.process(job))
+                    self._active[job_id] = task
+                    task.add_done_callback(lambda _, job_id=job_id: self._active.pop(job_id, None))
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tasks = list(self._active.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Analysis worker {self.worker_id} stopped")
+
+    async def process(self, job: AnalysisJobModel) -> None:
+        """Run one claimed job to a final or retry state"""
+        job_id = str(job.id)
+        if job.attempts > job.max_attempts:
+            # Reclaimed after its last worker died mid-run too many times
+            await self._finish_failed(job, f"Gave up after {job.max_attempts} attempts. Last error: {job.error}")
+            return
+        mtl_path = find_mtl_path(job.file_paths)
+        if not mtl_path:
+            await self._finish_failed(job, "No MTL .txt metadata file found among uploads.")
+            return
+
+        async def report_progress(fraction: float):
+            if not await job.update_progress(fraction):
+                self.pool.cancel(job_id)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            results = await self.pool.run(mtl_path, job_id=job_id, progress=report_progress)
+        except asyncio.CancelledError:
+            # Worker shutting down: let another worker pick the job up
+            await job.release()
+            raise
+        except AnalysisCancelledError:
+            self._cancelled += 1
+            current = await AnalysisJobModel.find_by_id(job_id)
+            if current is not None and current.status == "cancelled":
+                logger.info(f"Analysis job {job_id} cancelled")
+                self._remove_files(job)
+            else:
+                logger.warning(f"Lost the lease on analysis job {job_id}")
+            return
+        except AnalysisPoolFullError:
+            await job.release()
+            return
+        except (AnalysisTimeoutError, AnalysisFailedError) as e:
+            if isinstance(e, AnalysisFailedError) and not e.retryable:
+                await self._finish_failed(job, f"Analysis failed: {str(e)}")
+            else:
+                await self._retry_or_fail(job, str(e))
+            return
+        except Exception as e:
+            await self._finish_failed(job, f"Analysis failed: {str(e)}\n{traceback.format_exc()}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self._save_history(job, mtl_path, results)
+        completed = await job.complete({
+            "status": results.get("status", "success"),
+            "filename": mtl_path,
+            "analysis_type": "multispectral",
+            "results": results
+        })
+        if completed:
+            self._completed += 1
+            self._remove_files(job)
+            logger.info(f"Analysis job {job_id} completed")
+
+    async def _heartbeat(self, job: AnalysisJobModel) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if not await job.heartbeat(self.lease_seconds):
+                    self.pool.cancel(str(job.id))
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat failed for analysis job {job.id}: {str(e)}")
+
+    async def _retry_or_fail(self, job: AnalysisJobModel, error: str) -> None:
+        if job.attempts >= job.max_attempts:
+            await self._finish_failed(job, f"Analysis failed after {job.attempts} attempts: {error}")
+            return
+        delay = retry_delay(job.attempts)
+        if await job.retry_later(error, delay):
+            self._retried += 1
+            logger.warning(f"Analysis job {job.id} failed ({error}); retrying in {delay:.0f}s")
+
+    async def _finish_failed(self, job: AnalysisJobModel, error: str) -> None:
+        if await job.fail(error):
+            self._failed += 1
+            self._remove_files(job)
+            logger.error(f"Analysis job {job.id} failed: {error.splitlines()[0]}")
+
+    async def _save_history(self, job: AnalysisJobModel, mtl_path: str, results: Dict[str, Any]) -> None:
+        """Save to history (tag as multispectral)"""
+        try:
+            await PredictionHistoryModel.create(
+                user_id=str(job.user_id),
+                filename=os.path.basename(mtl_path),
+                disease=results.get('prediction', 'Multispectral Analysis'),
+                confidence=results.get('confidence', 0),
+                severity=results.get('severity', 'N/A'),
+                crop_type=results.get('best_crop', 'N/A'),
+                image_url=None,
+                is_multispectral=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save multispectral result to history: {str(e)}")
+
+    def _remove_files(self, job: AnalysisJobModel) -> None:
+        if job.work_dir:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters for this worker"""
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "active_jobs": len(self._active),
+            "completed": self._completed,
+            "failed": self._failed,
+            "retried": self._retried,
+            "cancelled": self._cancelled
+        }
+
+# Worker embedded in the API process (see ANALYSIS_EMBEDDED_WORKER)
+analysis_worker = AnalysisQueueWorker(analysis_pool)
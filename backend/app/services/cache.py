@@ -0,0 +1,270 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from app.models.database import get_database
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+def approximate_size(value: Any) -> int:
+    """Approximate memory held by a JSON-like value (dicts, lists, strings, numbers), in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once ``max_entries`` is
+    reached, and lazily dropped when read after they expire. With a
+    ``size_of`` function the memory held by the entries is tracked too.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        size_of: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            ttl_seconds (float): Seconds an entry stays valid (0 disables expiry)
+            size_of (Optional[Callable[[Any], int]]): Measures a value in bytes for the memory stat
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.size_of = size_of
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.memory_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+        size = self.size_of(value) if self.size_of is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self.memory_bytes += size
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.memory_bytes -= evicted[2]
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry, returning whether it existed"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self.memory_bytes -= entry[2]
+            return True
+
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_bytes": self.memory_bytes if self.size_of is not None else None
+            }
+
+class MongoCacheBackend:
+    """
+    Shared cache store in the ``cache_entries`` MongoDB collection.
+
+    Lets every uvicorn worker see entries written by the others. Expired
+    documents are removed by a TTL index on ``expires_at`` (created in
+    connect_to_mongo) and filtered out on read, since the TTL monitor only
+    runs about once a minute. Every operation degrades to a miss/no-op when
+    the database is unavailable.
+    """
+
+    collection_name = "cache_entries"
+
+    def __init__(self, namespace: str):
+        """
+        Initialize the backend.
+
+        Args:
+            namespace (str): Prefix separating this cache's keys from other caches
+        """
+        self.namespace = namespace
+        self.errors = 0
+
+    def _collection(self):
+        db = get_database()
+        return db[self.collection_name] if db is not None else None
+
+    def _id(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        collection = self._collection()
+        if collection is None:
+            return None
+        try:
+            document = await collection.find_one(
+                {"_id": self._id(key), "expires_at": {"$gt": datetime.utcnow()}}
+            )
+            return document["value"] if document else None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared cache read failed ({self.namespace}): {str(e)}")
+            return None
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.replace_one(
+                {"_id": self._id(key)},
+                {
+                    "namespace": self.namespace,
+                    "value": value,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared cache write failed ({self.namespace}): {str(e)}")
+
+    async def clear(self) -> None:
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.delete_many({"namespace": self.namespace})
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Shared cache clear failed ({self.namespace}): {str(e)}")
+
+class LayeredCache:
+    """
+    In-process TTLCache in front of an optional shared MongoCacheBackend.
+
+    Reads check the local cache first, then the shared store (copying hits
+    into the local cache); writes go to both. Values stored in the shared
+    backend must be BSON-serializable.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        shared: bool = False,
+        size_of: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            namespace (str): Cache name, also used to namespace shared entries
+            max_entries (int): Maximum entries in the local LRU
+            ttl_seconds (float): Entry time-to-live in both layers
+            shared (bool): Whether to also use the MongoDB shared store
+            size_of (Optional[Callable[[Any], int]]): Measures local values for the memory stat
+        """
+        self.namespace = namespace
+        self.local = TTLCache(max_entries, ttl_seconds, size_of)
+        self.shared = MongoCacheBackend(namespace) if shared else None
+        self.shared_hits = 0
+
+    async def get(self, key: str) -> Any:
+        """Get a value from the local cache, falling back to the shared store"""
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        value = await self.shared.get(key)
+        if value is not None:
+            self.shared_hits += 1
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a value in every layer, optionally with a shorter time-to-live than the default"""
+        ttl = self.local.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            await self.shared.set(key, value, ttl)
+
+    def clear_local(self) -> None:
+        """Drop this process's entries (safe to call from any thread)"""
+        self.local.clear()
+
+    async def clear(self) -> None:
+        """Drop entries from every layer"""
+        self.local.clear()
+        if self.shared is not None:
+            await self.shared.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get local counters plus shared-store hits"""
+        stats = self.local.get_stats()
+        # Local misses that the shared store answered are hits overall
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_enabled"] = self.shared is not None
+        stats["shared_errors"] = self.shared.errors if self.shared is not None else 0
+        lookups = stats["hits"] + stats["misses"]
+        stats["overall_hit_ratio"] = (stats["hits"] + self.shared_hits) / lookups if lookups else 0.0
+        return stats
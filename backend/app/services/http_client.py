@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class HTTPClient:
+    """
+    Process-wide aiohttp session for outbound calls (LLM APIs, image proxying).
+
+    A session per call pays DNS resolution, the TCP handshake and the TLS
+    handshake every time. The shared session keeps connections alive between
+    calls and caches DNS answers:
+
+    - at most ``max_connections`` connections in total and
+      ``max_connections_per_host`` to any one host, so a burst of chat
+      requests queues for a connection instead of opening hundreds
+    - idle connections are kept for ``keepalive_seconds``
+    - DNS answers are cached for ``dns_cache_seconds``
+
+    The session is created by start in the application lifespan and closed
+    by close on shutdown. Code running outside the lifespan (scripts, tests)
+    gets one created lazily by get_session on first use.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = settings.HTTP_MAX_CONNECTIONS,
+        max_connections_per_host: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_seconds: float = settings.HTTP_KEEPALIVE_SECONDS,
+        dns_cache_seconds: int = settings.HTTP_DNS_CACHE_SECONDS,
+        timeout_seconds: float = settings.HTTP_TIMEOUT_SECONDS,
+        connect_timeout_seconds: float = settings.HTTP_CONNECT_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            max_connections (int): Connections open at once across all hosts
+            max_connections_per_host (int): Connections open at once to one host
+            keepalive_seconds (float): How long idle connections are kept
+            dns_cache_seconds (int): How long resolved addresses are reused
+            timeout_seconds (float): Default total timeout per request
+            connect_timeout_seconds (float): Default timeout for getting a connection
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_seconds = keepalive_seconds
+        self.dns_cache_seconds = dns_cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._sessions_created = 0
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_seconds,
+            ttl_dns_cache=self.dns_cache_seconds
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout_seconds, connect=self.connect_timeout_seconds)
+        self._sessions_created += 1
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def start(self) -> None:
+        """Create the shared session"""
+        await self.get_session()
+        logger.info(
+            f"HTTP client started (max {self.max_connections} connections, "
+            f"{self.max_connections_per_host} per host)"
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it if needed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions are bound to their event loop (asyncio.run in scripts and tests)
+            self._session, self._loop, self._lock = None, loop, asyncio.Lock()
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._create_session()
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared session and its connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection pool statistics"""
+        return {
+            "active": self._session is not None and not self._session.closed,
+            "sessions_created": self._sessions_created,
+            "max_connections": self.max_connections,
+            "max_connections_per_host": self.max_connections_per_host,
+            "keepalive_seconds": self.keepalive_seconds,
+            "dns_cache_seconds": self.dns_cache_seconds
+        }
+
+# Global client shared by the services
+http_client = HTTPClient()
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Layers produced by IndexKernel.compute, in the order the API reports them
+INDEX_LAYERS = ('NDVI', 'EVI', 'SAVI', 'NDMI', 'NDBI', 'BSI', 'Carbon', 'Methane', 'Moisture', 'LST', 'SoilType')
+
+class IndexKernel:
+    """
+    Fused float32 computation of every environmental index for one tile shape.
+
+    All outputs and scratch space are allocated once, for the largest tile,
+    and every step writes into them with ``out=``, so processing a tile
+    allocates nothing beyond the band reads. Shared sub-expressions are
+    computed once:
+
+    - ``nir - red`` and ``nir + red`` feed NDVI, SAVI and EVI
+    - ``swir + red`` and ``nir + blue`` feed BSI
+    - NDBI is exactly ``-NDMI`` (same terms, swapped sign, symmetric clip)
+    - Methane and Moisture reuse NDVI, NDBI and NDMI instead of recomputing them
+
+    Results match the whole-array float64 formulas (reference_indices in
+    tests/test_index_kernel.py) up to float32 rounding. Arrays returned by
+    compute are views into the kernel's buffers and are overwritten by the
+    next call.
+    """
+
+    def __init__(self, shape: Tuple[int, int]):
+        """
+        Allocate buffers.
+
+        Args:
+            shape (Tuple[int, int]): Largest tile (height, width) that will be computed
+        """
+        self.shape = shape
+        self._outputs = {name: np.empty(shape, dtype=np.float32) for name in INDEX_LAYERS}
+        self._scratch = [np.empty(shape, dtype=np.float32) for _ in range(3)]
+        self._masks = [np.empty(shape, dtype=bool) for _ in range(3)]
+
+    def _views(self, shape: Tuple[int, int]):
+        height, width = shape
+        if height > self.shape[0] or width > self.shape[1]:
+            raise ValueError(f"Tile {shape} is larger than the kernel's {self.shape}")
+        outputs = {name: buffer[:height, :width] for name, buffer in self._outputs.items()}
+        scratch = [buffer[:height, :width] for buffer in self._scratch]
+        masks = [buffer[:height, :width] for buffer in self._masks]
+        return outputs, scratch, masks
+
+    def clipped_lst(
+        self,
+        band10: np.ndarray,
+        constants: Optional[Tuple[float, float, float, float]],
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Land Surface Temperature (°C) clipped to [-20, 60], before outlier removal.
+
+        Args:
+            band10 (np.ndarray): Thermal band digital numbers
+            constants (Optional[Tuple[float, float, float, float]]): (ML, AL, K1, K2),
+                or None for the band10 * 0.1 - 273.15 fallback
+            out (Optional[np.ndarray]): Destination (defaults to the LST buffer)
+        """
+        if out is None:
+            out = self._views(band10.shape)[0]['LST']
+        if constants is None:
+            np.multiply(band10, 0.1, out=out)
+            np.subtract(out, 273.15, out=out)
+        else:
+            ML, AL, K1, K2 = constants
+            # K2 / ln(K1 / (ML * DN + AL) + 1) - 273.15
+            np.multiply(band10, ML, out=out)
+            np.add(out, AL, out=out)
+            np.divide(K1, out, out=out)
+            np.log1p(out, out=out)
+            np.divide(K2, out, out=out)
+            np.subtract(out, 273.15, out=out)
+        return np.clip(out, -20, 60, out=out)
+
+    def compute(
+        self,
+        bands: Dict[str, np.ndarray],
+        constants: Optional[Tuple[float, float, float, float]],
+        lst_mean: Optional[float] = None,
+        lst_std: Optional[float] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Compute all indices for one tile.
+
+        Args:
+            bands (Dict[str, np.ndarray]): float32 tiles for B2, B4, B5, B6 and B10
+            constants (Optional[Tuple[float, float, float, float]]): Thermal constants (see clipped_lst)
+            lst_mean (Optional[float]): Scene LST mean for outlier removal
+            lst_std (Optional[float]): Scene LST standard deviation (outliers are
+                more than 3 standard deviations from the mean; skipped when None)
+
+        Returns:
+            Dict[str, np.ndarray]: INDEX_LAYERS, as views into the kernel's buffers
+        """
+        # Nodata (zero) pixels make some denominators 0; those results are clipped or NaN by design
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._compute(bands, constants, lst_mean, lst_std)
+
+    def _compute(self, bands, constants, lst_mean, lst_std) -> Dict[str, np.ndarray]:
+        blue, red, nir, swir = bands['B2'], bands['B4'], bands['B5'], bands['B6']
+        o, (s1, s2, s3), (m1, m2, m3) = self._views(red.shape)
+
+        # LST, with scene-level outliers masked
+        lst = self.clipped_lst(bands['B10'], constants, out=o['LST'])
+        if constants is not None and lst_mean is not None and lst_std is not None:
+            np.subtract(lst, lst_mean, out=s1)
+            np.abs(s1, out=s1)
+            np.greater(s1, 3 * lst_std, out=m1)
+            lst[m1] = np.nan
+
+        # Shared vegetation terms
+        np.subtract(nir, red, out=s1)  # nir - red
+        np.add(nir, red, out=s2)       # nir + red
+
+        # NDVI = (nir - red) / (nir + red + 1e-10)
+        np.add(s2, 1e-10, out=s3)
+        np.divide(s1, s3, out=o['NDVI'])
+        np.clip(o['NDVI'], -1, 1, out=o['NDVI'])
+
+        # SAVI = (nir - red) / (nir + red + 0.5) * 1.5
+        np.add(s2, 0.5, out=s3)
+        np.divide(s1, s3, out=o['SAVI'])
+        np.multiply(o['SAVI'], 1.5, out=o['SAVI'])
+        np.clip(o['SAVI'], -1, 1, out=o['SAVI'])
+
+        # EVI = 2.5 * (nir - red) / (nir + 6*red - 7.5*blue + 1)
+        np.multiply(red, 6, out=s3)
+        np.add(s3, nir, out=s3)
+        np.multiply(blue, 7.5, out=s2)
+        np.subtract(s3, s2, out=s3)
+        np.add(s3, 1, out=s3)
+        np.multiply(s1, 2.5, out=o['EVI'])
+        np.divide(o['EVI'], s3, out=o['EVI'])
+        np.clip(o['EVI'], -1, 1, out=o['EVI'])
+
+        # NDMI = (nir - swir) / (nir + swir + 1e-10); NDBI = -NDMI
+        np.subtract(nir, swir, out=s1)
+        np.add(nir, swir, out=s2)
+        np.add(s2, 1e-10, out=s2)
+        np.divide(s1, s2, out=o['NDMI'])
+        np.clip(o['NDMI'], -1, 1, out=o['NDMI'])
+        np.negative(o['NDMI'], out=o['NDBI'])
+
+        # BSI = ((swir + red) - (nir + blue)) / ((swir + red) + (nir + blue) + 1e-10)
+        np.add(swir, red, out=s1)
+        np.add(nir, blue, out=s2)
+        np.subtract(s1, s2, out=s3)
+        np.add(s1, s2, out=s1)
+        np.add(s1, 1e-10, out=s1)
+        np.divide(s3, s1, out=o['BSI'])
+        np.clip(o['BSI'], -1, 1, out=o['BSI'])
+
+        ndvi = o['NDVI']
+
+        # Carbon = (1 - NDVI) * (1 - clip((LST + 20) / 80, 0, 1))
+        np.add(lst, 20, out=s1)
+        np.divide(s1, 80, out=s1)
+        np.clip(s1, 0, 1, out=s1)
+        np.subtract(1, s1, out=s1)
+        np.subtract(1, ndvi, out=s2)  # 1 - NDVI, reused by Methane
+        np.multiply(s2, s1, out=o['Carbon'])
+        np.clip(o['Carbon'], 0, 1, out=o['Carbon'])
+
+        # Methane = (NDBI + (1 - NDVI)) / 2
+        np.add(o['NDBI'], s2, out=o['Methane'])
+        np.multiply(o['Methane'], 0.5, out=o['Methane'])
+        np.clip(o['Methane'], 0, 1, out=o['Methane'])
+
+        # Moisture = (NDVI + NDMI) / 2
+        np.add(ndvi, o['NDMI'], out=o['Moisture'])
+        np.multiply(o['Moisture'], 0.5, out=o['Moisture'])
+        np.clip(o['Moisture'], -1, 1, out=o['Moisture'])
+
+        # SoilType: 0 Sandy, 1 Loamy, 2 Clayey, 3 Organic
+        soil = o['SoilType']
+        soil.fill(0)
+        np.less(ndvi, 0.3, out=m1)               # sparse vegetation
+        np.less_equal(o['BSI'], -0.2, out=m2)
+        np.logical_and(m2, m1, out=m3)
+        np.copyto(soil, 2, where=m3)             # Clayey
+        np.logical_not(m2, out=m2)               # BSI > -0.2
+        np.less_equal(o['BSI'], 0.5, out=m3)
+        np.logical_and(m2, m3, out=m2)
+        np.logical_and(m2, m1, out=m2)
+        np.copyto(soil, 1, where=m2)             # Loamy
+        np.greater_equal(ndvi, 0.3, out=m1)
+        np.copyto(soil, 3, where=m1)             # Organic
+
+        return o
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.config import settings
+from app.models.schemas import PredictionItem
+from app.services.prediction_service import PredictionService, prediction_service
+from app.services.inference_executor import InferenceQueueFullError, inference_executor
+
+logger = logging.getLogger(__name__)
+
+class _PendingPrediction:
+    """A single queued prediction request awaiting a batch slot"""
+
+    __slots__ = ("image", "top_k", "future", "enqueued_at")
+
+    def __init__(self, image: np.ndarray, top_k: int, future: asyncio.Future):
+        self.image = image
+        self.top_k = top_k
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+class MicroBatchingEngine:
+    """
+    Dynamic micro-batching front-end for PredictionService.
+
+    Concurrent requests are collected for up to ``max_wait_ms`` or until
+    ``max_batch_size`` images are queued, stacked into one NCHW tensor and run
+    through a single ONNX session call. Top-k results are scattered back to
+    each awaiting caller.
+
+    Failure isolation:
+    - An image that fails preprocessing only fails its own request
+    - If the batched forward pass fails, the batch is re-run image by image
+      so one bad input cannot fail its neighbours
+
+    Backpressure: once ``max_queue_size`` requests are waiting for a batch,
+    new requests are rejected with InferenceQueueFullError.
+
+    Batch-size histograms and queue wait times are tracked for monitoring.
+    """
+
+    def __init__(
+        self,
+        service: PredictionService,
+        max_batch_size: int = settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: float = settings.INFERENCE_MAX_WAIT_MS,
+        max_concurrent_batches: int = settings.INFERENCE_MAX_CONCURRENT_BATCHES,
+        max_queue_size: int = settings.INFERENCE_MAX_QUEUE_SIZE,
+        enabled: bool = settings.INFERENCE_BATCHING_ENABLED,
+        executor: Optional[Executor] = None
+    ):
+        """
+        Initialize the batching engine.
+
+        Args:
+            service (PredictionService): Service that owns the ONNX session
+            max_batch_size (int): Maximum images per session call
+            max_wait_ms (float): Maximum time to hold a request while a batch fills
+            max_concurrent_batches (int): Batches allowed in flight at once
+            max_queue_size (int): Requests allowed to wait for a batch before rejecting
+            enabled (bool): When False, every request runs as its own batch of 1
+            executor (Optional[Executor]): Executor for preprocessing and inference
+                (None uses the event loop's default executor)
+        """
+        self.service = service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.max_queue_size = max(1, max_queue_size)
+        self.enabled = enabled
+        self.executor = executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+        # Batch being collected, or waiting for a slot: in neither _queue nor _inflight
+        self._collecting: List[_PendingPrediction] = []
+        self._buffers = threading.local()
+
+        self._batch_histogram: Counter = Counter()
+        self._total_batches = 0
+        self._total_items = 0
+        self._failed_items = 0
+        self._rejected = 0
+        self._isolation_reruns = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def is_running(self) -> bool:
+        """Check whether the batch collector is running"""
+        return self._collector is not None and not self._collector.done()
+
+    async def start(self) -> None:
+        """Start collecting batches on the running event loop"""
+        if not self.enabled or self.is_running():
+            return
+
+        # Respect a fixed batch dimension baked into the exported model
+        model_limit = self.service.get_max_batch_size()
+        if model_limit is not None and model_limit < self.max_batch_size:
+            logger.warning(
+                f"Model input has a fixed batch size of {model_limit}; "
+                f"clamping max batch size from {self.max_batch_size}"
+            )
+            self.max_batch_size = model_limit
+
+        self._queue = asyncio.Queue()
+        self._batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._collector = asyncio.create_task(self._collect())
+        logger.info(
+            f"Micro-batching engine started (max batch: {self.max_batch_size}, "
+            f"max wait: {self.max_wait * 1000:.1f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Stop collecting and wait for in-flight batches to finish"""
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        self._collector = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Fail the batch the collector was holding and anything still queued
+        # rather than leaving callers hanging
+        pending_items = self._collecting
+        self._collecting = []
+        while self._queue is not None and not self._queue.empty():
+            pending_items.append(self._queue.get_nowait())
+        for pending in pending_items:
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Inference engine is shutting down"))
+        logger.info("Micro-batching engine stopped")
+
+    async def predict(self, image_array: np.ndarray, top_k: int = 3) -> List[PredictionItem]:
+        """
+        Predict disease for one image, batched with concurrent requests.
+
+        Args:
+            image_array (np.ndarray): Input image as numpy array
+            top_k (int): Number of top predictions to return
+
+        Returns:
+            List[PredictionItem]: List of top-k predictions with confidence scores
+
+        Raises:
+            InferenceQueueFullError: If too many requests are already waiting
+            RuntimeError: If preprocessing or inference fails for this image
+        """
+        loop = asyncio.get_running_loop()
+        if not self.is_running():
+            return await loop.run_in_executor(self.executor, self.service.predict, image_array, top_k)
+
+        if self._queue.qsize() >= self.max_queue_size:
+            self._rejected += 1
+            raise InferenceQueueFullError()
+
+        future = loop.create_future()
+        await self._queue.put(_PendingPrediction(image_array, top_k, future))
+        return await future
+
+    async def _collect(self) -> None:
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that gave up (e.g. disconnected) don't need a slot
+            batch[:] = [item for item in batch if not item.future.done()]
+            if not batch:
+                continue
+
+            await self._batch_slots.acquire()
+            self._collecting = []
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[_PendingPrediction]) -> None:
+        """Run one batch in the executor and resolve its futures"""
+        try:
+            now = time.perf_counter()
+            for item in batch:
+                waited = now - item.enqueued_at
+                self._total_wait += waited
+                self._max_wait_seen = max(self._max_wait_seen, waited)
+
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(
+                    self.executor,
+                    self._process_batch,
+                    [item.image for item in batch],
+                    [item.top_k for item in batch]
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+
+            self._record_batch(len(batch))
+            for item, result in zip(batch, results):
+                if item.future.done():
+                    continue
+                if isinstance(result, InferenceQueueFullError):
+                    item.future.set_exception(result)
+                elif isinstance(result, Exception):
+                    self._failed_items += 1
+                    item.future.set_exception(RuntimeError(f"Prediction failed: {str(result)}"))
+                else:
+                    item.future.set_result(result)
+        finally:
+            self._batch_slots.release()
+
+    def _get_batch_buffer(self) -> np.ndarray:
+        """Get the preallocated (max_batch, 3, H, W) buffer for the calling thread"""
+        buffer = getattr(self._buffers, "batch", None)
+        if buffer is None or buffer.shape[0] < self.max_batch_size:
+            buffer = np.empty(
+                (self.max_batch_size, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE),
+                dtype=np.float32
+            )
+            self._buffers.batch = buffer
+        return buffer
+
+    async def predict_batch(
+        self,
+        images: List[np.ndarray],
+        top_k: int = 3
+    ) -> List[Union[List[PredictionItem], Exception]]:
+        """
+        Predict a caller-assembled batch of images (e.g. one multi-image upload).
+
+        The images skip the request queue and run as batched tensors of up to
+        ``max_batch_size`` rows. Failures are returned per image instead of
+        raised, so one unreadable photo cannot fail the rest of the upload.
+
+        Args:
+            images (List[np.ndarray]): Input images as numpy arrays
+            top_k (int): Number of top predictions per image
+
+        Returns:
+            List[Union[List[PredictionItem], Exception]]: Per-image predictions or error
+
+        Raises:
+            InferenceQueueFullError: If the executor has no room for the batch
+        """
+        chunk_size = self.max_batch_size
+        model_limit = self.service.get_max_batch_size()
+        if model_limit is not None:
+            chunk_size = min(chunk_size, model_limit)
+
+        loop = asyncio.get_running_loop()
+        results: List[Union[List[PredictionItem], Exception]] = []
+        for start in range(0, len(images), chunk_size):
+            chunk = images[start:start + chunk_size]
+            results.extend(await loop.run_in_executor(
+                self.executor, self._process_batch, chunk, [top_k] * len(chunk)
+            ))
+            self._record_batch(len(chunk))
+        self._failed_items += sum(isinstance(result, Exception) for result in results)
+        return results
+
+    def _process_batch(
+        self,
+        images: List[np.ndarray],
+        top_ks: List[int]
+    ) -> List[Union[List[PredictionItem], Exception]]:
+        """
+        Preprocess, run and post-process a batch (runs in the executor).
+
+        Returns:
+            List[Union[List[PredictionItem], Exception]]: Per-image result or error
+        """
+        buffer = self._get_batch_buffer()
+        results: List[Union[List[PredictionItem], Exception]] = [None] * len(images)
+
+        # Preprocess each image into its own slot; failures stay per-image
+        valid = []
+        for index, image in enumerate(images):
+            try:
+                self.service.preprocess_image(image, out=buffer[len(valid)])
+                valid.append(index)
+            except Exception as e:
+                results[index] = e
+
+        if not valid:
+            return results
+
+        try:
+            logits = self.service.run_inference(buffer[:len(valid)])
+            for row, index in enumerate(valid):
+                results[index] = self.service.logits_to_predictions(logits[row], top_ks[index])
+        except Exception as e:
+            if len(valid) == 1:
+                results[valid[0]] = e
+                return results
+
+            # Isolate the failure: re-run each image on its own
+            logger.warning(f"Batched inference of {len(valid)} images failed ({str(e)}), isolating")
+            self._isolation_reruns += 1
+            for row, index in enumerate(valid):
+                try:
+                    logits = self.service.run_inference(buffer[row:row + 1])
+                    results[index] = self.service.logits_to_predictions(logits[0], top_ks[index])
+                except Exception as single_error:
+                    results[index] = single_error
+
+        return results
+
+    def _record_batch(self, size: int) -> None:
+        """Update batch-size histogram counters"""
+        self._batch_histogram[size] += 1
+        self._total_batches += 1
+        self._total_items += size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics including the batch-size histogram"""
+        return {
+            "enabled": self.enabled,
+            "running": self.is_running(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._inflight),
+            "total_batches": self._total_batches,
+            "total_items": self._total_items,
+            "failed_items": self._failed_items,
+            "rejected": self._rejected,
+            "isolation_reruns": self._isolation_reruns,
+            "mean_batch_size": self._total_items / self._total_batches if self._total_batches else 0.0,
+            "mean_queue_wait_ms": self._total_wait / self._total_items * 1000 if self._total_items else 0.0,
+            "max_queue_wait_ms": self._max_wait_seen * 1000,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_histogram.items())}
+        }
+
+# Global engine instance in front of the shared prediction service
+inference_engine = MicroBatchingEngine(prediction_service, executor=inference_executor)
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class InferenceQueueFullError(Exception):
+    """Raised when the inference executor has no room for more work"""
+
+    def __init__(self, retry_after: int = settings.INFERENCE_RETRY_AFTER_SECONDS):
+        super().__init__("Inference queue is full, please retry shortly")
+        self.retry_after = retry_after
+
+def default_worker_count() -> int:
+    """
+    Size the inference pool from the host's CPU count and ORT intra-op threads.
+
+    ONNX Runtime already parallelizes each forward pass across
+    ORT_INTRA_OP_NUM_THREADS cores, so the pool only needs enough threads to
+    keep the remaining cores busy and to overlap decoding/preprocessing with a
+    running batch, rather than one thread per core.
+    """
+    cpu_count = os.cpu_count() or 2
+    if settings.ORT_INTRA_OP_NUM_THREADS > 0:
+        return max(2, cpu_count // settings.ORT_INTRA_OP_NUM_THREADS)
+    return max(2, cpu_count // 2)
+
+class BoundedInferenceExecutor(Executor):
+    """
+    Dedicated, bounded thread pool for CPU-bound inference work.
+
+    Image decoding, preprocessing and ONNX runs are submitted here instead of
+    running on the asyncio event loop. Admission is bounded: once
+    ``max_workers + max_queue_size`` tasks are pending, ``submit`` raises
+    InferenceQueueFullError so the API can answer 503 with Retry-After instead
+    of queueing without limit.
+
+    Queue depth and queue wait time are tracked for monitoring.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.INFERENCE_EXECUTOR_WORKERS or default_worker_count(),
+        max_queue_size: int = settings.INFERENCE_MAX_QUEUE_SIZE,
+        retry_after: int = settings.INFERENCE_RETRY_AFTER_SECONDS
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers (int): Worker threads
+            max_queue_size (int): Tasks allowed to wait for a free worker
+            retry_after (int): Seconds suggested to rejected clients
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(0, max_queue_size)
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._recent_waits = deque(maxlen=1000)
+        self._max_wait = 0.0
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """
+        Submit work, rejecting it when the queue is full.
+
+        Raises:
+            InferenceQueueFullError: If the executor is at capacity
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue_size:
+                self._rejected += 1
+                raise InferenceQueueFullError(self.retry_after)
+            self._pending += 1
+            self._submitted += 1
+
+        submitted_at = time.perf_counter()
+
+        def run():
+            waited = time.perf_counter() - submitted_at
+            with self._lock:
+                self._running += 1
+                self._recent_waits.append(waited)
+                self._max_wait = max(self._max_wait, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+
+        try:
+            future = self._pool.submit(run)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        # Tasks cancelled before they started never reach run()'s cleanup
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait-time metrics"""
+        with self._lock:
+            waits = np.array(self._recent_waits) * 1000 if self._recent_waits else None
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_ms_p50": float(np.percentile(waits, 50)) if waits is not None else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if waits is not None else 0.0,
+                "wait_ms_max": self._max_wait * 1000
+            }
+
+# Global executor shared by the prediction routes and the batching engine
+inference_executor = BoundedInferenceExecutor()
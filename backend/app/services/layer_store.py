@@ -0,0 +1,141 @@
+import hashlib
+import hmac
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.utils.raster_render import IMAGE_FORMATS
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {media_type: f".{name.lower()}" for name, media_type in IMAGE_FORMATS.items()}
+
+class LayerStore:
+    """
+    Content-addressed files for rendered multispectral layers.
+
+    Analyses write each rendered map here once and keep only a small
+    reference (``{"digest", "media_type", "size"}``) in their results, so job
+    documents and cached scene results stay small and images are fetched
+    lazily from /predict/multispectral/{job_id}/layers/{name}. The digest is a
+    BLAKE2b hash of the encoded image: identical renders share one file and
+    the digest doubles as the HTTP ETag.
+
+    Files are never rewritten, so readers need no locking. Layers can be
+    shared by several jobs and scene cache entries, so nothing deletes them
+    individually; prune removes those not used for ``retention_seconds``
+    (reads through the scene cache refresh their mtime). Like
+    ANALYSIS_STORAGE_DIR, the directory must be shared by the API and any
+    standalone workers.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.LAYER_STORAGE_DIR,
+        retention_seconds: float = settings.LAYER_RETENTION_SECONDS
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            directory (str): Where layer files are kept (created on first write)
+            retention_seconds (float): Unused layers older than this are pruned
+        """
+        self.directory = directory
+        self.retention_seconds = retention_seconds
+
+    def path_for(self, ref: Dict[str, Any]) -> str:
+        """File holding a layer reference's image"""
+        digest = ref["digest"]
+        if not digest.isalnum():
+            raise ValueError(f"Invalid layer digest: {digest}")
+        return os.path.join(self.directory, digest + EXTENSIONS[ref["media_type"]])
+
+    def put(self, data: bytes, image_format: str = "PNG") -> Dict[str, Any]:
+        """
+        Store an encoded image.
+
+        Returns:
+            Dict[str, Any]: Reference to keep in the results
+        """
+        ref = {
+            "digest": hashlib.blake2b(data, digest_size=16).hexdigest(),
+            "media_type": IMAGE_FORMATS[image_format.upper()],
+            "size": len(data)
+        }
+        path = self.path_for(ref)
+        if os.path.exists(path):
+            os.utime(path)
+            return ref
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return ref
+
+    def read(self, ref: Dict[str, Any]) -> bytes:
+        """Load a layer's image (raises FileNotFoundError once pruned)"""
+        with open(self.path_for(ref), "rb") as f:
+            return f.read()
+
+    def touch(self, refs: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Mark layers as used.
+
+        Returns:
+            bool: False if any of them no longer exists
+        """
+        try:
+            for ref in refs.values():
+                os.utime(self.path_for(ref))
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def prune(self, max_age_seconds: Optional[float] = None) -> int:
+        """
+        Delete layers not written or touched within max_age_seconds.
+
+        Returns:
+            int: Number of files removed
+        """
+        cutoff = time.time() - (self.retention_seconds if max_age_seconds is None else max_age_seconds)
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"Pruned {removed} unused layer files")
+        return removed
+
+def sign_layer(job_id: str, name: str, expires: int) -> str:
+    """HMAC signature authorizing a layer download until ``expires`` (epoch seconds)"""
+    message = f"{job_id}/{name}/{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def verify_layer_signature(job_id: str, name: str, expires: int, signature: str) -> bool:
+    """Check a layer URL signature and that it has not expired"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign_layer(job_id, name, expires), signature)
+
+# Global store shared by the analyzer, the scene cache and the layer routes
+layer_store = LayerStore()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.services.prediction_service import PredictionService
+
+logger = logging.getLogger(__name__)
+
+class ModelHealthMonitor:
+    """
+    Background health monitor for the ONNX classifier.
+    
+    Model validation runs a full extra forward pass, so it is kept off the
+    request path. The monitor validates (and reloads if necessary):
+    - On a fixed schedule (MODEL_HEALTH_CHECK_INTERVAL seconds)
+    - As soon as MODEL_HEALTH_FAILURE_THRESHOLD consecutive inferences fail
+    - When the model is older than MODEL_MAX_AGE seconds
+    
+    Requests only check the service's cheap loaded flag and report their
+    outcome through record_success / record_failure, which are thread-safe.
+    """
+    
+    def __init__(
+        self,
+        service: "PredictionService",
+        interval_seconds: float = settings.MODEL_HEALTH_CHECK_INTERVAL,
+        failure_threshold: int = settings.MODEL_HEALTH_FAILURE_THRESHOLD,
+        max_model_age: float = settings.MODEL_MAX_AGE
+    ):
+        """
+        Initialize the health monitor.
+        
+        Args:
+            service (PredictionService): Service whose model is monitored
+            interval_seconds (float): Seconds between scheduled checks
+            failure_threshold (int): Consecutive failures that trigger an immediate check
+            max_model_age (float): Seconds after which the model is reloaded
+        """
+        self.service = service
+        self.interval_seconds = interval_seconds
+        self.failure_threshold = failure_threshold
+        self.max_model_age = max_model_age
+        
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._total_failures = 0
+        self._total_successes = 0
+        self._last_error: Optional[str] = None
+        self._checks_run = 0
+        self._reloads = 0
+        self._last_check_at: Optional[float] = None
+        self._last_check_ok: Optional[bool] = None
+        
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def start(self) -> None:
+        """Start the background check loop on the running event loop"""
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Model health monitor started (interval: {self.interval_seconds}s, "
+            f"failure threshold: {self.failure_threshold})"
+        )
+    
+    async def stop(self) -> None:
+        """Stop the background check loop"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Model health monitor stopped")
+    
+    def record_success(self) -> None:
+        """Record a successful inference"""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._total_successes += 1
+    
+    def record_failure(self, error: Exception) -> None:
+        """
+        Record a failed inference and trigger a check once the threshold is hit.
+        
+        Args:
+            error (Exception): The inference error
+        """
+        with self._lock:
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            self._last_error = str(error)
+            trigger = self._consecutive_failures >= self.failure_threshold
+        
+        if trigger:
+            logger.warning(
+                f"{self.failure_threshold} consecutive inference failures, scheduling model health check"
+            )
+            self._request_check()
+    
+    def _request_check(self) -> None:
+        """Wake the background loop (safe to call from any thread)"""
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+    
+    async def _run(self) -> None:
+        """Run checks on schedule or when woken by repeated failures"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                # Validation and reloads are blocking; keep them off the event loop
+                await self._loop.run_in_executor(None, self.check_now)
+            except Exception as e:
+                logger.error(f"Model health check crashed: {str(e)}")
+    
+    def check_now(self) -> bool:
+        """
+        Validate the model synchronously, reloading it when needed.
+        
+        Returns:
+            bool: True if the model is loaded and passed validation
+        """
+        healthy = False
+        try:
+            if not self.service.is_model_loaded():
+                logger.info("Model not loaded, attempting to load...")
+                self.service.load_model()
+                self._reloads += 1
+            elif self.service.last_load_attempt and (time.time() - self.service.last_load_attempt) > self.max_model_age:
+                logger.info("Model is old, reloading for freshness...")
+                self.service.load_model(force_reload=True)
+                self._reloads += 1
+            elif not self.service.validate_model():
+                logger.warning("Model validation failed, reloading...")
+                self.service.load_model(force_reload=True)
+                self._reloads += 1
+            healthy = self.service.is_model_loaded()
+        except Exception as e:
+            logger.error(f"Model health check failed: {str(e)}")
+            with self._lock:
+                self._last_error = str(e)
+        
+        with self._lock:
+            self._checks_run += 1
+            self._last_check_at = time.time()
+            self._last_check_ok = healthy
+            if healthy:
+                self._consecutive_failures = 0
+        return healthy
+    
+    def is_healthy(self) -> bool:
+        """
+        Cheap health flag: model loaded and last check (if any) passed.
+        
+        Returns:
+            bool: True if the model is considered healthy
+        """
+        return self.service.is_model_loaded() and self._last_check_ok is not False
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get the monitor state for the /health endpoint"""
+        with self._lock:
+            return {
+                "healthy": self.is_healthy(),
+                "monitor_running": bool(self._task and not self._task.done()),
+                "check_interval_seconds": self.interval_seconds,
+                "failure_threshold": self.failure_threshold,
+                "consecutive_failures": self._consecutive_failures,
+                "total_failures": self._total_failures,
+                "total_successes": self._total_successes,
+                "checks_run": self._checks_run,
+                "reloads": self._reloads,
+                "last_check_at": self._last_check_at,
+                "last_check_ok": self._last_check_ok,
+                "last_error": self._last_error,
+                "model_loaded_at": self.service.last_load_attempt,
+                "model_path": getattr(self.service, "model_path", None),
+                "model_variant": settings.MODEL_VARIANT
+            }
@@ -1,22 +1,81 @@
 import os
 import numpy as np
 import rasterio
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
-from matplotlib.colors import LinearSegmentedColormap
-from matplotlib import cm
 import tempfile
-import base64
-import io
 import logging
-from typing import Dict, Any, List, Tuple
-import asyncio
+import math
+from typing import Dict, Any, List, Tuple, Optional, Callable, Iterator
 import re
+from concurrent.futures import Executor, ThreadPoolExecutor
+from rasterio.windows import Window
+
+from app.config import settings
+from app.services.raster_stats import LayerStatistics
+from app.services.index_kernel import INDEX_LAYERS, IndexKernel
+from app.services.suitability_kernel import SuitabilityKernel
+from app.services.layer_store import LayerStore, layer_store as default_layer_store
+from app.utils.raster_render import downsample, palette_lut, render_classes, render_raster
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_BANDS = {'B2': 'Blue', 'B4': 'Red', 'B5': 'NIR', 'B6': 'SWIR', 'B10': 'Thermal'}
+SOIL_TYPES = ['Sandy', 'Loamy', 'Clayey', 'Organic']
+SOIL_COLORS = ['#F4E3AF', '#D2B48C', '#8B4513', '#556B2F']  # Sandy, Loamy, Clayey, Organic
+SOIL_LUT = palette_lut(SOIL_COLORS)
+SUITABILITY_COLORMAP = 'RdYlGn'
+# Legend assets served by the prediction router
+COLORBAR_URL = "/predict/multispectral/colorbars/{name}.png"
+
+# Value range of each summarized layer (every layer is clipped to it), used
+# for the statistics histograms
+LAYER_RANGES = {name: (-1.0, 1.0) for name in INDEX_LAYERS if name != 'SoilType'}
+LAYER_RANGES.update({'Carbon': (0.0, 1.0), 'Methane': (0.0, 1.0), 'LST': (-20.0, 60.0)})
+SUITABILITY_RANGE = (0.0, 1.0)
+
+class PreviewCanvas:
+    """
+    Downsampled copy of a scene-sized layer, filled one tile at a time.
+
+    Keeps every ``factor``-th pixel in both directions (aligned to the scene
+    grid, so tile boundaries don't shift the sampling), where ``factor`` is
+    chosen so the longest side fits ``max_size``. This is what gets rendered,
+    instead of holding the full-resolution layer in memory.
+    """
+
+    def __init__(self, height: int, width: int, max_size: int, dtype=np.float32):
+        self.factor = max(1, math.ceil(max(height, width) / max_size))
+        self.array = np.full(
+            (math.ceil(height / self.factor), math.ceil(width / self.factor)),
+            np.nan,
+            dtype=dtype
+        )
+
+    def add(self, window: Window, tile: np.ndarray) -> None:
+        """Copy the sampled pixels of a tile into the canvas"""
+        f = self.factor
+        row_start = (-window.row_off) % f
+        col_start = (-window.col_off) % f
+        sampled = tile[row_start::f, col_start::f]
+        row = (window.row_off + row_start) // f
+        col = (window.col_off + col_start) // f
+        self.array[row:row + sampled.shape[0], col:col + sampled.shape[1]] = sampled
+
 class MultispectralAnalyzer:
-    def __init__(self):
+    def __init__(
+        self,
+        tile_size: Optional[int] = None,
+        preview_size: Optional[int] = None,
+        read_workers: Optional[int] = None,
+        layer_store: Optional[LayerStore] = None
+    ):
+        self.tile_size = tile_size or settings.MULTISPECTRAL_TILE_SIZE
+        self.preview_size = preview_size or settings.MULTISPECTRAL_PREVIEW_SIZE
+        self.read_workers = read_workers or settings.MULTISPECTRAL_READ_WORKERS
+        self.layer_store = layer_store or default_layer_store
+        self.gdal_options = {
+            "GDAL_CACHEMAX": settings.GDAL_CACHEMAX_MB,
+            "GDAL_NUM_THREADS": settings.GDAL_NUM_THREADS
+        }
         self.crop_params = {
             'Cashew': {
                 'temp_range': (24, 28),
@@ -52,13 +111,15 @@ class MultispectralAnalyzer:
             }
         }
 
+    @staticmethod
+    def product_id(mtl_path: str) -> str:
+        """Extract product ID from MTL filename (e.g., "LC08_L1TP_194056_20241221_20241228_02_T1" from "LC08_L1TP_194056_20241221_20241228_02_T1_MTL.txt")"""
+        return os.path.basename(mtl_path).split('_MTL')[0]
+
     def find_band_files(self, mtl_path: str) -> Dict[str, str]:
         """Find all band files associated with the MTL file"""
         base_dir = os.path.dirname(mtl_path)
-        mtl_filename = os.path.basename(mtl_path)
-        
-        # Extract product ID from MTL filename (e.g., "LC08_L1TP_194056_20241221_20241228_02_T1" from "LC08_L1TP_194056_20241221_20241228_02_T1_MTL.txt")
-        product_id = mtl_filename.split('_MTL')[0]
+        product_id = self.product_id(mtl_path)
         
         bands = {}
         logger.info(f"Looking for band files in directory: {base_dir}")
@@ -92,63 +153,8 @@ class MultispectralAnalyzer:
         logger.info(f"Found {len(bands)} band files: {list(bands.keys())}")
         return bands
 
-    def read_band(self, file_path: str) -> Tuple[np.ndarray, Dict]:
-        """Read a band file and return the data and profile"""
-        with rasterio.open(file_path) as src:
-            band = src.read(1).astype(float)
-            profile = src.profile
-        return band, profile
-
-    # === Environmental Indices Calculations ===
-    def compute_ndvi(self, nir: np.ndarray, red: np.ndarray) -> np.ndarray:
-        """Normalized Difference Vegetation Index [-1 to 1]"""
-        return np.clip((nir - red) / (nir + red + 1e-10), -1, 1)
-
-    def compute_evi(self, nir: np.ndarray, red: np.ndarray, blue: np.ndarray) -> np.ndarray:
-        """Enhanced Vegetation Index [-1 to 1]"""
-        return np.clip(2.5 * (nir - red) / (nir + 6*red - 7.5*blue + 1), -1, 1)
-
-    def compute_savi(self, nir: np.ndarray, red: np.ndarray, L: float = 0.5) -> np.ndarray:
-        """Soil Adjusted Vegetation Index [-1 to 1]"""
-        return np.clip((nir - red) / (nir + red + L) * (1 + L), -1, 1)
-
-    def compute_ndmi(self, nir: np.ndarray, swir: np.ndarray) -> np.ndarray:
-        """Normalized Difference Moisture Index [-1 to 1]"""
-        return np.clip((nir - swir) / (nir + swir + 1e-10), -1, 1)
-
-    def compute_ndbi(self, swir: np.ndarray, nir: np.ndarray) -> np.ndarray:
-        """Normalized Difference Built-up Index [-1 to 1]"""
-        return np.clip((swir - nir) / (swir + nir + 1e-10), -1, 1)
-
-    def compute_bsi(self, swir: np.ndarray, red: np.ndarray, nir: np.ndarray, blue: np.ndarray) -> np.ndarray:
-        """Bare Soil Index [-1 to 1]"""
-        return np.clip(((swir + red) - (nir + blue)) / ((swir + red) + (nir + blue) + 1e-10), -1, 1)
-
-    def compute_carbon(self, ndvi: np.ndarray, lst: np.ndarray) -> np.ndarray:
-        """Improved Carbon Storage Proxy [0 to 1]"""
-        lst_norm = np.clip((lst - (-20)) / (60 - (-20)), 0, 1)
-        return np.clip((1 - ndvi) * (1 - lst_norm), 0, 1)
-
-    def compute_methane(self, ndvi: np.ndarray, ndbi: np.ndarray) -> np.ndarray:
-        """Methane Emission Proxy [0 to 1] - Labeled as Urban Stress Index"""
-        return np.clip((ndbi + (1 - ndvi)) / 2, 0, 1)
-
-    def compute_moisture(self, ndvi: np.ndarray, ndmi: np.ndarray) -> np.ndarray:
-        """Atmospheric Moisture Proxy [-1 to 1]"""
-        return np.clip((ndvi + ndmi) / 2, -1, 1)
-
-    def compute_soil_type(self, bsi: np.ndarray, ndvi: np.ndarray) -> np.ndarray:
-        """Classify soil type based on BSI and NDVI"""
-        # 0: Sandy, 1: Loamy, 2: Clayey, 3: Organic
-        soil_map = np.zeros_like(bsi)
-        soil_map[(bsi > 0.5) & (ndvi < 0.2)] = 0  # Sandy
-        soil_map[(bsi > -0.2) & (bsi <= 0.5) & (ndvi < 0.3)] = 1  # Loamy
-        soil_map[(bsi <= -0.2) & (ndvi < 0.3)] = 2  # Clayey
-        soil_map[ndvi >= 0.3] = 3  # Organic
-        return soil_map
-
-    def compute_lst(self, band10: np.ndarray, metadata_path: str) -> np.ndarray:
-        """Land Surface Temperature (°C) with realistic bounds"""
+    def read_lst_constants(self, metadata_path: str) -> Optional[Tuple[float, float, float, float]]:
+        """Read the band 10 radiance and thermal constants (ML, AL, K1, K2) from the MTL file"""
         def extract_metadata_value(meta_file: str, key: str) -> float:
             with open(meta_file, 'r') as f:
                 for line in f:
@@ -157,85 +163,27 @@ class MultispectralAnalyzer:
             raise ValueError(f"Metadata key {key} not found")
         
         try:
-            ML = extract_metadata_value(metadata_path, 'RADIANCE_MULT_BAND_10')
-            AL = extract_metadata_value(metadata_path, 'RADIANCE_ADD_BAND_10')
-            K1 = extract_metadata_value(metadata_path, 'K1_CONSTANT_BAND_10')
-            K2 = extract_metadata_value(metadata_path, 'K2_CONSTANT_BAND_10')
-            
-            radiance = ML * band10 + AL
-            bt_kelvin = K2 / np.log((K1 / radiance) + 1)
-            lst_celsius = bt_kelvin - 273.15
-            lst_celsius = np.clip(lst_celsius, -20, 60)
-            lst_celsius[np.abs(lst_celsius - np.mean(lst_celsius)) > 3*np.std(lst_celsius)] = np.nan
-            return lst_celsius
+            return (
+                extract_metadata_value(metadata_path, 'RADIANCE_MULT_BAND_10'),
+                extract_metadata_value(metadata_path, 'RADIANCE_ADD_BAND_10'),
+                extract_metadata_value(metadata_path, 'K1_CONSTANT_BAND_10'),
+                extract_metadata_value(metadata_path, 'K2_CONSTANT_BAND_10')
+            )
         except Exception as e:
             logger.warning(f"Could not compute LST from metadata: {e}")
-            # Fallback: use band10 directly as temperature proxy
-            return np.clip(band10 * 0.1 - 273.15, -20, 60)
-
-    def calculate_suitability(self, indices_dict: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
-        """Calculate suitability scores for all crops"""
-        # Prepare normalized parameters (0-1 scale)
-        lst_norm = (indices_dict['LST'] - (-20)) / (60 - (-20))
-        moisture = (indices_dict['Moisture'] + 1) / 2
-        vegetation = (indices_dict['NDVI'] + 1) / 2
-        soil_quality = (indices_dict['Carbon'] + (1 - indices_dict['BSI'])) / 2
-        
-        # Get soil type compatibility
-        soil_type = indices_dict['SoilType']
-        
-        suitability = {}
-        for crop, params in self.crop_params.items():
-            # Temperature suitability (Gaussian distribution)
-            temp_center = np.mean(params['temp_range'])
-            temp_width = (params['temp_range'][1] - params['temp_range'][0]) / 2
-            temp_score = np.exp(-0.5 * ((lst_norm - temp_center/60) / (temp_width/60))**2)
-            
-            # Moisture suitability (triangular distribution)
-            moisture_low, moisture_high = params['moisture_range']
-            moisture_score = np.where(
-                moisture < moisture_low,
-                moisture / moisture_low,
-                np.where(
-                    moisture > moisture_high,
-                    (1 - moisture) / (1 - moisture_high),
-                    1
-                )
-            )
-            
-            # Vegetation suitability
-            veg_low, veg_high = params['vegetation_range']
-            veg_score = np.clip((vegetation - veg_low) / (veg_high - veg_low), 0, 1)
-            
-            # Soil suitability
-            soil_low, soil_high = params['soil_range']
-            soil_score = np.clip((soil_quality - soil_low) / (soil_high - soil_low), 0, 1)
-            
-            # Soil type compatibility
-            soil_comp = np.isin(soil_type, params['preferred_soil']).astype(float)
-            
-            # Combined score with weights
-            suitability[crop] = np.clip(
-                (temp_score*0.3 + moisture_score*0.2 + veg_score*0.2 + soil_score*0.2 + soil_comp*0.1),
-                0, 1
-            )
-        
-        return suitability
+            return None
 
-    def generate_prediction(self, suitability: Dict[str, np.ndarray], indices: Dict[str, np.ndarray]) -> str:
-        """Generate a prediction based on the suitability analysis"""
-        # Calculate average suitability scores
-        avg_scores = {crop: np.nanmean(score) for crop, score in suitability.items()}
-        
+    def generate_prediction_from_summary(
+        self,
+        avg_scores: Dict[str, float],
+        lst_avg: float,
+        moisture_avg: float,
+        dominant_soil: int
+    ) -> str:
+        """Generate a prediction from scene-wide averages (no full-size arrays needed)"""
         # Find most suitable crop
         best_crop = max(avg_scores.items(), key=lambda x: x[1])
-        
-        # Analyze environmental conditions
-        lst_avg = np.nanmean(indices['LST'])
-        moisture_avg = np.nanmean((indices['Moisture'] + 1) / 2)
-        soil_type_counts = np.bincount(indices['SoilType'].flatten().astype(int))
-        dominant_soil = np.argmax(soil_type_counts)
-        soil_types = ['Sandy', 'Loamy', 'Clayey', 'Organic']
+        soil_types = SOIL_TYPES
         
         # Generate prediction text
         prediction = f"""
@@ -273,191 +221,348 @@ class MultispectralAnalyzer:
         
         return prediction
 
-    def array_to_base64(self, array: np.ndarray, cmap: str = 'viridis') -> str:
-        """Convert numpy array to base64 encoded image"""
-        fig, ax = plt.subplots(figsize=(6, 4))
-        im = ax.imshow(array, cmap=cmap)
-        plt.colorbar(im, ax=ax)
-        ax.axis('off')
+    def store_layer(self, data: bytes) -> Dict[str, Any]:
+        """Write an encoded layer to the layer store and return its reference"""
+        return self.layer_store.put(data, settings.MULTISPECTRAL_IMAGE_FORMAT)
+
+    def iter_tiles(self, src) -> Iterator[Window]:
+        """
+        Yield windows covering the raster, aligned to its internal blocks.
+
+        Tiles are roughly ``tile_size`` square, rounded to whole blocks so each
+        block is decoded once (Landsat COGs use 256/512 pixel blocks; striped
+        files use one-row blocks and get full-width bands of rows).
+        """
+        block_height, block_width = src.block_shapes[0]
+        tile_height = max(block_height, (self.tile_size // block_height) * block_height)
+        tile_width = max(block_width, (self.tile_size // block_width) * block_width)
+        for row in range(0, src.height, tile_height):
+            for col in range(0, src.width, tile_width):
+                yield Window(col, row, min(tile_width, src.width - col), min(tile_height, src.height - row))
+
+    def read_tile(
+        self,
+        sources: Dict[str, Any],
+        window: Window,
+        executor: Optional[Executor] = None
+    ) -> Dict[str, np.ndarray]:
+        """Read one window from every band as float32, one band per thread when an executor is given"""
+        if executor is None:
+            return {code: src.read(1, window=window, out_dtype='float32') for code, src in sources.items()}
+        futures = self._submit_tile(sources, window, executor)
+        return {code: future.result() for code, future in futures.items()}
+
+    def _submit_tile(self, sources: Dict[str, Any], window: Window, executor: Executor) -> Dict[str, Any]:
+        return {code: executor.submit(src.read, 1, window=window, out_dtype='float32') for code, src in sources.items()}
+
+    def iter_tile_reads(
+        self,
+        sources: Dict[str, Any],
+        windows: List[Window],
+        executor: Optional[Executor] = None
+    ) -> Iterator[Tuple[Window, Dict[str, np.ndarray]]]:
+        """
+        Yield (window, tile) pairs, reading the next tile while the caller works on this one.
+
+        GDAL releases the GIL while reading and decompressing, so with an
+        executor the bands of a tile are decoded in parallel and the next
+        tile's reads overlap the current tile's computation. A dataset handle
+        is never read from two threads at once: the next tile is only
+        submitted once the current tile's reads have finished.
+        """
+        if executor is None:
+            for window in windows:
+                yield window, self.read_tile(sources, window)
+            return
+
+        pending = self._submit_tile(sources, windows[0], executor) if windows else None
+        for index, window in enumerate(windows):
+            tile = {code: future.result() for code, future in pending.items()}
+            if index + 1 < len(windows):
+                pending = self._submit_tile(sources, windows[index + 1], executor)
+            yield window, tile
+
+    def process_scene(
+        self,
+        bands: Dict[str, str],
+        mtl_path: str,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compute indices, suitability, the best crop and statistics over the scene tile by tile.
+
+        Memory is bounded by the tile size, not the scene size: only one tile of
+        each band and its derived layers exists at a time (IndexKernel reuses
+        the same float32 buffers for every tile), statistics are
+        accumulated incrementally and only downsampled preview canvases are
+        kept for rendering.
+
+        LST outlier removal needs the scene-wide mean and standard deviation,
+        so the thermal band is streamed once first to collect them.
+
+        Bands are read on ``read_workers`` threads (see iter_tile_reads) inside
+        a rasterio.Env carrying the GDAL cache and decompression thread
+        settings. This is blocking work: call it from a worker thread, not
+        the event loop.
+
+        Args:
+            bands (Dict[str, str]): Band code to file path, including REQUIRED_BANDS
+            mtl_path (str): MTL metadata file (thermal constants)
+            progress (Optional[Callable[[float], None]]): Called with the completed fraction
+
+        Returns:
+            Dict[str, Any]: Scene summary consumed by build_results
+        """
+        constants = self.read_lst_constants(mtl_path)
+        sources = {code: rasterio.open(bands[code]) for code in REQUIRED_BANDS}
+        executor = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="band-read") if self.read_workers > 1 else None
+        try:
+            with rasterio.Env(**self.gdal_options):
+                return self._process_sources(sources, constants, executor, progress)
+        finally:
+            # Outstanding reads must finish before their datasets are closed
+            if executor is not None:
+                executor.shutdown(wait=True)
+            for src in sources.values():
+                src.close()
+
+    def _process_sources(
+        self,
+        sources: Dict[str, Any],
+        constants: Optional[Tuple[float, float, float, float]],
+        executor: Optional[Executor],
+        progress: Optional[Callable[[float], None]]
+    ) -> Dict[str, Any]:
+        reference = sources['B10']
+        shapes = {code: (src.height, src.width) for code, src in sources.items()}
+        if len(set(shapes.values())) != 1:
+            raise ValueError(f"Band dimensions differ: {shapes}")
+        height, width = reference.height, reference.width
+        windows = list(self.iter_tiles(reference))
+        kernel = IndexKernel((max(w.height for w in windows), max(w.width for w in windows)))
+        suitability_kernel = SuitabilityKernel(self.crop_params, kernel.shape)
+        total_steps = len(windows) * (2 if constants is not None else 1)
+        completed = 0
+
+        # Pass 1: scene-wide LST mean/std for outlier removal
+        lst_mean = lst_std = None
+        if constants is not None:
+            count, total, total_sq = 0, 0.0, 0.0
+            for _, tile in self.iter_tile_reads({'B10': reference}, windows, executor):
+                lst = kernel.clipped_lst(tile['B10'], constants)
+                count += lst.size
+                total += float(lst.sum(dtype=np.float64))
+                total_sq += float(np.dot(lst.ravel().astype(np.float64), lst.ravel()))
+                completed += 1
+                if progress:
+                    progress(completed / total_steps)
+            lst_mean = total / count
+            lst_std = math.sqrt(max(total_sq / count - lst_mean ** 2, 0.0))
+
+        # Pass 2: indices, suitability and statistics per tile
+        env_stats = LayerStatistics(LAYER_RANGES)
+        crop_stats = LayerStatistics({crop: SUITABILITY_RANGE for crop in self.crop_params})
+        soil_counts = np.zeros(4, dtype=np.int64)
+        best_crop_counts = np.zeros(len(suitability_kernel.crops), dtype=np.int64)
+        valid_pixels = 0
+        previews = {
+            crop: PreviewCanvas(height, width, self.preview_size) for crop in self.crop_params
+        }
+        previews['SoilType'] = PreviewCanvas(height, width, self.preview_size)
+        previews['BestCrop'] = PreviewCanvas(height, width, self.preview_size)
+
+        for window, tile in self.iter_tile_reads(sources, windows, executor):
+            indices = kernel.compute(tile, constants, lst_mean, lst_std)
+            scores, best = suitability_kernel.compute(indices)
+            suitability = dict(zip(suitability_kernel.crops, scores))
+
+            env_stats.update(indices)
+            crop_stats.update(suitability)
+            soil_counts += np.bincount(indices['SoilType'].ravel().astype(int), minlength=4)[:4]
+            valid_pixels += int(np.count_nonzero(~np.isnan(indices['NDVI'])))
+
+            for crop, score in suitability.items():
+                previews[crop].add(window, score)
+            previews['SoilType'].add(window, indices['SoilType'])
+            previews['BestCrop'].add(window, best)
+            best_valid = best[~np.isnan(best)].astype(np.intp)
+            best_crop_counts += np.bincount(best_valid, minlength=len(best_crop_counts))
+
+            completed += 1
+            if progress:
+                progress(completed / total_steps)
+
+        # Moisture is rescaled linearly to [0, 1], so its mean rescales the same way
+        moisture = env_stats['Moisture']
+        moisture_avg = (moisture.mean + 1) / 2 if moisture.count else float('nan')
+
+        return {
+            "env_stats": env_stats.summaries(),
+            "crop_stats": [
+                {"crop": summary.pop("name"), **summary} for summary in crop_stats.summaries()
+            ],
+            "lst_avg": env_stats['LST'].mean,
+            "moisture_avg": moisture_avg,
+            "soil_counts": soil_counts,
+            "best_crop_counts": dict(zip(suitability_kernel.crops, best_crop_counts.tolist())),
+            "previews": {name: canvas.array for name, canvas in previews.items()},
+            "total_pixels": height * width,
+            "valid_pixels": valid_pixels,
+            "bands_processed": list(REQUIRED_BANDS)
+        }
+
+    def build_results(self, scene: Dict[str, Any]) -> Dict[str, Any]:
+        """Render previews and assemble the API response from a scene summary"""
+        avg_scores = {stats["crop"]: stats["mean"] for stats in scene["crop_stats"]}
+        prediction = self.generate_prediction_from_summary(
+            avg_scores,
+            scene["lst_avg"],
+            scene["moisture_avg"],
+            int(np.argmax(scene["soil_counts"]))
+        )
         
-        # Save to bytes
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        buf.seek(0)
-        plt.close()
+        # Render the downsampled previews into the layer store; results only reference them
+        image_format = settings.MULTISPECTRAL_IMAGE_FORMAT
+        layers = {}
+        suitability_ranges = {}
+        for crop in self.crop_params:
+            preview = scene["previews"][crop]
+            # Each map is scaled to its own range, as imshow did; the range is the colorbar's ticks
+            shown = downsample(preview, settings.MULTISPECTRAL_RENDER_SIZE)
+            valid = shown[~np.isnan(shown)]
+            vmin, vmax = (float(valid.min()), float(valid.max())) if valid.size else (0.0, 1.0)
+            layers[f"suitability_{crop}"] = self.store_layer(
+                render_raster(preview, SUITABILITY_COLORMAP, vmin, vmax, image_format=image_format)
+            )
+            suitability_ranges[crop] = {"min": vmin, "max": vmax}
+        layers["soil_type"] = self.store_layer(
+            render_classes(scene["previews"]['SoilType'], SOIL_LUT, image_format=image_format)
+        )
+        crop_colors = [params['color'] for params in self.crop_params.values()]
+        layers["best_crop"] = self.store_layer(
+            render_classes(scene["previews"]['BestCrop'], palette_lut(crop_colors), image_format=image_format)
+        )
+        best_crop_total = sum(scene["best_crop_counts"].values())
         
-        # Convert to base64
-        img_str = base64.b64encode(buf.getvalue()).decode()
-        return f"data:image/png;base64,{img_str}"
-
-    def get_statistics(self, array: np.ndarray, name: str) -> Dict[str, Any]:
-        """Get statistics for an array"""
-        valid_data = array[~np.isnan(array)]
-        if len(valid_data) == 0:
-            return {
-                "name": name,
-                "min": 0,
-                "max": 0,
-                "mean": 0,
-                "percentile_25": 0,
-                "percentile_75": 0
+        return {
+            "environmental_statistics": scene["env_stats"],
+            "crop_suitability_statistics": scene["crop_stats"],
+            "layers": layers,
+            "image_legends": {
+                "suitability": {
+                    "colormap": SUITABILITY_COLORMAP,
+                    "colorbar_url": COLORBAR_URL.format(name=SUITABILITY_COLORMAP),
+                    "ranges": suitability_ranges
+                },
+                "soil_type": {
+                    "colorbar_url": COLORBAR_URL.format(name="soil"),
+                    "classes": [
+                        {"value": value, "name": name, "color": color}
+                        for value, (name, color) in enumerate(zip(SOIL_TYPES, SOIL_COLORS))
+                    ]
+                },
+                "best_crop": {
+                    "classes": [
+                        {"value": value, "name": crop, "color": color}
+                        for value, (crop, color) in enumerate(zip(self.crop_params, crop_colors))
+                    ]
+                }
+            },
+            # Share of valid pixels where each crop scores highest
+            "best_crop_coverage": {
+                crop: count / best_crop_total if best_crop_total else 0.0
+                for crop, count in scene["best_crop_counts"].items()
+            },
+            "prediction": prediction,
+            "best_crop": max(scene["crop_stats"], key=lambda x: x["mean"])["crop"],
+            "analysis_summary": {
+                "total_pixels": int(scene["total_pixels"]),
+                "valid_pixels": int(scene["valid_pixels"]),
+                "bands_processed": scene["bands_processed"]
             }
-        
+        }
+
+    def limited_analysis(self, mtl_path: str) -> Dict[str, Any]:
+        """Metadata-only analysis for uploads without band files"""
+        logger.warning("No band files found, performing limited analysis")
+        # Parse metadata from the .txt file
+        metadata = {}
+        band_references = {}
+        calibration_constants = {}
+        general_metadata = {}
+        try:
+            with open(mtl_path, 'r') as f:
+                for line in f:
+                    if '=' in line:
+                        key, value = line.split('=', 1)
+                        key = key.strip()
+                        value = value.strip().strip('"')
+                        metadata[key] = value
+                        # Group band references
+                        if key.startswith('FILE_NAME_BAND') or key.startswith('FILE_NAME_'):
+                            band_references[key] = value
+                        # Group calibration constants
+                        elif 'REFLECTANCE_' in key or 'RADIANCE_' in key or 'TEMPERATURE_' in key or 'QUANTIZE_' in key:
+                            calibration_constants[key] = value
+                        else:
+                            general_metadata[key] = value
+        except Exception as e:
+            logger.warning(f"Could not parse metadata from {mtl_path}: {e}")
         return {
-            "name": name,
-            "min": float(np.nanmin(array)),
-            "max": float(np.nanmax(array)),
-            "mean": float(np.nanmean(array)),
-            "percentile_25": float(np.percentile(valid_data, 25)),
-            "percentile_75": float(np.percentile(valid_data, 75))
+            "status": "limited",
+            "message": "No band files found. Only metadata extracted. Full analysis requires band files (.TIF) in the same folder as the .txt file.",
+            "band_references": band_references,
+            "calibration_constants": calibration_constants,
+            "general_metadata": general_metadata,
+            "raw_metadata": metadata
         }
 
-    async def analyze_from_mtl(self, mtl_path: str) -> Dict[str, Any]:
-        """Run complete analysis from MTL file path. If no bands are found, return limited metadata-only analysis."""
+    def scene_bands(self, mtl_path: str) -> Dict[str, str]:
+        """
+        Find the scene's band files next to the MTL file.
+
+        Returns:
+            Dict[str, str]: Band code to path (empty when there are no band files)
+
+        Raises:
+            ValueError: If some bands exist but a required one is missing
+        """
+        # Debug: List all files in the directory
+        base_dir = os.path.dirname(mtl_path)
+        logger.info(f"MTL file path: {mtl_path}")
+        logger.info(f"Base directory: {base_dir}")
+        logger.info("All files in directory:")
+        for file in os.listdir(base_dir):
+            file_path = os.path.join(base_dir, file)
+            if os.path.isfile(file_path):
+                logger.info(f"  - {file} ({os.path.getsize(file_path)} bytes)")
+
+        bands = self.find_band_files(mtl_path)
+        logger.info(f"Found {len(bands)} bands: {list(bands.keys())}")
+        missing = [code for code in REQUIRED_BANDS if code not in bands]
+        if bands and missing:
+            band_code = missing[0]
+            logger.error(f"Missing required band: {band_code} ({REQUIRED_BANDS[band_code]})")
+            logger.error(f"Available bands: {list(bands.keys())}")
+            raise ValueError(f"Missing required band: {band_code} ({REQUIRED_BANDS[band_code]})")
+        return bands
+
+    def analyze(self, mtl_path: str, progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """
+        Run complete analysis from MTL file path, blocking until it is done.
+
+        This is what the analysis worker processes run (see analysis_pool).
+        If no bands are found, return limited metadata-only analysis.
+
+        Args:
+            mtl_path (str): MTL metadata file next to the band files
+            progress (Optional[Callable[[float], None]]): Called with the completed fraction
+        """
         try:
-            # Debug: List all files in the directory
-            base_dir = os.path.dirname(mtl_path)
-            logger.info(f"MTL file path: {mtl_path}")
-            logger.info(f"Base directory: {base_dir}")
-            logger.info("All files in directory:")
-            for file in os.listdir(base_dir):
-                file_path = os.path.join(base_dir, file)
-                if os.path.isfile(file_path):
-                    logger.info(f"  - {file} ({os.path.getsize(file_path)} bytes)")
-            
-            # Load and process bands
-            bands = self.find_band_files(mtl_path)
-            logger.info(f"Found {len(bands)} bands: {list(bands.keys())}")
-
-            required_bands = {'B2': 'Blue', 'B4': 'Red', 'B5': 'NIR', 'B6': 'SWIR', 'B10': 'Thermal'}
-            loaded_bands = {}
-
-            # If no bands found, do limited analysis
+            bands = self.scene_bands(mtl_path)
             if not bands:
-                logger.warning("No band files found, performing limited analysis")
-                # Parse metadata from the .txt file
-                metadata = {}
-                band_references = {}
-                calibration_constants = {}
-                general_metadata = {}
-                try:
-                    with open(mtl_path, 'r') as f:
-                        for line in f:
-                            if '=' in line:
-                                key, value = line.split('=', 1)
-                                key = key.strip()
-                                value = value.strip().strip('"')
-                                metadata[key] = value
-                                # Group band references
-                                if key.startswith('FILE_NAME_BAND') or key.startswith('FILE_NAME_'):
-                                    band_references[key] = value
-                                # Group calibration constants
-                                elif 'REFLECTANCE_' in key or 'RADIANCE_' in key or 'TEMPERATURE_' in key or 'QUANTIZE_' in key:
-                                    calibration_constants[key] = value
-                                else:
-                                    general_metadata[key] = value
-                except Exception as e:
-                    logger.warning(f"Could not parse metadata from {mtl_path}: {e}")
-                return {
-                    "status": "limited",
-                    "message": "No band files found. Only metadata extracted. Full analysis requires band files (.TIF) in the same folder as the .txt file.",
-                    "band_references": band_references,
-                    "calibration_constants": calibration_constants,
-                    "general_metadata": general_metadata,
-                    "raw_metadata": metadata
-                }
-
-            logger.info("Loading required bands...")
-            for band_code, band_name in required_bands.items():
-                if band_code in bands:
-                    loaded_bands[band_code], profile = self.read_band(bands[band_code])
-                    logger.info(f"Loaded {band_name} band ({band_code})")
-                else:
-                    logger.error(f"Missing required band: {band_code} ({band_name})")
-                    logger.error(f"Available bands: {list(bands.keys())}")
-                    raise ValueError(f"Missing required band: {band_code} ({band_name})")
-            
-            # Calculate environmental indices
-            logger.info("Calculating environmental indices...")
-            ndvi = self.compute_ndvi(loaded_bands['B5'], loaded_bands['B4'])
-            lst = self.compute_lst(loaded_bands['B10'], mtl_path)
-            bsi = self.compute_bsi(loaded_bands['B6'], loaded_bands['B4'], loaded_bands['B5'], loaded_bands['B2'])
-            
-            indices = {
-                'NDVI': ndvi,
-                'EVI': self.compute_evi(loaded_bands['B5'], loaded_bands['B4'], loaded_bands['B2']),
-                'SAVI': self.compute_savi(loaded_bands['B5'], loaded_bands['B4']),
-                'NDMI': self.compute_ndmi(loaded_bands['B5'], loaded_bands['B6']),
-                'NDBI': self.compute_ndbi(loaded_bands['B6'], loaded_bands['B5']),
-                'BSI': bsi,
-                'Carbon': self.compute_carbon(ndvi, lst),
-                'Methane': self.compute_methane(ndvi, self.compute_ndbi(loaded_bands['B6'], loaded_bands['B5'])),
-                'Moisture': self.compute_moisture(ndvi, self.compute_ndmi(loaded_bands['B5'], loaded_bands['B6'])),
-                'LST': lst,
-                'SoilType': self.compute_soil_type(bsi, ndvi)
-            }
-            
-            # Perform crop suitability analysis
-            logger.info("Assessing crop suitability...")
-            suitability = self.calculate_suitability(indices)
-            
-            # Generate prediction
-            prediction = self.generate_prediction(suitability, indices)
-            
-            # Prepare results
-            env_stats = []
-            for name, array in indices.items():
-                if name != 'SoilType':
-                    env_stats.append(self.get_statistics(array, name))
-            
-            crop_stats = []
-            for crop in suitability:
-                score = suitability[crop]
-                crop_stats.append({
-                    "crop": crop,
-                    "min": float(np.nanmin(score)),
-                    "max": float(np.nanmax(score)),
-                    "mean": float(np.nanmean(score)),
-                    "percentile_25": float(np.percentile(score[~np.isnan(score)], 25)),
-                    "percentile_75": float(np.percentile(score[~np.isnan(score)], 75))
-                })
-            
-            # Generate visualization images
-            suitability_images = {}
-            for crop, score in suitability.items():
-                suitability_images[crop] = self.array_to_base64(score, 'RdYlGn')
-            
-            # Soil type visualization
-            soil_colors = ['#F4E3AF', '#D2B48C', '#8B4513', '#556B2F']  # Sandy, Loamy, Clayey, Organic
-            cmap_soil = LinearSegmentedColormap.from_list('soil_cmap', soil_colors, N=4)
-            
-            fig, ax = plt.subplots(figsize=(6, 4))
-            soil_plot = ax.imshow(indices['SoilType'], cmap=cmap_soil, vmin=0, vmax=3)
-            ax.set_title("Soil Type Distribution")
-            plt.colorbar(soil_plot, ax=ax, ticks=[0.375, 1.125, 1.875, 2.625])
-            ax.axis('off')
-            
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-            buf.seek(0)
-            plt.close()
-            
-            soil_image = f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode()}"
-            
-            return {
-                "environmental_statistics": env_stats,
-                "crop_suitability_statistics": crop_stats,
-                "suitability_images": suitability_images,
-                "soil_type_image": soil_image,
-                "prediction": prediction,
-                "best_crop": max(crop_stats, key=lambda x: x["mean"])["crop"],
-                "analysis_summary": {
-                    "total_pixels": int(ndvi.size),
-                    "valid_pixels": int(np.sum(~np.isnan(ndvi))),
-                    "bands_processed": list(loaded_bands.keys())
-                }
-            }
-            
+                return self.limited_analysis(mtl_path)
+            return self.build_results(self.process_scene(bands, mtl_path, progress))
         except Exception as e:
             logger.error(f"Error during multispectral analysis: {str(e)}")
-            raise e 
\ No newline at end of file
+            raise e
@@ -0,0 +1,89 @@
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models.schemas import PredictionItem
+from app.services.cache import LayeredCache
+from app.services.prediction_service import PredictionService, prediction_service
+
+logger = logging.getLogger(__name__)
+
+class PredictionResultCache:
+    """
+    Content-addressed cache of top-k predictions keyed by the uploaded bytes.
+
+    Keys are a BLAKE2b digest of the raw upload plus ``top_k`` and the model
+    version, so a re-uploaded or retried photo skips decoding and inference.
+    Keying on the model version keeps entries from a previous model out of
+    reach in the shared store; the local layer is also dropped whenever the
+    model reloads.
+    """
+
+    def __init__(
+        self,
+        service: PredictionService,
+        enabled: bool = settings.PREDICTION_CACHE_ENABLED,
+        max_entries: int = settings.PREDICTION_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = settings.PREDICTION_CACHE_TTL_SECONDS,
+        shared: bool = settings.PREDICTION_CACHE_SHARED
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            service (PredictionService): Service whose model versions key the cache
+            enabled (bool): When False, every lookup misses and nothing is stored
+            max_entries (int): Maximum results kept in process
+            ttl_seconds (int): Seconds a result stays valid
+            shared (bool): Also store results in MongoDB for other workers
+        """
+        self.service = service
+        self.enabled = enabled
+        self.cache = LayeredCache("predictions", max_entries, ttl_seconds, shared)
+        service.add_reload_listener(self.invalidate)
+
+    @staticmethod
+    def hash_image(image_data: bytes) -> str:
+        """Content hash of the raw upload bytes"""
+        return hashlib.blake2b(image_data, digest_size=20).hexdigest()
+
+    def make_key(self, image_hash: str, top_k: int) -> str:
+        return f"{self.service.model_version}:{top_k}:{image_hash}"
+
+    async def get(self, image_hash: str, top_k: int) -> Optional[List[PredictionItem]]:
+        """Get cached predictions for an upload hash, or None"""
+        if not self.enabled or self.service.model_version is None:
+            return None
+        cached = await self.cache.get(self.make_key(image_hash, top_k))
+        if cached is None:
+            return None
+        return [PredictionItem(**item) for item in cached]
+
+    async def set(self, image_hash: str, top_k: int, predictions: List[PredictionItem]) -> None:
+        """Store predictions for an upload hash"""
+        if not self.enabled or self.service.model_version is None:
+            return
+        # Plain dicts so entries are BSON-serializable for the shared store
+        await self.cache.set(
+            self.make_key(image_hash, top_k),
+            [item.model_dump(by_alias=True) for item in predictions]
+        )
+
+    def invalidate(self, service: Optional[PredictionService] = None) -> None:
+        """Drop locally cached results (registered as a model reload listener)"""
+        self.cache.clear_local()
+        logger.info("Prediction cache invalidated after model reload")
+
+    async def clear(self) -> None:
+        """Drop cached results from every layer"""
+        await self.cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.cache.get_stats()
+        stats["enabled"] = self.enabled
+        stats["model_version"] = self.service.model_version
+        return stats
+
+# Global result cache in front of the shared prediction service
+prediction_cache = PredictionResultCache(prediction_service)
@@ -1,19 +1,107 @@
 import onnxruntime
 import numpy as np
 import cv2
-import albumentations as A
-from albumentations.pytorch import ToTensorV2
 from PIL import Image
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable
+import hashlib
+import json
 import os
+import threading
 import time
 
 from app.config import settings, IDX_TO_CLASS
 from app.models.schemas import PredictionItem
+from app.services.model_health import ModelHealthMonitor
 
 logger = logging.getLogger(__name__)
 
+# ImageNet statistics the EfficientNetV2 classifier was trained with
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+def create_session_options(
+    graph_optimization_level: str = settings.ORT_GRAPH_OPTIMIZATION_LEVEL,
+    intra_op_num_threads: int = settings.ORT_INTRA_OP_NUM_THREADS,
+    inter_op_num_threads: int = settings.ORT_INTER_OP_NUM_THREADS,
+    execution_mode: str = settings.ORT_EXECUTION_MODE,
+    enable_cpu_mem_arena: bool = settings.ORT_ENABLE_CPU_MEM_ARENA,
+    enable_mem_pattern: bool = settings.ORT_ENABLE_MEM_PATTERN
+) -> onnxruntime.SessionOptions:
+    """
+    Build ONNX Runtime session options from settings (or explicit overrides).
+    
+    Args:
+        graph_optimization_level (str): disabled, basic, extended or all
+        intra_op_num_threads (int): Threads used inside an operator (0 = ORT default)
+        inter_op_num_threads (int): Threads used across operators (0 = ORT default)
+        execution_mode (str): sequential or parallel
+        enable_cpu_mem_arena (bool): Use the CPU memory arena allocator
+        enable_mem_pattern (bool): Pre-plan memory from the first run's allocation pattern
+        
+    Returns:
+        onnxruntime.SessionOptions: Configured session options
+        
+    Raises:
+        ValueError: If an optimization level or execution mode is unknown
+    """
+    level = graph_optimization_level.lower()
+    mode = execution_mode.lower()
+    if level not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {graph_optimization_level}")
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {execution_mode}")
+    
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[level]
+    options.execution_mode = EXECUTION_MODES[mode]
+    options.intra_op_num_threads = max(0, intra_op_num_threads)
+    options.inter_op_num_threads = max(0, inter_op_num_threads)
+    options.enable_cpu_mem_arena = enable_cpu_mem_arena
+    options.enable_mem_pattern = enable_mem_pattern
+    return options
+
+MODEL_VARIANTS = ("fp32", "int8-dynamic", "int8-static", "fp16")
+
+def resolve_model_path(variant: Optional[str] = None, base_path: Optional[str] = None) -> str:
+    """
+    Resolve the on-disk path of a model variant.
+    
+    Quantized variants live next to the FP32 model with the variant name
+    inserted before the extension (pharmiq/phamiq.onnx ->
+    pharmiq/phamiq.int8-static.onnx).
+    
+    Args:
+        variant (Optional[str]): Model variant (defaults to settings.MODEL_VARIANT)
+        base_path (Optional[str]): FP32 model path (defaults to settings.MODEL_PATH)
+        
+    Returns:
+        str: Path to the variant's ONNX file
+        
+    Raises:
+        ValueError: If the variant is unknown
+    """
+    variant = (variant or settings.MODEL_VARIANT).lower()
+    base_path = base_path or settings.MODEL_PATH
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant} (expected one of {', '.join(MODEL_VARIANTS)})")
+    if variant == "fp32":
+        return base_path
+    root, ext = os.path.splitext(base_path)
+    return f"{root}.{variant}{ext or '.onnx'}"
+
 class PredictionService:
     """
     Service for handling model predictions with robust caching and error handling.
@@ -38,43 +126,53 @@ class PredictionService:
             max_retries (int): Maximum number of retry attempts for model loading
         """
         self.ort_session: Optional[onnxruntime.InferenceSession] = None
-        self.transforms = self._create_transforms()
+        self._norm_scale, self._norm_bias = self._create_normalization()
+        self._buffers = threading.local()
         self.max_retries = max_retries
         self.model_loaded = False
+        self.model_path: Optional[str] = None
+        self.model_version: Optional[str] = None
         self.last_load_attempt = None
+        self._reload_listeners: List[Callable[["PredictionService"], None]] = []
+        self.health_monitor = ModelHealthMonitor(self)
         
         # Auto-load model if requested (default behavior)
         if auto_load:
             self.load_model()
     
-    def _create_transforms(self) -> A.Compose:
+    def _create_normalization(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Create the fused normalization constants for inference preprocessing.
+        
+        Normalizing a uint8 pixel to ImageNet statistics is
+        ``(pixel / 255 - mean) / std``, which folds into a single multiply-add
+        ``pixel * scale + bias``. The constants are shaped (3, 1, 1) so they
+        broadcast over a CHW tensor.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Per-channel float32 scale and bias
+        """
+        mean = np.asarray(IMAGENET_MEAN, dtype=np.float32)
+        std = np.asarray(IMAGENET_STD, dtype=np.float32)
+        scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        bias = (-mean / std).reshape(3, 1, 1)
+        return scale.astype(np.float32), bias.astype(np.float32)
+    
+    def _get_input_buffer(self) -> np.ndarray:
         """
-        Create image transformation pipeline for model preprocessing.
+        Get the preallocated NCHW input buffer for the calling thread.
         
-        This pipeline includes:
-        - Data augmentation for robustness
-        - Normalization to match training data
-        - Tensor conversion for ONNX compatibility
+        Each thread owns one (1, 3, IMAGE_SIZE, IMAGE_SIZE) float32 buffer so
+        concurrent requests never overwrite each other's input tensor.
         
         Returns:
-            A.Compose: Albumentations transformation pipeline
-        """
-        return A.Compose([
-            # Data augmentation for better generalization
-            A.ShiftScaleRotate(
-                shift_limit=0.05, 
-                scale_limit=0.05, 
-                rotate_limit=360, 
-                p=0.5
-            ),
-            # Normalize to ImageNet statistics (standard for most pre-trained models)
-            A.Normalize(
-                mean=(0.485, 0.456, 0.406), 
-                std=(0.229, 0.224, 0.225)
-            ),
-            # Convert to PyTorch tensor format
-            ToTensorV2(),
-        ])
+            np.ndarray: Reusable float32 input buffer
+        """
+        buffer = getattr(self._buffers, "input", None)
+        if buffer is None:
+            buffer = np.empty((1, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE), dtype=np.float32)
+            self._buffers.input = buffer
+        return buffer
     
     def load_model(self, force_reload: bool = False) -> None:
         """
@@ -106,12 +204,14 @@ class PredictionService:
                 logger.info(f"Model loading attempt {attempt + 1}/{self.max_retries}")
                 
                 # Check if model file exists
-                if not os.path.exists(settings.MODEL_PATH):
-                    raise FileNotFoundError(f"Model file not found: {settings.MODEL_PATH}")
+                model_path = resolve_model_path()
+                if not os.path.exists(model_path):
+                    raise FileNotFoundError(f"Model file not found: {model_path}")
                 
-                # Load the ONNX model
-                self.ort_session = onnxruntime.InferenceSession(settings.MODEL_PATH)
-                logger.info(f"Model loaded successfully from {settings.MODEL_PATH}")
+                # Load the ONNX model with the configured session options
+                self.ort_session = self._create_session(model_path)
+                self.model_path = model_path
+                logger.info(f"Model loaded successfully from {model_path} (variant: {settings.MODEL_VARIANT})")
                 
                 # Log model details for debugging
                 if self.ort_session is not None:
@@ -125,8 +225,10 @@ class PredictionService:
                 
                 # Update status
                 self.model_loaded = True
+                self.model_version = self._model_version(model_path)
                 self.last_load_attempt = time.time()
-                logger.info("Model loading completed successfully")
+                logger.info(f"Model loading completed successfully (version: {self.model_version})")
+                self._notify_reload_listeners()
                 break
                 
             except Exception as e:
@@ -142,6 +244,106 @@ class PredictionService:
                 logger.warning(f"Retrying in {wait_time} seconds...")
                 time.sleep(wait_time)
     
+    def add_reload_listener(self, callback: Callable[["PredictionService"], None]) -> None:
+        """
+        Register a callback invoked after every successful (re)load.
+        
+        Used to invalidate caches of model outputs. Callbacks may run on the
+        event loop or on an executor thread, so they must be thread-safe and
+        must not block.
+        
+        Args:
+            callback (Callable[[PredictionService], None]): Called with this service
+        """
+        self._reload_listeners.append(callback)
+    
+    def _notify_reload_listeners(self) -> None:
+        """Run reload callbacks; a failing callback never fails the load"""
+        for callback in self._reload_listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Model reload listener failed: {str(e)}")
+    
+    def _model_version(self, model_path: str) -> str:
+        """
+        Fingerprint the loaded model file.
+        
+        Derived from the file's path, size and modification time rather than
+        a load counter, so every worker process serving the same file agrees
+        on the version (shared caches key results by it).
+        """
+        stat = os.stat(model_path)
+        identity = f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}:{settings.MODEL_VARIANT}"
+        return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+    
+    def _optimized_model_signature(self, model_path: str) -> Dict[str, Any]:
+        """
+        Describe what an optimized graph was built from.
+        
+        The cached graph is only reused while the source model, optimization
+        level and ONNX Runtime version are unchanged.
+        """
+        stat = os.stat(model_path)
+        return {
+            "source_path": os.path.abspath(model_path),
+            "source_size": stat.st_size,
+            "source_mtime": stat.st_mtime,
+            "graph_optimization_level": settings.ORT_GRAPH_OPTIMIZATION_LEVEL.lower(),
+            "onnxruntime_version": onnxruntime.__version__
+        }
+    
+    def _create_session(self, model_path: str) -> onnxruntime.InferenceSession:
+        """
+        Create an inference session, reusing a serialized optimized graph if possible.
+        
+        On first load with ORT_OPTIMIZED_MODEL_PATH set, ONNX Runtime writes
+        the optimized graph next to a small signature file. Later boots load
+        that graph directly with graph optimizations disabled, skipping the
+        optimization passes.
+        
+        Args:
+            model_path (str): Path to the source ONNX model
+            
+        Returns:
+            onnxruntime.InferenceSession: Ready-to-run session
+        """
+        options = create_session_options()
+        optimized_path = settings.ORT_OPTIMIZED_MODEL_PATH
+        if not optimized_path:
+            return onnxruntime.InferenceSession(model_path, sess_options=options)
+        
+        signature = self._optimized_model_signature(model_path)
+        signature_path = f"{optimized_path}.json"
+        try:
+            with open(signature_path, "r") as f:
+                cached_signature = json.load(f)
+        except (OSError, ValueError):
+            cached_signature = None
+        
+        if cached_signature == signature and os.path.exists(optimized_path):
+            try:
+                cached_options = create_session_options(graph_optimization_level="disabled")
+                session = onnxruntime.InferenceSession(optimized_path, sess_options=cached_options)
+                logger.info(f"Loaded pre-optimized model from {optimized_path}")
+                return session
+            except Exception as e:
+                logger.warning(f"Could not load optimized model {optimized_path}, rebuilding: {str(e)}")
+        
+        # Optimize the source model and serialize the result for the next boot
+        optimized_dir = os.path.dirname(optimized_path)
+        if optimized_dir:
+            os.makedirs(optimized_dir, exist_ok=True)
+        options.optimized_model_filepath = optimized_path
+        session = onnxruntime.InferenceSession(model_path, sess_options=options)
+        try:
+            with open(signature_path, "w") as f:
+                json.dump(signature, f)
+            logger.info(f"Saved optimized model to {optimized_path}")
+        except OSError as e:
+            logger.warning(f"Could not write optimized model signature {signature_path}: {str(e)}")
+        return session
+    
     def validate_model(self) -> bool:
         """
         Validate that the loaded model is working correctly.
@@ -200,42 +402,29 @@ class PredictionService:
     
     def reload_model_if_needed(self) -> None:
         """
-        Reload the model if it's not loaded or if it's been too long since last load.
+        Reload the model if it's not loaded, too old, or failing validation.
         
-        This method implements a smart reload strategy:
-        - Reload if model is not loaded
-        - Reload if model validation fails
-        - Optionally reload after a certain time period (for long-running services)
+        This runs a full validation inference, so it must stay off the request
+        path; the background ModelHealthMonitor calls it on a schedule.
         """
-        if not self.is_model_loaded():
-            logger.info("Model not loaded, attempting to load...")
-            self.load_model()
-            return
-        
-        # Optional: Reload if model is old (e.g., > 24 hours)
-        # This can be useful for long-running services to handle potential memory issues
-        if self.last_load_attempt and (time.time() - self.last_load_attempt) > 86400:  # 24 hours
-            logger.info("Model is old, reloading for freshness...")
-            self.load_model(force_reload=True)
-            return
-        
-        # Validate current model
-        if not self.validate_model():
-            logger.warning("Model validation failed, reloading...")
-            self.load_model(force_reload=True)
+        self.health_monitor.check_now()
     
-    def preprocess_image(self, image_array: np.ndarray) -> np.ndarray:
+    def preprocess_image(self, image_array: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Preprocess image for model input.
         
-        This method handles various image formats and applies the transformation pipeline:
+        This is the deterministic inference pipeline (the random augmentation
+        used during training is intentionally not applied):
         1. Convert to RGB format if needed
         2. Resize to model input size
-        3. Apply data augmentation and normalization
-        4. Convert to tensor format
+        3. Normalize and transpose HWC -> CHW in one fused step, writing
+           straight into a float32 NCHW buffer
         
         Args:
             image_array (np.ndarray): Input image as numpy array
+            out (Optional[np.ndarray]): Destination of shape (1, 3, H, W) or
+                (3, H, W). Defaults to the calling thread's preallocated
+                buffer, which is reused by the next call on the same thread.
             
         Returns:
             np.ndarray: Preprocessed image ready for model inference
@@ -259,22 +448,127 @@ class PredictionService:
                 image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
             
             # Resize to model input size
-            image_resized = cv2.resize(image_array, (settings.IMAGE_SIZE, settings.IMAGE_SIZE))
+            image_resized = cv2.resize(
+                image_array,
+                (settings.IMAGE_SIZE, settings.IMAGE_SIZE),
+                interpolation=cv2.INTER_LINEAR
+            )
             
-            # Apply transforms (augmentation, normalization, tensor conversion)
-            transformed = self.transforms(image=image_resized)
-            return transformed["image"].unsqueeze(0).numpy()
+            if out is None:
+                out = self._get_input_buffer()
+            chw_out = out[0] if out.ndim == 4 else out
+            
+            # Fused normalize + HWC -> CHW: the transposed uint8 view is cast
+            # and scaled directly into the float32 destination
+            np.multiply(image_resized.transpose(2, 0, 1), self._norm_scale, out=chw_out)
+            np.add(chw_out, self._norm_bias, out=chw_out)
+            return out
         
         except Exception as e:
             logger.error(f"Error in preprocessing: {str(e)}")
             raise ValueError(f"Image preprocessing failed: {str(e)}")
     
+    def get_max_batch_size(self) -> Optional[int]:
+        """
+        Get the batch size limit imposed by the model's input signature.
+        
+        Returns:
+            Optional[int]: Fixed batch dimension of the model, or None if dynamic
+        """
+        if self.ort_session is None:
+            return None
+        batch_dim = self.ort_session.get_inputs()[0].shape[0]
+        return batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else None
+    
+    def run_inference(self, input_data: np.ndarray) -> np.ndarray:
+        """
+        Run the ONNX model on a preprocessed NCHW batch.
+        
+        Inference outcomes are reported to the health monitor so repeated
+        failures trigger a background validation.
+        
+        Args:
+            input_data (np.ndarray): float32 tensor of shape (N, 3, H, W)
+            
+        Returns:
+            np.ndarray: Raw logits of shape (N, num_classes)
+            
+        Raises:
+            RuntimeError: If the model is not available or the session is malformed
+        """
+        # Cheap loaded check only; validation and reloads happen in the
+        # background health monitor
+        if not self.is_model_loaded():
+            raise RuntimeError("Model not loaded")
+        
+        # Run inference safely with comprehensive error checking
+        if self.ort_session is None:
+            raise RuntimeError("ONNX Runtime session is not initialized.")
+        
+        if not hasattr(self.ort_session, "get_inputs") or not hasattr(self.ort_session, "run"):
+            raise RuntimeError("ONNX Runtime session does not have required methods.")
+
+        ort_inputs_list = self.ort_session.get_inputs()
+        if not ort_inputs_list or not hasattr(ort_inputs_list[0], "name"):
+            raise RuntimeError("ONNX model input details are missing or malformed.")
+
+        # Prepare inputs and run inference
+        ort_inputs = {ort_inputs_list[0].name: input_data}
+        try:
+            ort_outs = self.ort_session.run(None, ort_inputs)
+        except Exception as e:
+            self.health_monitor.record_failure(e)
+            raise
+        self.health_monitor.record_success()
+        return ort_outs[0]
+    
+    def logits_to_predictions(self, logits: np.ndarray, top_k: int = 3) -> List[PredictionItem]:
+        """
+        Convert one row of model logits to top-k predictions.
+        
+        Args:
+            logits (np.ndarray): Logits for a single image, shape (num_classes,)
+            top_k (int): Number of top predictions to return
+            
+        Returns:
+            List[PredictionItem]: List of top-k predictions with confidence scores
+        """
+        # Apply softmax to get probabilities (shifted by the max for stability)
+        exp = np.exp(logits - np.max(logits))
+        probs = exp / np.sum(exp)
+        
+        # Get top-k predictions
+        top_k_idx = np.argsort(probs)[-top_k:][::-1]
+        
+        predictions = []
+        for i in top_k_idx:
+            # Validate that the index exists in IDX_TO_CLASS
+            if i not in IDX_TO_CLASS:
+                logger.error(f"Invalid class index: {i}, max index: {len(IDX_TO_CLASS)-1}")
+                continue
+            
+            class_name = IDX_TO_CLASS[i]
+            confidence = float(probs[i])
+            
+            # Validate class name
+            if not class_name or not isinstance(class_name, str):
+                logger.error(f"Invalid class name for index {i}: {class_name}")
+                continue
+            
+            predictions.append(PredictionItem(
+                class_name=class_name,  # Field name is class_name, but serializes to 'class'
+                confidence=confidence,
+                confidence_percentage=f"{confidence:.2%}"
+            ))
+        
+        return predictions
+    
     def predict(self, image_array: np.ndarray, top_k: int = 3) -> List[PredictionItem]:
         """
         Make prediction on image with robust error handling.
         
-        This method ensures the model is loaded and working before making predictions:
-        1. Check and reload model if needed
+        This method keeps the hot path to a single forward pass:
+        1. Check the cheap model-loaded flag (health is monitored in the background)
         2. Preprocess the input image
         3. Run inference with error handling
         4. Process and validate outputs
@@ -292,60 +586,15 @@ class PredictionService:
             ValueError: If prediction processing fails
         """
         try:
-            # Ensure model is loaded and working
-            self.reload_model_if_needed()
-            
             if not self.is_model_loaded():
-                raise RuntimeError("Model not loaded and cannot be loaded")
+                raise RuntimeError("Model not loaded")
             
             # Preprocess image
             input_data = self.preprocess_image(image_array)
             
-            # Run inference safely with comprehensive error checking
-            if self.ort_session is None:
-                raise RuntimeError("ONNX Runtime session is not initialized.")
-            
-            if not hasattr(self.ort_session, "get_inputs") or not hasattr(self.ort_session, "run"):
-                raise RuntimeError("ONNX Runtime session does not have required methods.")
-
-            ort_inputs_list = self.ort_session.get_inputs()
-            if not ort_inputs_list or not hasattr(ort_inputs_list[0], "name"):
-                raise RuntimeError("ONNX model input details are missing or malformed.")
-
-            # Prepare inputs and run inference
-            ort_inputs = {ort_inputs_list[0].name: input_data}
-            ort_outs = self.ort_session.run(None, ort_inputs)
-
-            # Process outputs
-            outputs = ort_outs[0]
-            
-            # Apply softmax to get probabilities
-            probs = np.exp(outputs) / np.sum(np.exp(outputs), axis=1, keepdims=True)
-            probs = probs[0]
-            
-            # Get top-k predictions
-            top_k_idx = np.argsort(probs)[-top_k:][::-1]
-            
-            predictions = []
-            for i in top_k_idx:
-                # Validate that the index exists in IDX_TO_CLASS
-                if i not in IDX_TO_CLASS:
-                    logger.error(f"Invalid class index: {i}, max index: {len(IDX_TO_CLASS)-1}")
-                    continue
-                
-                class_name = IDX_TO_CLASS[i]
-                confidence = float(probs[i])
-                
-                # Validate class name
-                if not class_name or not isinstance(class_name, str):
-                    logger.error(f"Invalid class name for index {i}: {class_name}")
-                    continue
-                
-                predictions.append(PredictionItem(
-                    class_name=class_name,  # Field name is class_name, but serializes to 'class'
-                    confidence=confidence,
-                    confidence_percentage=f"{confidence:.2%}"
-                ))
+            # Run inference and process outputs
+            outputs = self.run_inference(input_data)
+            predictions = self.logits_to_predictions(outputs[0], top_k)
             
             logger.info(f"Successfully generated {len(predictions)} predictions")
             return predictions
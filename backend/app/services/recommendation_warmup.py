@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings, IDX_TO_CLASS
+from app.models.database import RecommendationModel
+from app.services.alleai_service import AlleAIService, alleai_service
+
+logger = logging.getLogger(__name__)
+
+CROP_TYPES = ("Cashew", "Cassava", "Maize", "Tomato")
+
+def crop_type_from_class(disease_name: str) -> str:
+    """Extract the crop type from a predicted class name"""
+    lower_disease = (disease_name or "").lower()
+    for crop in CROP_TYPES:
+        if crop.lower() in lower_disease:
+            return crop
+    return "Unknown Crop"
+
+def warmup_targets(bucket: float = settings.RECOMMENDATIONS_CONFIDENCE_BUCKET) -> List[Tuple[str, float, str]]:
+    """
+    Every (class name, confidence, crop type) the recommendations cache can be asked for.
+
+    One entry per class in IDX_TO_CLASS and confidence band, prompted with
+    the middle of the band (0.5 when confidence is not part of the key).
+
+    Args:
+        bucket (float): Width of a confidence band (RECOMMENDATIONS_CONFIDENCE_BUCKET)
+
+    Returns:
+        List[Tuple[str, float, str]]: The targets to warm
+    """
+    if bucket <= 0:
+        confidences = [0.5]
+    else:
+        confidences = []
+        low = 0.0
+        while low < 1.0 - 1e-9:
+            high = min(low + bucket, 1.0)
+            confidences.append(round((low + high) / 2, 6))
+            low = high
+    return [
+        (class_name, confidence, crop_type_from_class(class_name))
+        for class_name in IDX_TO_CLASS.values()
+        for confidence in confidences
+    ]
+
+class RecommendationWarmer:
+    """
+    Background job keeping LLM recommendations for every known class ready.
+
+    Each pass:
+    - loads the recommendations persisted in MongoDB into the cache, so a
+      fresh worker answers /predict without an LLM call
+    - regenerates the entries that are missing or older than
+      ``refresh_after_seconds`` with at most ``concurrency`` LLM calls at
+      once, persisting and caching each one. Older entries keep being
+      served until their replacement is ready (stale-while-revalidate).
+
+    Passes run at startup and then every ``interval_seconds`` (or
+    ``retry_seconds`` after an LLM failure). With several workers, each
+    entry is regenerated by whichever worker claims it first
+    (RecommendationModel.claim_refresh); the others pick it up on their
+    next pass or on a cache miss.
+    """
+
+    def __init__(
+        self,
+        service: AlleAIService,
+        concurrency: int = settings.RECOMMENDATIONS_WARMUP_CONCURRENCY,
+        interval_seconds: float = settings.RECOMMENDATIONS_WARMUP_INTERVAL_SECONDS,
+        retry_seconds: float = settings.RECOMMENDATIONS_WARMUP_RETRY_SECONDS,
+        refresh_after_seconds: float = settings.RECOMMENDATIONS_REFRESH_AFTER_SECONDS,
+        lease_seconds: float = settings.RECOMMENDATIONS_REFRESH_LEASE_SECONDS
+    ):
+        """
+        Initialize the warmer.
+
+        Args:
+            service (AlleAIService): Service that generates and caches recommendations
+            concurrency (int): Concurrent LLM calls during a pass
+            interval_seconds (float): Seconds between passes
+            retry_seconds (float): Seconds before the next pass when generation failed
+            refresh_after_seconds (float): Age at which an entry is regenerated
+            lease_seconds (float): How long a claim to regenerate an entry lasts
+        """
+        self.service = service
+        self.concurrency = max(1, concurrency)
+        self.interval_seconds = interval_seconds
+        self.retry_seconds = retry_seconds
+        self.refresh_after_seconds = refresh_after_seconds
+        self.lease_seconds = lease_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        # When this process last generated each key, for running without a database
+        self._generated_at: Dict[str, datetime] = {}
+        self._passes = 0
+        self._last_pass_at: Optional[float] = None
+        self._last_pass: Optional[Dict[str, int]] = None
+
+    async def start(self) -> None:
+        """Start the background warm-up loop on the running event loop"""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Recommendation warm-up started ({len(warmup_targets())} targets, "
+            f"concurrency {self.concurrency}, refresh after {self.refresh_after_seconds}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the background warm-up loop"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Recommendation warm-up stopped")
+
+    async def _run(self) -> None:
+        while True:
+            delay = self.interval_seconds
+            try:
+                summary = await self.run_once()
+                if summary["failed"]:
+                    delay = self.retry_seconds
+            except Exception as e:
+                logger.error(f"Recommendation warm-up pass crashed: {str(e)}")
+                delay = self.retry_seconds
+            await asyncio.sleep(delay)
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Run one warm-up pass.
+
+        Returns:
+            Dict[str, int]: Entries loaded from the store, refreshed, failed, and
+            left to other workers
+        """
+        summary = {"loaded": 0, "refreshed": 0, "failed": 0, "claimed_elsewhere": 0}
+        if not self.service.is_available():
+            logger.warning("LLM service not available, skipping recommendation warm-up")
+            return summary
+
+        targets = warmup_targets()
+        started = time.perf_counter()
+        persisted = {document.id: document for document in await RecommendationModel.find_all()}
+        stale_before = datetime.utcnow() - timedelta(seconds=self.refresh_after_seconds)
+        due = []
+        for disease_name, confidence, crop_type in targets:
+            key = self.service.recommendations_cache_key(disease_name, confidence, crop_type)
+            document = persisted.get(key)
+            if document is not None:
+                await self.service.store_disease_recommendations(disease_name, confidence, crop_type, document.value)
+                summary["loaded"] += 1
+            generated_at = max(
+                document.generated_at if document is not None else datetime.min,
+                self._generated_at.get(key, datetime.min)
+            )
+            if generated_at < stale_before:
+                due.append((key, disease_name, confidence, crop_type))
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(key: str, disease_name: str, confidence: float, crop_type: str) -> None:
+            async with slots:
+                if not await RecommendationModel.claim_refresh(key, stale_before, self.lease_seconds):
+                    summary["claimed_elsewhere"] += 1
+                    return
+                recommendations, is_fallback = await self.service.generate_disease_recommendations(
+                    disease_name, confidence, crop_type
+                )
+                if is_fallback:
+                    # Keep serving the previous entry, if any, and retry on the next pass
+                    summary["failed"] += 1
+                    await RecommendationModel.release_claim(key)
+                    return
+                await RecommendationModel.save(key, disease_name, crop_type, confidence, recommendations)
+                await self.service.store_disease_recommendations(disease_name, confidence, crop_type, recommendations)
+                self._generated_at[key] = datetime.utcnow()
+                summary["refreshed"] += 1
+
+        await asyncio.gather(*[refresh(*target) for target in due])
+
+        self._passes += 1
+        self._last_pass_at = time.time()
+        self._last_pass = summary
+        logger.info(
+            f"Recommendation warm-up pass: {summary['loaded']} loaded, {summary['refreshed']} refreshed, "
+            f"{summary['failed']} failed, {summary['claimed_elsewhere']} left to other workers "
+            f"({time.perf_counter() - started:.1f}s)"
+        )
+        return summary
+
+    def forget_generated(self) -> None:
+        """Treat every entry as never generated, so the next pass regenerates them all"""
+        self._generated_at.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the warm-up state for the cache stats endpoint"""
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "targets": len(warmup_targets()),
+            "concurrency": self.concurrency,
+            "interval_seconds": self.interval_seconds,
+            "refresh_after_seconds": self.refresh_after_seconds,
+            "passes": self._passes,
+            "last_pass_at": self._last_pass_at,
+            "last_pass": self._last_pass
+        }
+
+# Global warmer for the shared AlleAI service
+recommendation_warmer = RecommendationWarmer(alleai_service)
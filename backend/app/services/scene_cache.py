@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.services.multispectral_service import REQUIRED_BANDS, MultispectralAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis output changes for identical inputs and parameters
+SCENE_CACHE_VERSION = 4
+
+class SceneResultCache:
+    """
+    On-disk cache of complete multispectral analysis results.
+
+    Entries are JSON files named ``<product_id>__<params_hash>__<content_hash>``:
+
+    - product_id comes from the MTL file name (MultispectralAnalyzer.product_id)
+    - content_hash is a BLAKE2b digest of the MTL file and the required band
+      files, so a re-upload of the same product hits while a reprocessed or
+      truncated one does not
+    - params_hash covers crop_params, the preview size and
+      SCENE_CACHE_VERSION, so changing crop parameters makes old entries
+      unreachable; invalidate(stale_only=True) then reclaims their space
+
+    Each entry holds the statistics, suitability summaries and references
+    to the rendered layers in the analyzer's LayerStore, so a hit skips the
+    analysis entirely; an entry whose layers were pruned counts as a miss. The directory is bounded to
+    ``max_bytes``: reads refresh an entry's mtime and the least recently used
+    entries are deleted first. Writes are atomic, so several API and worker
+    processes can share one directory.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.SCENE_CACHE_DIR,
+        max_bytes: int = settings.SCENE_CACHE_MAX_BYTES,
+        enabled: bool = settings.SCENE_CACHE_ENABLED,
+        analyzer: Optional[MultispectralAnalyzer] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str): Where entries are stored (created on first write)
+            max_bytes (int): Total size of entries kept
+            enabled (bool): When False, every lookup misses and nothing is stored
+            analyzer (Optional[MultispectralAnalyzer]): Source of crop_params and band discovery
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.analyzer = analyzer or MultispectralAnalyzer()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def params_hash(self) -> str:
+        """Digest of everything besides the input files that shapes the results"""
+        params = {
+            "version": SCENE_CACHE_VERSION,
+            "preview_size": self.analyzer.preview_size,
+            "crop_params": self.analyzer.crop_params
+        }
+        encoded = json.dumps(params, sort_keys=True, default=list).encode()
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    @staticmethod
+    def hash_files(paths: Iterable[str], chunk_size: int = 1024 * 1024) -> str:
+        """Digest of the files' contents, in the given order"""
+        digest = hashlib.blake2b(digest_size=20)
+        for path in paths:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def key_for(self, mtl_path: str) -> Optional[str]:
+        """
+        Build the cache key for a scene (reads every band file; blocking).
+
+        Returns:
+            Optional[str]: None if the scene lacks required bands and so cannot be cached
+        """
+        bands = self.analyzer.find_band_files(mtl_path)
+        if any(code not in bands for code in REQUIRED_BANDS):
+            return None
+        product_id = re.sub(r"[^A-Za-z0-9_-]", "_", self.analyzer.product_id(mtl_path)) or "scene"
+        content_hash = self.hash_files([mtl_path] + [bands[code] for code in REQUIRED_BANDS])
+        return f"{product_id}__{self.params_hash()}__{content_hash}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load cached results, marking the entry and its layers as recently used"""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                results = json.load(f)
+            if not self.analyzer.layer_store.touch(results.get("layers", {})):
+                raise FileNotFoundError(f"Layers of {key} were pruned")
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return results
+
+    def set(self, key: str, results: Dict[str, Any]) -> None:
+        """Store results, then evict least recently used entries over max_bytes"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(results, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.stores += 1
+        self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every entry, oldest first"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def invalidate(self, product_id: Optional[str] = None, stale_only: bool = False) -> int:
+        """
+        Delete entries.
+
+        Args:
+            product_id (Optional[str]): Only entries for this product (default: all products)
+            stale_only (bool): Only entries built with other crop parameters or cache version
+
+        Returns:
+            int: Number of entries removed
+        """
+        current = self.params_hash()
+        removed = 0
+        for _, _, path in self._entries():
+            entry_product, _, rest = os.path.basename(path).partition("__")
+            entry_params = rest.split("__", 1)[0]
+            if product_id is not None and entry_product != product_id:
+                continue
+            if stale_only and entry_params == current:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"Invalidated {removed} cached scene results")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters and disk usage"""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "params_hash": self.params_hash()
+            }
+
+# Global cache shared by the analysis pool
+scene_cache = SceneResultCache()
@@ -0,0 +1,165 @@
+import numpy as np
+from typing import Any, Dict, Tuple
+
+# Weights of the suitability terms (temperature, moisture, vegetation, soil quality, soil type)
+SUITABILITY_WEIGHTS = (0.3, 0.2, 0.2, 0.2, 0.1)
+SOIL_CLASSES = 4
+
+class SuitabilityKernel:
+    """
+    Suitability of every crop for one tile shape, computed as a single (crops, H, W) array.
+
+    ``crop_params`` is turned into per-crop parameter arrays of shape
+    (crops, 1, 1) once, so each scoring term is one broadcast NumPy operation
+    over all crops rather than a Python loop with its own temporaries per
+    crop. Adding a crop adds a slice to the arrays, not another set of temporaries.
+
+    - the per-pixel inputs (normalized LST, moisture, vegetation, soil
+      quality) are computed once per tile and shared by all crops
+    - the moisture triangle ``m/low`` below the range, ``(1-m)/(1-high)``
+      above it and 1 inside is ``min(m/low, (1-m)/(1-high), 1)`` for m in [0, 1]
+    - soil type compatibility is a (crops, 4) lookup table indexed by the
+      SoilType layer instead of an ``np.isin`` per crop
+    - the weights are folded into the scale factors and the lookup table
+
+    Scores match the per-crop float64 scoring (reference_suitability in
+    tests/test_suitability_kernel.py) up to float32 rounding. Like
+    IndexKernel, all buffers are allocated once for the largest tile, and
+    the arrays returned by compute are overwritten by the next call.
+    """
+
+    def __init__(self, crop_params: Dict[str, Dict[str, Any]], shape: Tuple[int, int]):
+        """
+        Build the parameter arrays and allocate buffers.
+
+        Args:
+            crop_params (Dict[str, Dict[str, Any]]): MultispectralAnalyzer.crop_params
+            shape (Tuple[int, int]): Largest tile (height, width) that will be scored
+        """
+        self.crops = list(crop_params)
+        self.shape = shape
+        w_moisture, w_soil_type = SUITABILITY_WEIGHTS[1], SUITABILITY_WEIGHTS[4]
+
+        def column(values):
+            return np.asarray(values, dtype=np.float32).reshape(-1, 1, 1)
+
+        params = [crop_params[crop] for crop in self.crops]
+        temp_low, temp_high = np.array([p['temp_range'] for p in params], dtype=np.float64).T
+        # LST is normalized over [-20, 60] but the ranges are divided by 60, as the original scoring did
+        self.temp_center = column((temp_low + temp_high) / 2 / 60)
+        self.temp_scale = column(60 / ((temp_high - temp_low) / 2))
+        moisture_low, moisture_high = np.array([p['moisture_range'] for p in params], dtype=np.float64).T
+        self.moisture_low_scale = column(w_moisture / moisture_low)
+        self.moisture_high_scale = column(w_moisture / (1 - moisture_high))
+        vegetation_low, vegetation_high = np.array([p['vegetation_range'] for p in params], dtype=np.float64).T
+        self.vegetation_low = column(vegetation_low)
+        self.vegetation_scale = column(1 / (vegetation_high - vegetation_low))
+        soil_low, soil_high = np.array([p['soil_range'] for p in params], dtype=np.float64).T
+        self.soil_low = column(soil_low)
+        self.soil_scale = column(1 / (soil_high - soil_low))
+        self.soil_type_scores = np.zeros((len(params), SOIL_CLASSES), dtype=np.float32)
+        for i, p in enumerate(params):
+            self.soil_type_scores[i, list(p['preferred_soil'])] = w_soil_type
+
+        crops = len(self.crops)
+        self._scores = np.empty((crops,) + shape, dtype=np.float32)
+        self._term = np.empty((crops,) + shape, dtype=np.float32)
+        self._pixel = [np.empty(shape, dtype=np.float32) for _ in range(2)]
+        self._mask = np.empty(shape, dtype=bool)
+        self._soil_index = np.empty(shape, dtype=np.intp)
+        self._best_index = np.empty(shape, dtype=np.intp)
+        self._best = np.empty(shape, dtype=np.float32)
+
+    def _views(self, shape: Tuple[int, int]):
+        height, width = shape
+        if height > self.shape[0] or width > self.shape[1]:
+            raise ValueError(f"Tile {shape} is larger than the kernel's {self.shape}")
+        tile = (slice(None, height), slice(None, width))
+        return (
+            self._scores[(slice(None),) + tile],
+            self._term[(slice(None),) + tile],
+            [buffer[tile] for buffer in self._pixel],
+            self._mask[tile],
+            self._soil_index[tile],
+            self._best_index[tile],
+            self._best[tile]
+        )
+
+    def compute(self, indices: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score all crops for one tile.
+
+        Args:
+            indices (Dict[str, np.ndarray]): IndexKernel.compute layers (LST,
+                Moisture, NDVI, Carbon, BSI and SoilType with classes 0-3)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (crops, H, W) scores in ``crops``
+                order, and the (H, W) index of the best crop per pixel as
+                float32, NaN where the scores are NaN
+        """
+        with np.errstate(invalid='ignore'):
+            return self._compute(indices)
+
+    def _compute(self, indices: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        w_temp, w_moisture, w_vegetation, w_soil, _ = SUITABILITY_WEIGHTS
+        scores, term, (p1, p2), mask, soil_index, best_index, best = self._views(indices['LST'].shape)
+
+        # Moisture (triangular): w * min(m / low, (1 - m) / (1 - high), 1), m = (Moisture + 1) / 2
+        np.add(indices['Moisture'], 1, out=p1)
+        np.multiply(p1, 0.5, out=p1)
+        np.subtract(1, p1, out=p2)
+        np.multiply(p1, self.moisture_low_scale, out=scores)
+        np.multiply(p2, self.moisture_high_scale, out=term)
+        np.minimum(scores, term, out=scores)
+        np.minimum(scores, w_moisture, out=scores)
+
+        # Temperature (Gaussian): w * exp(-0.5 * ((lst_norm - center) * scale)^2), lst_norm = (LST + 20) / 80
+        np.add(indices['LST'], 20, out=p1)
+        np.divide(p1, 80, out=p1)
+        np.subtract(p1, self.temp_center, out=term)
+        np.multiply(term, self.temp_scale, out=term)
+        np.square(term, out=term)
+        np.multiply(term, -0.5, out=term)
+        np.exp(term, out=term)
+        np.multiply(term, w_temp, out=term)
+        np.add(scores, term, out=scores)
+
+        # Vegetation: w * clip((v - low) * scale, 0, 1), v = (NDVI + 1) / 2
+        np.add(indices['NDVI'], 1, out=p1)
+        np.multiply(p1, 0.5, out=p1)
+        self._add_ramp(scores, term, p1, self.vegetation_low, self.vegetation_scale, w_vegetation)
+
+        # Soil quality: w * clip((q - low) * scale, 0, 1), q = (Carbon + 1 - BSI) / 2
+        np.subtract(indices['Carbon'], indices['BSI'], out=p1)
+        np.add(p1, 1, out=p1)
+        np.multiply(p1, 0.5, out=p1)
+        self._add_ramp(scores, term, p1, self.soil_low, self.soil_scale, w_soil)
+
+        # Soil type compatibility from the lookup table (mode='clip' also avoids buffering out)
+        np.copyto(soil_index, indices['SoilType'], casting='unsafe')
+        np.take(self.soil_type_scores, soil_index, axis=1, out=term, mode='clip')
+        np.add(scores, term, out=scores)
+        np.clip(scores, 0, 1, out=scores)
+
+        # Best crop per pixel as a running maximum (np.argmax over axis 0 would copy the scores);
+        # ties go to the first crop, and NaN inputs make every crop's score NaN
+        best_index.fill(0)
+        np.copyto(p1, scores[0])
+        for i in range(1, len(scores)):
+            np.greater(scores[i], p1, out=mask)
+            np.copyto(best_index, i, where=mask)
+            np.maximum(p1, scores[i], out=p1)
+        np.copyto(best, best_index, casting='unsafe')
+        np.isnan(scores[0], out=mask)
+        best[mask] = np.nan
+        return scores, best
+
+    @staticmethod
+    def _add_ramp(scores, term, values, low, scale, weight) -> None:
+        """scores += weight * clip((values - low) * scale, 0, 1)"""
+        np.subtract(values, low, out=term)
+        np.multiply(term, scale, out=term)
+        np.clip(term, 0, 1, out=term)
+        np.multiply(term, weight, out=term)
+        np.add(scores, term, out=scores)
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status nginx logs for requests the client abandoned; the client never sees it
+CLIENT_CLOSED_REQUEST = 499
+
+async def cancel_on_disconnect(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_interval: float = settings.CHAT_DISCONNECT_POLL_SECONDS
+) -> T:
+    """
+    Await a long upstream call, cancelling it if the HTTP client goes away.
+
+    Without this a closed browser tab leaves its LLM call running (and
+    holding a chat slot) until the upstream API answers.
+
+    Args:
+        request (Request): The incoming request to watch
+        awaitable (Awaitable[T]): The work to run, e.g. alleai_service.chat_with_ai(...)
+        poll_interval (float): Seconds between disconnect checks
+
+    Returns:
+        T: The awaitable's result
+
+    Raises:
+        HTTPException: 499 if the client disconnected first
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}; cancelling upstream call")
+                task.cancel()
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
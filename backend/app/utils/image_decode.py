@@ -0,0 +1,59 @@
+import io
+import logging
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def decode_image(image_data: bytes, target_size: Optional[int] = None) -> np.ndarray:
+    """
+    Decode uploaded bytes to an RGB array close to the model's input size.
+
+    Phone photos are typically 12 MP, while the classifier only sees
+    IMAGE_SIZE x IMAGE_SIZE pixels. Instead of decoding at full resolution and
+    converting a full-size RGB copy before resizing:
+
+    - JPEGs are decoded with ``Image.draft``, which lets libjpeg scale the DCT
+      by 1/2, 1/4 or 1/8 while decoding, as long as both sides stay at least
+      ``target_size``
+    - Other formats are decoded normally and box-reduced by an integer factor
+      before any mode conversion
+    - EXIF orientation is applied on the already-reduced image
+
+    The result is still larger than ``target_size``; preprocess_image does
+    the final resize.
+
+    Args:
+        image_data (bytes): Encoded image bytes
+        target_size (Optional[int]): Smallest side length needed (defaults to IMAGE_SIZE)
+
+    Returns:
+        np.ndarray: HxWx3 uint8 RGB array
+
+    Raises:
+        PIL.UnidentifiedImageError: If the bytes are not a supported image
+    """
+    target_size = target_size or settings.IMAGE_SIZE
+    image = Image.open(io.BytesIO(image_data))
+
+    if image.format == "JPEG":
+        image.draft("RGB", (target_size, target_size))
+    else:
+        if image.mode in ("P", "1"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        factor = min(image.size) // target_size
+        if factor >= 2:
+            try:
+                image = image.reduce(factor)
+            except ValueError:
+                # Modes without reduce support (e.g. I;16) fall back to a full-size decode
+                logger.debug(f"Image.reduce unsupported for mode {image.mode}")
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
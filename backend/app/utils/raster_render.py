@@ -0,0 +1,157 @@
+import io
+import logging
+import math
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ColorBrewer RdYlGn (11 classes), the anchors matplotlib interpolates
+RDYLGN_COLORS = [
+    '#a50026', '#d73027', '#f46d43', '#fdae61', '#fee08b', '#ffffbf',
+    '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850', '#006837'
+]
+# viridis sampled at 17 evenly spaced points (within 6 levels of matplotlib's table)
+VIRIDIS_COLORS = [
+    '#440154', '#48186a', '#472d7b', '#424086', '#3b528b', '#33638d',
+    '#2c728e', '#26828e', '#21918c', '#1fa088', '#28ae80', '#3fbc73',
+    '#5ec962', '#84d44b', '#addc30', '#d8e219', '#fde725'
+]
+
+IMAGE_FORMATS = {"PNG": "image/png", "WEBP": "image/webp"}
+
+def _hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+def build_lut(colors: Sequence[str], entries: int = 256) -> np.ndarray:
+    """Linearly interpolate evenly spaced anchor colors into an (entries, 3) uint8 table"""
+    anchors = np.array([_hex_to_rgb(color) for color in colors], dtype=np.float64)
+    positions = np.linspace(0, 1, len(anchors))
+    samples = np.linspace(0, 1, entries)
+    lut = np.stack([np.interp(samples, positions, anchors[:, channel]) for channel in range(3)], axis=1)
+    return np.rint(lut).astype(np.uint8)
+
+# Continuous colormaps, precomputed once
+LUTS = {
+    "RdYlGn": build_lut(RDYLGN_COLORS),
+    "viridis": build_lut(VIRIDIS_COLORS),
+}
+
+def palette_lut(colors: Sequence[str]) -> np.ndarray:
+    """Categorical palette as a (classes, 3) uint8 table, indexed by class value"""
+    return np.array([_hex_to_rgb(color) for color in colors], dtype=np.uint8)
+
+def downsample(array: np.ndarray, max_size: int) -> np.ndarray:
+    """Keep every n-th pixel so the longest side fits max_size (a view, no copy)"""
+    factor = max(1, math.ceil(max(array.shape) / max_size))
+    return array[::factor, ::factor]
+
+def encode_rgba(rgba: np.ndarray, image_format: str = "PNG") -> bytes:
+    """Encode an HxWx4 uint8 array as PNG or lossless WebP"""
+    image_format = image_format.upper()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    buf = io.BytesIO()
+    image = Image.fromarray(rgba, "RGBA")
+    if image_format == "WEBP":
+        image.save(buf, format="WEBP", lossless=True, method=2)
+    else:
+        image.save(buf, format="PNG", compress_level=6)
+    return buf.getvalue()
+
+def colorize(
+    array: np.ndarray,
+    cmap: str = "viridis",
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None
+) -> np.ndarray:
+    """
+    Map a float raster through a 256-entry LUT.
+
+    Like matplotlib's imshow, the range defaults to the data's min and max;
+    NaN pixels become transparent.
+
+    Returns:
+        np.ndarray: HxWx4 uint8 RGBA
+    """
+    if cmap not in LUTS:
+        raise ValueError(f"Unknown colormap: {cmap}")
+    valid = ~np.isnan(array)
+    if vmin is None or vmax is None:
+        finite = array[valid]
+        data_min, data_max = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+        vmin = data_min if vmin is None else vmin
+        vmax = data_max if vmax is None else vmax
+    # Same binning as matplotlib: 256 equal bins over [vmin, vmax]
+    scale = 256.0 / (vmax - vmin) if vmax > vmin else 0.0
+
+    indices = np.subtract(array, vmin, dtype=np.float32)
+    np.multiply(indices, scale, out=indices)
+    np.clip(indices, 0, 255, out=indices)
+    indices[~valid] = 0
+    rgba = np.empty(array.shape + (4,), dtype=np.uint8)
+    np.take(LUTS[cmap], indices.astype(np.uint8), axis=0, out=rgba[..., :3])
+    rgba[..., 3] = np.where(valid, 255, 0)
+    return rgba
+
+def colorize_classes(classes: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """Map class values 0..len(palette)-1 to their palette colors; NaN becomes transparent"""
+    valid = ~np.isnan(classes) if classes.dtype.kind == 'f' else np.ones(classes.shape, dtype=bool)
+    values = np.where(valid, classes, 0).astype(np.intp)
+    np.clip(values, 0, len(palette) - 1, out=values)
+    rgba = np.empty(classes.shape + (4,), dtype=np.uint8)
+    np.take(palette, values, axis=0, out=rgba[..., :3])
+    rgba[..., 3] = np.where(valid, 255, 0)
+    return rgba
+
+def render_raster(
+    array: np.ndarray,
+    cmap: str = "viridis",
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    max_size: int = settings.MULTISPECTRAL_RENDER_SIZE,
+    image_format: str = settings.MULTISPECTRAL_IMAGE_FORMAT
+) -> bytes:
+    """Downsample a float raster to display size, colorize it and encode it"""
+    return encode_rgba(colorize(downsample(array, max_size), cmap, vmin, vmax), image_format)
+
+def render_classes(
+    classes: np.ndarray,
+    palette: np.ndarray,
+    max_size: int = settings.MULTISPECTRAL_RENDER_SIZE,
+    image_format: str = settings.MULTISPECTRAL_IMAGE_FORMAT
+) -> bytes:
+    """Downsample a class raster to display size, colorize it and encode it"""
+    return encode_rgba(colorize_classes(downsample(classes, max_size), palette), image_format)
+
+def _encode_rows(rows: np.ndarray, width: int, image_format: str) -> bytes:
+    rgb = np.repeat(rows[:, np.newaxis, :], width, axis=1)
+    alpha = np.full(rgb.shape[:2] + (1,), 255, dtype=np.uint8)
+    return encode_rgba(np.concatenate([rgb, alpha], axis=2), image_format)
+
+@lru_cache(maxsize=32)
+def colorbar(cmap: str, width: int = 24, height: int = 256, image_format: str = "PNG") -> bytes:
+    """
+    Vertical gradient for a colormap, high values at the top.
+
+    Maps no longer embed their colorbar, so legends are rendered once per
+    process and served as cacheable assets; tick values travel with the
+    results as data.
+    """
+    if cmap not in LUTS:
+        raise ValueError(f"Unknown colormap: {cmap}")
+    positions = np.linspace(255, 0, height).round().astype(np.intp)
+    return _encode_rows(LUTS[cmap][positions], width, image_format)
+
+@lru_cache(maxsize=32)
+def class_colorbar(colors: Tuple[str, ...], width: int = 24, height: int = 256, image_format: str = "PNG") -> bytes:
+    """Stacked color blocks for a categorical palette, first class at the bottom"""
+    lut = palette_lut(colors)[::-1]
+    rows = np.repeat(lut, math.ceil(height / len(lut)), axis=0)[:height]
+    return _encode_rows(rows, width, image_format)
@@ -0,0 +1,50 @@
+import json
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# no-cache keeps proxies from holding the stream; X-Accel-Buffering stops nginx buffering it
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def chat_events(
+    chunks: AsyncGenerator[str, None],
+    finalize: Optional[Callable[[str], str]] = None
+) -> AsyncIterator[str]:
+    """
+    Turn a streamed chat reply into SSE events.
+
+    Sends a ``token`` event ({"text": ...}) per chunk, then a ``done`` event
+    ({"message": ...}) with the whole reply, or an ``error`` event
+    ({"detail": ...}) if the reply fails part way. The chunk generator is
+    closed when the client disconnects, which releases its upstream call.
+
+    Args:
+        chunks (AsyncGenerator[str, None]): The reply, e.g. alleai_service.stream_chat_with_ai(...)
+        finalize (Optional[Callable[[str], str]]): Applied to the whole reply for the done event
+    """
+    parts = []
+    try:
+        async with aclosing(chunks):
+            async for text in chunks:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        message = "".join(parts)
+        yield sse_event("done", {"message": finalize(message) if finalize else message})
+    except Exception as e:
+        logger.error(f"Chat stream failed after {len(parts)} chunks: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
+
+def chat_event_response(
+    chunks: AsyncGenerator[str, None],
+    finalize: Optional[Callable[[str], str]] = None
+) -> StreamingResponse:
+    """Stream a chat reply to the client as text/event-stream (see chat_events)"""
+    return StreamingResponse(chat_events(chunks, finalize), media_type="text/event-stream", headers=SSE_HEADERS)
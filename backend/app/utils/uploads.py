@@ -0,0 +1,146 @@
+import logging
+import os
+import uuid
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload too large. Maximum size: {limit} bytes")
+
+def safe_filename(filename: Optional[str]) -> str:
+    """Strip any directory components a client put in an upload's filename"""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    return name if name not in ("", ".", "..") else f"upload-{uuid.uuid4().hex}"
+
+async def read_upload(upload: UploadFile, max_size: int, chunk_size: int = settings.UPLOAD_CHUNK_SIZE) -> bytes:
+    """
+    Read an upload into memory in chunks, failing as soon as it exceeds max_size.
+
+    Only meant for bounded uploads such as images; use save_upload for
+    anything that may be large.
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_size
+    """
+    if upload.size is not None and upload.size > max_size:
+        raise _too_large(max_size)
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large(max_size)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _copy_limited(source: BinaryIO, destination: str, max_size: int, chunk_size: int) -> int:
+    """Copy a file object to disk chunk by chunk, enforcing max_size"""
+    size = 0
+    try:
+        with open(destination, "wb") as f:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(max_size)
+                f.write(chunk)
+    except HTTPException:
+        os.remove(destination)
+        raise
+    return size
+
+async def save_upload(
+    upload: UploadFile,
+    directory: str,
+    max_size: int,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> Tuple[str, int]:
+    """
+    Stream an upload to a file in directory without holding it in memory.
+
+    The copy runs in the threadpool, reading from the spooled upload in
+    chunk_size pieces.
+
+    Returns:
+        Tuple[str, int]: Path of the saved file and its size in bytes
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_size
+    """
+    if upload.size is not None and upload.size > max_size:
+        raise _too_large(max_size)
+    path = os.path.join(directory, safe_filename(upload.filename))
+    await upload.seek(0)
+    size = await run_in_threadpool(_copy_limited, upload.file, path, max_size, chunk_size)
+    return path, size
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies over a per-route limit while they are still arriving.
+
+    Requests declaring a Content-Length above the limit get a 413 before any
+    of the body is read. Bodies without a usable Content-Length (chunked
+    transfer) are counted as they stream in, and reading stops with a 413 at
+    the first byte past the limit, so a client cannot make the server
+    receive a gigabyte just to be told it was too large.
+
+    The limit for a request is the longest matching path prefix in
+    ``route_limits``, or ``default_limit``.
+    """
+
+    def __init__(self, app, default_limit: int, route_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.route_limits = sorted((route_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"]) + MULTIPART_OVERHEAD
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"Rejected {scope['path']} upload of {int(content_length)} bytes (limit {limit})")
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body too large. Maximum size: {limit} bytes"}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=f"Request body too large. Maximum size: {limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,69 @@
+"""
+Standalone multispectral analysis worker.
+
+Claims jobs from the analysis_jobs queue in MongoDB and runs each one in a
+separate process. Start as many as needed, on any host that can reach
+MongoDB and ANALYSIS_STORAGE_DIR, and scale them on the queue depth
+reported by /predict/multispectral/queue/stats:
+
+    python -m app.worker [--concurrency 2]
+
+Set ANALYSIS_EMBEDDED_WORKER=false on the API when workers run separately.
+Workers never load the leaf classifier, so they need no model file.
+SIGTERM/SIGINT stop claiming and hand running jobs back to the queue.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from app.config import settings
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.analysis_pool import AnalysisWorkerPool
+from app.services.analysis_worker import AnalysisQueueWorker
+from app.services.scene_cache import scene_cache
+
+logger = logging.getLogger(__name__)
+
+async def run_worker(concurrency: int) -> int:
+    await connect_to_mongo()
+    if get_database() is None:
+        logger.error("Cannot start analysis worker without MongoDB")
+        return 1
+
+    pool = AnalysisWorkerPool(max_workers=concurrency, max_queued=0, cache=scene_cache)
+    worker = AnalysisQueueWorker(pool)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await worker.start()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down analysis worker...")
+        await worker.stop()
+        pool.shutdown()
+        await close_mongo_connection()
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a multispectral analysis worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.ANALYSIS_MAX_WORKERS,
+        help="Analyses to run at once, each in its own process"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    return asyncio.run(run_worker(args.concurrency))
+
+if __name__ == "__main__":
+    sys.exit(main())
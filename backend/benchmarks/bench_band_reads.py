@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multispectral band loading: serial vs threaded reads.
+
+Writes a Landsat-sized scene (five bands, tiled and DEFLATE-compressed like
+Collection 2 COGs) to a temporary directory, then compares:
+
+- read: streaming every tile of the five bands, one band after another vs
+  one band per thread with the next tile prefetched
+  (MultispectralAnalyzer.iter_tile_reads)
+- scene: the full process_scene pipeline with read_workers=1 vs the
+  configured MULTISPECTRAL_READ_WORKERS
+
+Files are read once before timing so both paths start from a warm OS page
+cache; what remains is GDAL's decompression, which releases the GIL and is
+what the threads parallelize. The speed-up is bounded by the number of
+cores available.
+
+Usage:
+    python benchmarks/bench_band_reads.py [--size 7800] [--block 512] [--repeats 3] [--skip-scene]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from PIL import Image
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.multispectral_service import REQUIRED_BANDS, MultispectralAnalyzer
+
+PRODUCT_ID = "LC08_L1TP_194056_20241221_20241228_02_T1"
+BAND_RANGES = {"B2": (7000, 12000), "B4": (6500, 14000), "B5": (8000, 25000), "B6": (7000, 20000), "B10": (20000, 45000)}
+MTL = """GROUP = LEVEL1_THERMAL_CONSTANTS
+    RADIANCE_MULT_BAND_10 = 3.3420E-04
+    RADIANCE_ADD_BAND_10 = 0.10000
+    K1_CONSTANT_BAND_10 = 774.8853
+    K2_CONSTANT_BAND_10 = 1321.0789
+END_GROUP = LEVEL1_THERMAL_CONSTANTS
+"""
+
+
+def write_scene(directory, size, block, seed=0):
+    """Write synthetic bands (smooth fields plus noise, so they compress like imagery)"""
+    rng = np.random.default_rng(seed)
+    profile = {
+        "driver": "GTiff", "height": size, "width": size, "count": 1, "dtype": "uint16",
+        "tiled": True, "blockxsize": block, "blockysize": block, "compress": "deflate", "predictor": 2
+    }
+    for code, (low, high) in BAND_RANGES.items():
+        coarse = rng.random((size // 64 + 1, size // 64 + 1)).astype(np.float32)
+        field = np.asarray(Image.fromarray(coarse).resize((size, size), Image.BILINEAR))
+        data = low + (high - low) * field + rng.normal(0, (high - low) * 0.01, (size, size))
+        with rasterio.open(os.path.join(directory, f"{PRODUCT_ID}_{code}.TIF"), "w", **profile) as dst:
+            dst.write(np.clip(data, 0, 65535).astype(np.uint16), 1)
+    mtl_path = os.path.join(directory, f"{PRODUCT_ID}_MTL.txt")
+    with open(mtl_path, "w") as f:
+        f.write(MTL)
+    return mtl_path
+
+
+def read_all_tiles(analyzer, bands, workers):
+    sources = {code: rasterio.open(bands[code]) for code in REQUIRED_BANDS}
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with rasterio.Env(**analyzer.gdal_options):
+            windows = list(analyzer.iter_tiles(sources["B10"]))
+            for _ in analyzer.iter_tile_reads(sources, windows, executor):
+                pass
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for src in sources.values():
+            src.close()
+
+
+def best_of(repeats, fn, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=7800, help="Side length of each band (Landsat 8 scenes are ~7800 px)")
+    parser.add_argument("--block", type=int, default=512, help="GeoTIFF tile size")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip-scene", action="store_true", help="Only time the reads, not process_scene")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=rasterio.errors.NotGeoreferencedWarning)
+    workers = max(2, settings.MULTISPECTRAL_READ_WORKERS)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"🧪 Writing a {args.size}x{args.size} five-band scene ({args.block}px DEFLATE tiles)...")
+        mtl_path = write_scene(directory, args.size, args.block)
+        serial = MultispectralAnalyzer(read_workers=1)
+        parallel = MultispectralAnalyzer(read_workers=workers)
+        bands = serial.find_band_files(mtl_path)
+        print(f"CPU cores: {os.cpu_count()}, read workers: {workers}, GDAL options: {serial.gdal_options}")
+
+        read_all_tiles(serial, bands, 1)  # warm the page cache
+        results = {
+            "read serial": best_of(args.repeats, read_all_tiles, serial, bands, 1),
+            "read parallel": best_of(args.repeats, read_all_tiles, parallel, bands, workers),
+        }
+        if not args.skip_scene:
+            results["scene serial"] = best_of(args.repeats, serial.process_scene, bands, mtl_path)
+            results["scene parallel"] = best_of(args.repeats, parallel.process_scene, bands, mtl_path)
+
+        for name, elapsed in results.items():
+            print(f"{name:<16} {elapsed:8.2f}s")
+        print(f"Read speed-up:  {results['read serial'] / results['read parallel']:.2f}x")
+        if not args.skip_scene:
+            print(f"Scene speed-up: {results['scene serial'] / results['scene parallel']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
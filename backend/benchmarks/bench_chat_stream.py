@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark for chat latency as the user sees it: blocking replies vs SSE streaming.
+
+Starts a local stub of the OpenRouter chat completions endpoint that
+produces a reply token by token (--tokens tokens, --token-ms apart, after
+--first-token-ms of "thinking") and measures, for each mode:
+
+- blocking: AlleAIService.chat_with_ai, where nothing is shown until the
+  whole completion has arrived
+- stream:   AlleAIService.stream_chat_with_ai, timing the first cleaned
+  chunk (TTFT) and the end of the stream
+
+Also reports the CPU time ResponseStreamCleaner spends re-cleaning a reply
+of that length.
+
+Usage:
+    python benchmarks/bench_chat_stream.py [--calls 5] [--tokens 300] [--token-ms 20] [--first-token-ms 400]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from aiohttp import web
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.alleai_service import AlleAIService, ResponseStreamCleaner
+from app.services.http_client import http_client
+
+
+def make_reply(tokens):
+    words = "Remove infected leaves and apply a copper fungicide every **seven days** during wet weather.".split()
+    pieces = []
+    for i in range(tokens):
+        pieces.append(("\n\n" if i and i % 60 == 0 else " ") + words[i % len(words)])
+    return pieces
+
+
+async def start_stub(reply, first_token_delay, token_delay):
+    async def completions(request):
+        body = await request.json()
+        await asyncio.sleep(first_token_delay)
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(reply))
+            return web.json_response({"choices": [{"message": {"content": "".join(reply)}}]})
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for piece in reply:
+            await response.write(f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode())
+            await asyncio.sleep(token_delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+
+async def run(args):
+    reply = make_reply(args.tokens)
+    runner, url = await start_stub(reply, args.first_token_ms / 1000, args.token_ms / 1000)
+    settings.OPENROUTER_API_URL = url
+    service = AlleAIService()
+    print(f"🧪 {args.calls} chats, {args.tokens} tokens {args.token_ms:.0f}ms apart "
+          f"after {args.first_token_ms:.0f}ms to the first token")
+    blocking, ttft, stream_total = [], [], []
+    try:
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            await service.chat_with_ai("How do I treat leaf rust?")
+            blocking.append((time.perf_counter() - start) * 1000)
+
+            start, first = time.perf_counter(), None
+            async for _ in service.stream_chat_with_ai("How do I treat leaf rust?"):
+                first = first or (time.perf_counter() - start) * 1000
+            ttft.append(first)
+            stream_total.append((time.perf_counter() - start) * 1000)
+    finally:
+        await http_client.close()
+        await runner.cleanup()
+
+    print(f"blocking  first text p50={np.median(blocking):8.1f}ms")
+    print(f"stream    first text p50={np.median(ttft):8.1f}ms  (stream done p50={np.median(stream_total):.1f}ms)")
+    print(f"Time to first text: {np.median(blocking) / np.median(ttft):.1f}x sooner")
+
+    cleaner_start = time.process_time()
+    cleaner = ResponseStreamCleaner()
+    for piece in reply:
+        cleaner.feed(piece)
+    cleaner.finish()
+    print(f"Incremental cleaning CPU for a {len(''.join(reply))}-char reply: "
+          f"{(time.process_time() - cleaner_start) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--first-token-ms", type=float, default=400.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark for upload decoding: full-resolution vs draft-mode decode.
+
+Generates representative 4000x3000 phone-style JPEGs (smooth leaf-like
+gradients plus sensor noise, some carrying an EXIF rotation) and compares:
+
+- legacy: ``Image.open(...).convert('RGB')`` + ``np.array`` + preprocess_image
+- draft:  ``app.utils.image_decode.decode_image`` + preprocess_image
+
+Decode time is measured in-process. Peak memory is measured in a fresh
+subprocess per path (PIL allocates outside the Python heap, so tracemalloc
+cannot see it): the reported value is peak RSS minus RSS before decoding,
+using the resettable VmHWM counter, so the benchmark needs Linux.
+
+Usage:
+    python benchmarks/bench_decode.py [--images 8] [--iterations 40] [--width 4000] [--height 3000]
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.utils.image_decode import decode_image
+
+
+def make_photo(rng, width, height, orientation=None):
+    """Encode a synthetic phone photo as JPEG bytes"""
+    small = rng.integers(40, 200, (height // 50, width // 50, 3), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(small).resize((width, height), Image.BICUBIC), dtype=np.int16)
+    noise = rng.integers(-12, 12, (height, width, 1), dtype=np.int16)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def legacy_decode(image_data):
+    return np.array(Image.open(io.BytesIO(image_data)).convert("RGB"))
+
+
+def draft_decode(image_data):
+    return decode_image(image_data, settings.IMAGE_SIZE)
+
+
+DECODERS = {"legacy": legacy_decode, "draft": draft_decode}
+
+
+def read_status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_peak_memory(path, image_file):
+    """Child process entry point: print peak RSS growth (KiB) for one decode"""
+    with open(image_file, "rb") as f:
+        image_data = f.read()
+    # Reset the high-water mark so import-time peaks don't mask the decode (Linux)
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = read_status_kb("VmRSS")
+    DECODERS[path](image_data)
+    print(max(0, read_status_kb("VmHWM") - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--memory-child", nargs=2, metavar=("PATH", "IMAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        measure_peak_memory(*args.memory_child)
+        return
+
+    from app.services.prediction_service import PredictionService
+    service = PredictionService(auto_load=False)
+
+    rng = np.random.default_rng(0)
+    # Every other photo is rotated via EXIF, as portrait phone shots are
+    photos = [make_photo(rng, args.width, args.height, 6 if i % 2 else None) for i in range(args.images)]
+    print(f"🧪 Decoding {args.iterations} {args.width}x{args.height} JPEGs "
+          f"(~{np.mean([len(p) for p in photos]) / 1e6:.1f} MB each) -> {settings.IMAGE_SIZE}x{settings.IMAGE_SIZE}")
+
+    latencies = {}
+    for name, decoder in DECODERS.items():
+        decoder(photos[0])  # warm-up
+        times = np.empty(args.iterations)
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            service.preprocess_image(decoder(photos[i % len(photos)]))
+            times[i] = (time.perf_counter() - start) * 1000
+        latencies[name] = times
+        print(f"{name:<8} decode+preprocess p50={np.percentile(times, 50):7.1f}ms  "
+              f"p95={np.percentile(times, 95):7.1f}ms")
+    print(f"Speed-up (p50): {np.percentile(latencies['legacy'], 50) / np.percentile(latencies['draft'], 50):.1f}x")
+
+    # Peak memory, one fresh process per path
+    image_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bench_decode.jpg")
+    with open(image_file, "wb") as f:
+        f.write(photos[1])
+    try:
+        peaks = {}
+        for name in DECODERS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--memory-child", name, image_file],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            peaks[name] = int(output) / 1024
+            print(f"{name:<8} peak RSS growth: {peaks[name]:7.1f} MiB")
+        if peaks["draft"] > 0:
+            print(f"Peak memory reduction: {peaks['legacy'] / peaks['draft']:.1f}x")
+    finally:
+        os.remove(image_file)
+
+    # Orientation check: the draft path honors EXIF rotation, legacy does not
+    rotated = draft_decode(photos[1])
+    print(f"EXIF-rotated photo decoded as {rotated.shape[1]}x{rotated.shape[0]} (portrait: {rotated.shape[0] > rotated.shape[1]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for outbound LLM calls: a new aiohttp session per call vs the shared HTTPClient.
+
+Starts a local HTTPS stub of the AlleAI chat completions endpoint (self-signed
+certificate generated with openssl) and sends the same request sequentially
+through:
+
+- per-call: ``async with aiohttp.ClientSession()`` per request, as
+  AlleAIService._make_alleai_request did, so every call pays the TCP and
+  TLS handshakes
+- shared:   ``app.services.http_client.HTTPClient``, whose keep-alive
+  connections are set up once
+
+Over loopback the difference is mostly TLS handshake CPU time. Against a
+real API each handshake also costs network round trips (plus DNS), so the
+saving per call grows with latency; --handshake-delay-ms adds a fixed
+server-side delay to every new connection to approximate that.
+
+Usage:
+    python benchmarks/bench_http_client.py [--calls 200] [--handshake-delay-ms 0]
+"""
+
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.http_client import HTTPClient
+
+PAYLOAD = {"models": ["gpt-4o"], "messages": [{"user": [{"type": "text", "text": "How do I treat leaf rust?"}]}]}
+
+
+def make_certificate(directory):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+async def start_stub(cert, key, handshake_delay):
+    connections = set()
+
+    async def completions(request):
+        peer = request.transport.get_extra_info("peername")
+        if peer not in connections:
+            connections.add(peer)
+            if handshake_delay:
+                await asyncio.sleep(handshake_delay)
+        return web.json_response({"responses": {"responses": {"gpt-4o": "Remove infected leaves and apply a fungicide."}}})
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    server_ssl = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ssl.load_cert_chain(cert, key)
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=server_ssl)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"https://localhost:{port}/api/v1/chat/completions", connections
+
+
+async def per_call(url, client_ssl):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=PAYLOAD, ssl=client_ssl) as response:
+            return await response.json()
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        client_ssl = ssl.create_default_context(cafile=cert)
+        runner, url, connections = await start_stub(cert, key, args.handshake_delay_ms / 1000)
+        shared = HTTPClient()
+
+        async def shared_call():
+            session = await shared.get_session()
+            async with session.post(url, json=PAYLOAD, ssl=client_ssl) as response:
+                return await response.json()
+
+        paths = {"per-call": lambda: per_call(url, client_ssl), "shared": shared_call}
+        print(f"🧪 {args.calls} sequential chat calls to a local HTTPS stub "
+              f"(extra handshake delay {args.handshake_delay_ms:.0f}ms)")
+        medians = {}
+        try:
+            for name, call in paths.items():
+                await call()  # warm-up
+                before = len(connections)
+                times = np.empty(args.calls)
+                for i in range(args.calls):
+                    start = time.perf_counter()
+                    await call()
+                    times[i] = (time.perf_counter() - start) * 1000
+                medians[name] = np.median(times)
+                print(f"{name:<9} p50={medians[name]:6.2f}ms  p95={np.percentile(times, 95):6.2f}ms  "
+                      f"new connections={len(connections) - before}")
+        finally:
+            await shared.close()
+            await runner.cleanup()
+        print(f"Saved per call (p50): {medians['per-call'] - medians['shared']:.2f}ms "
+              f"({medians['per-call'] / medians['shared']:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--handshake-delay-ms", type=float, default=0.0,
+                        help="Server-side delay on each new connection, standing in for network round trips")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark for environmental index computation on synthetic Landsat bands.
+
+Compares the legacy path (bands cast to float64, one whole-array expression
+per index with its own temporaries, NDBI and NDMI computed twice for Methane
+and Moisture) against the fused float32 IndexKernel, both on the whole
+scene and tile by tile as process_scene runs it.
+
+Peak allocation is measured with tracemalloc, which sees NumPy's array
+buffers. The uint16 input bands are created before tracing starts, so only
+the cast and the index computation are counted.
+
+Usage:
+    python benchmarks/bench_indices.py [--size 8192] [--tile-size 1024] [--skip-legacy]
+
+A full 8192x8192 legacy run needs roughly 7 GB of RAM; use --size 4096 or
+--skip-legacy on smaller machines.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.index_kernel import IndexKernel
+
+CONSTANTS = (3.342e-04, 0.1, 774.8853, 1321.0789)
+BAND_RANGES = {"B2": (7000, 12000), "B4": (6500, 14000), "B5": (8000, 25000), "B6": (7000, 20000), "B10": (20000, 45000)}
+
+
+def legacy_ndvi(nir, red):
+    return np.clip((nir - red) / (nir + red + 1e-10), -1, 1)
+
+
+def legacy_ndmi(nir, swir):
+    return np.clip((nir - swir) / (nir + swir + 1e-10), -1, 1)
+
+
+def legacy_ndbi(swir, nir):
+    return np.clip((swir - nir) / (swir + nir + 1e-10), -1, 1)
+
+
+def legacy_soil_type(bsi, ndvi):
+    soil_map = np.zeros_like(bsi)
+    soil_map[(bsi > 0.5) & (ndvi < 0.2)] = 0
+    soil_map[(bsi > -0.2) & (bsi <= 0.5) & (ndvi < 0.3)] = 1
+    soil_map[(bsi <= -0.2) & (ndvi < 0.3)] = 2
+    soil_map[ndvi >= 0.3] = 3
+    return soil_map
+
+
+def legacy(raw):
+    """Whole-scene float64 computation, one expression per index, as the analyzer ran before the fused kernel"""
+    b = {code: band.astype(float) for code, band in raw.items()}
+    ndvi = legacy_ndvi(b['B5'], b['B4'])
+    ML, AL, K1, K2 = CONSTANTS
+    lst = np.clip(K2 / np.log((K1 / (ML * b['B10'] + AL)) + 1) - 273.15, -20, 60)
+    lst[np.abs(lst - np.mean(lst)) > 3 * np.std(lst)] = np.nan
+    swir_red, nir_blue = b['B6'] + b['B4'], b['B5'] + b['B2']
+    bsi = np.clip((swir_red - nir_blue) / (swir_red + nir_blue + 1e-10), -1, 1)
+    return {
+        'NDVI': ndvi,
+        'EVI': np.clip(2.5 * (b['B5'] - b['B4']) / (b['B5'] + 6 * b['B4'] - 7.5 * b['B2'] + 1), -1, 1),
+        'SAVI': np.clip((b['B5'] - b['B4']) / (b['B5'] + b['B4'] + 0.5) * 1.5, -1, 1),
+        'NDMI': legacy_ndmi(b['B5'], b['B6']),
+        'NDBI': legacy_ndbi(b['B6'], b['B5']),
+        'BSI': bsi,
+        'Carbon': np.clip((1 - ndvi) * (1 - np.clip((lst + 20) / 80, 0, 1)), 0, 1),
+        'Methane': np.clip((legacy_ndbi(b['B6'], b['B5']) + (1 - ndvi)) / 2, 0, 1),
+        'Moisture': np.clip((ndvi + legacy_ndmi(b['B5'], b['B6'])) / 2, -1, 1),
+        'LST': lst,
+        'SoilType': legacy_soil_type(bsi, ndvi)
+    }
+
+
+def fused_whole(raw):
+    """Fused kernel over the whole scene as a single tile"""
+    b = {code: band.astype(np.float32) for code, band in raw.items()}
+    kernel = IndexKernel(b['B4'].shape)
+    lst = kernel.clipped_lst(b['B10'], CONSTANTS)
+    mean, std = float(lst.mean(dtype=np.float64)), float(lst.std(dtype=np.float64))
+    return kernel.compute(b, CONSTANTS, mean, std)
+
+
+def fused_tiled(raw, tile_size):
+    """Fused kernel tile by tile, as process_scene runs it"""
+    height, width = raw['B4'].shape
+    kernel = IndexKernel((min(tile_size, height), min(tile_size, width)))
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            tile = {code: band[row:row + tile_size, col:col + tile_size].astype(np.float32) for code, band in raw.items()}
+            kernel.compute(tile, CONSTANTS, 30.0, 5.0)
+
+
+def measure(name, fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<32} {elapsed:8.2f}s   peak alloc {peak / 2**20:9.1f} MiB")
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=8192, help="Side length of the synthetic bands")
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    raw = {code: rng.integers(low, high, (args.size, args.size), dtype=np.uint16) for code, (low, high) in BAND_RANGES.items()}
+
+    print(f"🧪 Computing 11 index layers over {args.size}x{args.size} bands")
+    results = {}
+    if not args.skip_legacy:
+        results["legacy"] = measure("legacy float64 (per-index)", legacy, raw)
+    results["fused"] = measure("fused float32 (whole scene)", fused_whole, raw)
+    results["tiled"] = measure(f"fused float32 ({args.tile_size}px tiles)", fused_tiled, raw, args.tile_size)
+
+    if "legacy" in results:
+        for key in ("fused", "tiled"):
+            print(f"legacy vs {key}: {results['legacy'][0] / results[key][0]:.1f}x faster, "
+                  f"{results['legacy'][1] / results[key][1]:.1f}x less peak memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Sweep ONNX Runtime session options on the classifier.
+
+For every combination of graph optimization level, intra-op thread count,
+execution mode and memory arena/pattern flags, a fresh session is created and
+timed on random 112x112 inputs. Reports p50/p99 latency per call and images
+per second, fastest configuration first.
+
+Usage:
+    python benchmarks/bench_ort_session.py [--model pharmiq/phamiq.onnx] [--batch-sizes 1 8 32]
+        [--iterations 200] [--threads 1 2 4 0] [--quick]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import onnxruntime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.prediction_service import create_session_options
+
+
+def benchmark_config(model_path, options_kwargs, batch_size, iterations, warmup=10):
+    options = create_session_options(**options_kwargs)
+    load_start = time.perf_counter()
+    session = onnxruntime.InferenceSession(model_path, sess_options=options)
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    input_name = session.get_inputs()[0].name
+    rng = np.random.default_rng(0)
+    batch = rng.standard_normal((batch_size, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE)).astype(np.float32)
+    for _ in range(warmup):
+        session.run(None, {input_name: batch})
+
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        session.run(None, {input_name: batch})
+        latencies[i] = time.perf_counter() - start
+    return {
+        "load_ms": load_ms,
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p99_ms": np.percentile(latencies, 99) * 1000,
+        "images_per_second": batch_size * iterations / latencies.sum()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 0], help="Intra-op thread counts (0 = ORT default)")
+    parser.add_argument("--quick", action="store_true", help="Only sweep optimization level and threads")
+    args = parser.parse_args()
+
+    levels = ["disabled", "basic", "extended", "all"]
+    modes = ["sequential"] if args.quick else ["sequential", "parallel"]
+    flag_pairs = [(True, True)] if args.quick else [(True, True), (True, False), (False, True), (False, False)]
+
+    print(f"🧪 ONNX Runtime {onnxruntime.__version__} sweep on {args.model} "
+          f"({settings.IMAGE_SIZE}x{settings.IMAGE_SIZE}, {os.cpu_count()} CPUs)")
+    for batch_size in args.batch_sizes:
+        rows = []
+        for level, threads, mode, (arena, pattern) in itertools.product(levels, args.threads, modes, flag_pairs):
+            options_kwargs = {
+                "graph_optimization_level": level,
+                "intra_op_num_threads": threads,
+                "execution_mode": mode,
+                "enable_cpu_mem_arena": arena,
+                "enable_mem_pattern": pattern
+            }
+            result = benchmark_config(args.model, options_kwargs, batch_size, args.iterations)
+            rows.append((options_kwargs, result))
+
+        rows.sort(key=lambda row: -row[1]["images_per_second"])
+        print(f"\nBatch size {batch_size}")
+        print(f"{'level':<9} {'intra':>5} {'mode':<10} {'arena':<5} {'pattern':<7} "
+              f"{'load ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'img/s':>9}")
+        for options_kwargs, result in rows:
+            print(f"{options_kwargs['graph_optimization_level']:<9} {options_kwargs['intra_op_num_threads']:>5} "
+                  f"{options_kwargs['execution_mode']:<10} {str(options_kwargs['enable_cpu_mem_arena']):<5} "
+                  f"{str(options_kwargs['enable_mem_pattern']):<7} {result['load_ms']:8.1f} "
+                  f"{result['p50_ms']:8.2f} {result['p99_ms']:8.2f} {result['images_per_second']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
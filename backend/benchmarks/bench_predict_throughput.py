@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for ``POST /predict/``.
+
+Two modes:
+- ``--url``: drive a running server with concurrent authenticated uploads and
+  report requests/second. Run it once against a build with per-request
+  validation and once against the current build to compare.
+- default (in-process): isolate the model hot path by comparing
+  ``PredictionService.predict`` with and without the per-request
+  ``validate_model()`` forward pass the endpoint used to pay.
+
+Usage:
+    python benchmarks/bench_predict_throughput.py [--iterations 300]
+    python benchmarks/bench_predict_throughput.py --url http://localhost:8000 --concurrency 8 --duration 30
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_test_image_bytes(size: int = 512) -> bytes:
+    """Encode a synthetic leaf-coloured JPEG"""
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    pixels[..., 1] = np.maximum(pixels[..., 1], 120)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def get_token(base_url: str) -> str:
+    """Log in (or register) the benchmark user and return a bearer token"""
+    import requests
+    credentials = {"email": "bench@example.com", "password": "benchpassword123"}
+    response = requests.post(f"{base_url}/auth/login", json=credentials)
+    if response.status_code != 200:
+        response = requests.post(f"{base_url}/auth/register", json={
+            **credentials,
+            "first_name": "Bench",
+            "last_name": "User",
+            "confirm_password": credentials["password"]
+        })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def run_http(base_url: str, concurrency: int, duration: float) -> None:
+    import requests
+    token = get_token(base_url)
+    image = make_test_image_bytes()
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        latencies, errors = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = session.post(
+                f"{base_url}/predict/?top_k=3",
+                headers=headers,
+                files={"file": ("bench.jpg", image, "image/jpeg")}
+            )
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        return latencies, errors
+
+    print(f"🧪 POST /predict/ with {concurrency} concurrent clients for {duration:.0f}s")
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: worker(), range(concurrency)))
+    latencies = np.array([l for r in results for l in r[0]])
+    errors = sum(r[1] for r in results)
+    if latencies.size == 0:
+        print(f"❌ No successful requests ({errors} errors)")
+        return
+    print(f"Throughput: {latencies.size / duration:.1f} req/s  "
+          f"p50={np.percentile(latencies, 50) * 1000:.1f}ms  "
+          f"p99={np.percentile(latencies, 99) * 1000:.1f}ms  errors={errors}")
+
+
+def run_in_process(iterations: int) -> None:
+    from app.services.prediction_service import prediction_service
+
+    if not prediction_service.is_model_loaded():
+        prediction_service.load_model()
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (512, 512, 3), dtype=np.uint8)
+
+    def legacy():
+        # Previous hot path: validation forward pass + prediction forward pass
+        prediction_service.validate_model()
+        prediction_service.predict(image)
+
+    def current():
+        prediction_service.predict(image)
+
+    print(f"🧪 In-process predict() x {iterations}")
+    for name, fn in (("per-request validation (legacy)", legacy), ("loaded-flag check (current)", current)):
+        for _ in range(10):
+            fn()  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<35} {iterations / elapsed:8.1f} predictions/s  ({elapsed / iterations * 1000:.2f}ms each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running API server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.url:
+        run_http(args.url.rstrip("/"), args.concurrency, args.duration)
+    else:
+        run_in_process(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for image preprocessing latency.
+
+Compares the legacy training pipeline (albumentations ShiftScaleRotate +
+Normalize + ToTensorV2 and the ``.unsqueeze(0).numpy()`` round-trip) against
+the deterministic inference pipeline in ``PredictionService.preprocess_image``.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--iterations 500] [--size 1024]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.prediction_service import PredictionService, IMAGENET_MEAN, IMAGENET_STD
+
+
+def build_legacy_pipeline():
+    """Rebuild the pipeline PredictionService used before the inference-only path"""
+    import albumentations as A
+
+    steps = [
+        A.ShiftScaleRotate(shift_limit=0.05, scale_limit=0.05, rotate_limit=360, p=0.5),
+        A.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+    ]
+    try:
+        from albumentations.pytorch import ToTensorV2
+        transforms = A.Compose(steps + [ToTensorV2()])
+
+        def run(image):
+            resized = cv2.resize(image, (settings.IMAGE_SIZE, settings.IMAGE_SIZE))
+            return transforms(image=resized)["image"].unsqueeze(0).numpy()
+
+        return run, "albumentations + ToTensorV2"
+    except ImportError:
+        # torch is not installed: emulate ToTensorV2 with a contiguous transpose
+        transforms = A.Compose(steps)
+
+        def run(image):
+            resized = cv2.resize(image, (settings.IMAGE_SIZE, settings.IMAGE_SIZE))
+            chw = transforms(image=resized)["image"].transpose(2, 0, 1)
+            return np.ascontiguousarray(chw)[np.newaxis]
+
+        return run, "albumentations (ToTensorV2 emulated, torch missing)"
+
+
+def time_per_image(fn, images, iterations):
+    """Return per-image latencies in microseconds"""
+    for image in images[:10]:
+        fn(image)  # warm-up
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        image = images[i % len(images)]
+        start = time.perf_counter()
+        fn(image)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<55} p50={np.percentile(latencies, 50):8.1f}us  "
+          f"p99={np.percentile(latencies, 99):8.1f}us  mean={latencies.mean():8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--size", type=int, default=1024, help="Side length of the synthetic input images")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (args.size, args.size, 3), dtype=np.uint8) for _ in range(8)]
+
+    service = PredictionService(auto_load=False)
+    legacy, legacy_name = build_legacy_pipeline()
+
+    print(f"🧪 Preprocessing {args.iterations} images of {args.size}x{args.size} -> {settings.IMAGE_SIZE}x{settings.IMAGE_SIZE}")
+    legacy_latencies = time_per_image(legacy, images, args.iterations)
+    fused_latencies = time_per_image(service.preprocess_image, images, args.iterations)
+    report(f"legacy ({legacy_name})", legacy_latencies)
+    report("inference (fused normalize/transpose)", fused_latencies)
+    print(f"Speed-up (p50): {np.percentile(legacy_latencies, 50) / np.percentile(fused_latencies, 50):.2f}x")
+
+    # The inference path is deterministic: the same image always yields the same tensor
+    first = service.preprocess_image(images[0]).copy()
+    second = service.preprocess_image(images[0])
+    print(f"Deterministic output: {np.array_equal(first, second)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multispectral map rendering: matplotlib figures vs colormap LUTs.
+
+Renders the per-crop suitability maps and the soil map of a synthetic scene
+preview the way build_results does, and compares:
+
+- legacy: a matplotlib figure per map (imshow + colorbar + savefig, as
+  MultispectralAnalyzer did before the LUT renderer)
+- lut:    ``app.utils.raster_render`` (downsample, 256-entry LUT, PNG/WebP
+  encode; colorbars are separate cached assets)
+
+Render time is measured in-process. Peak memory is measured in a fresh
+subprocess per path using the resettable VmHWM counter (matplotlib and PIL
+allocate outside the Python heap), so the benchmark needs Linux. Requires
+matplotlib for the legacy path.
+
+Usage:
+    python benchmarks/bench_render.py [--size 2048] [--crops 6] [--iterations 5] [--format PNG]
+"""
+
+import argparse
+import base64
+import io
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.multispectral_service import SOIL_COLORS, SOIL_LUT
+from app.utils.raster_render import render_classes, render_raster
+
+
+def make_preview(rng, size, crops):
+    """Smooth suitability fields in [0, 1] with a NaN border, plus a soil class map"""
+    coarse = rng.random((crops, size // 64 + 2, size // 64 + 2))
+    ramp = np.linspace(0, coarse.shape[1] - 1.001, size)
+    rows, cols = np.meshgrid(ramp, ramp, indexing="ij")
+    r0, c0 = rows.astype(int), cols.astype(int)
+    fr, fc = rows - r0, cols - c0
+    fields = (coarse[:, r0, c0] * (1 - fr) * (1 - fc) + coarse[:, r0 + 1, c0] * fr * (1 - fc)
+              + coarse[:, r0, c0 + 1] * (1 - fr) * fc + coarse[:, r0 + 1, c0 + 1] * fr * fc)
+    fields = fields.astype(np.float32)
+    fields[:, :size // 20] = np.nan
+    soil = np.floor(fields[0] * 3.999)
+    return list(fields), soil
+
+
+def legacy_render(suitability, soil, image_format):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LinearSegmentedColormap
+
+    images = []
+    for array in suitability:
+        fig, ax = plt.subplots(figsize=(6, 4))
+        im = ax.imshow(array, cmap="RdYlGn")
+        plt.colorbar(im, ax=ax)
+        ax.axis("off")
+        buf = io.BytesIO()
+        plt.savefig(buf, format="png", bbox_inches="tight", dpi=100)
+        plt.close()
+        images.append(f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode()}")
+
+    cmap_soil = LinearSegmentedColormap.from_list("soil_cmap", SOIL_COLORS, N=4)
+    fig, ax = plt.subplots(figsize=(6, 4))
+    soil_plot = ax.imshow(soil, cmap=cmap_soil, vmin=0, vmax=3)
+    ax.set_title("Soil Type Distribution")
+    plt.colorbar(soil_plot, ax=ax, ticks=[0.375, 1.125, 1.875, 2.625])
+    ax.axis("off")
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", bbox_inches="tight", dpi=100)
+    plt.close()
+    images.append(f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode()}")
+    return images
+
+
+def lut_render(suitability, soil, image_format):
+    # Encoded bytes, as stored in the layer store and served as-is
+    images = [render_raster(array, "RdYlGn", image_format=image_format) for array in suitability]
+    images.append(render_classes(soil, SOIL_LUT, image_format=image_format))
+    return images
+
+
+RENDERERS = {"legacy": legacy_render, "lut": lut_render}
+
+
+def read_status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_peak_memory(path, size, crops, image_format):
+    """Child process entry point: print peak RSS growth (KiB) for one render"""
+    suitability, soil = make_preview(np.random.default_rng(0), size, crops)
+    if path == "legacy":
+        import matplotlib.pyplot  # noqa: F401 - keep import-time allocations out of the measurement
+    # Reset the high-water mark so setup peaks don't mask the render (Linux)
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = read_status_kb("VmRSS")
+    RENDERERS[path](suitability, soil, image_format)
+    print(max(0, read_status_kb("VmHWM") - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="Preview side length (pixels)")
+    parser.add_argument("--crops", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--format", default=settings.MULTISPECTRAL_IMAGE_FORMAT, choices=["PNG", "WEBP"])
+    parser.add_argument("--memory-child", nargs=1, metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        measure_peak_memory(args.memory_child[0], args.size, args.crops, args.format)
+        return
+
+    suitability, soil = make_preview(np.random.default_rng(0), args.size, args.crops)
+    print(f"🧪 Rendering {args.crops} suitability maps + soil map from {args.size}x{args.size} previews "
+          f"(LUT path: {args.format}, {settings.MULTISPECTRAL_RENDER_SIZE}px)")
+
+    medians = {}
+    for name, renderer in RENDERERS.items():
+        images = renderer(suitability, soil, args.format)  # warm-up
+        times = np.empty(args.iterations)
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            renderer(suitability, soil, args.format)
+            times[i] = (time.perf_counter() - start) * 1000
+        medians[name] = np.median(times)
+        payload = sum(len(image) for image in images) / 1024
+        print(f"{name:<7} p50={medians[name]:8.1f}ms  max={times.max():8.1f}ms  payload={payload:8.1f} KiB")
+    print(f"Speed-up (p50): {medians['legacy'] / medians['lut']:.1f}x")
+
+    # Peak memory, one fresh process per path
+    peaks = {}
+    for name in RENDERERS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--memory-child", name,
+             "--size", str(args.size), "--crops", str(args.crops), "--format", args.format],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        peaks[name] = int(output) / 1024
+        print(f"{name:<7} peak RSS growth: {peaks[name]:7.1f} MiB")
+    if peaks["lut"] > 0:
+        print(f"Peak memory reduction: {peaks['legacy'] / peaks['lut']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark for crop suitability scoring: per-crop loop vs SuitabilityKernel.
+
+Scores one process_scene-sized tile of synthetic indices for a growing
+number of crops (copies of the built-in crops with shifted temperature
+ranges) and compares:
+
+- legacy: the analyzer's former per-crop scoring (a Python loop over
+  crop_params with full-tile temporaries per term and crop)
+- kernel: ``SuitabilityKernel.compute`` (all crops as one (crops, H, W)
+  computation in preallocated buffers, plus the best-crop raster)
+
+Peak allocation per call is measured with tracemalloc, which sees NumPy's
+array buffers; the kernel's buffers are allocated once, outside the
+measurement, as process_scene does.
+
+Usage:
+    python benchmarks/bench_suitability.py [--tile-size 1024] [--crops 4 8 16] [--iterations 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.index_kernel import IndexKernel
+from app.services.multispectral_service import MultispectralAnalyzer
+from app.services.suitability_kernel import SuitabilityKernel
+
+CONSTANTS = (3.342e-04, 0.1, 774.8853, 1321.0789)
+BAND_RANGES = {"B2": (7000, 12000), "B4": (6500, 14000), "B5": (8000, 25000), "B6": (7000, 20000), "B10": (20000, 45000)}
+
+
+def make_crop_params(base, count):
+    """Extend the built-in crops to ``count`` entries with shifted temperature ranges"""
+    params = {}
+    for i in range(count):
+        name, crop = list(base.items())[i % len(base)]
+        shift = i // len(base)
+        low, high = crop["temp_range"]
+        params[f"{name}-{shift}"] = {**crop, "temp_range": (low + shift, high + shift)}
+    return params
+
+
+def legacy_suitability(crop_params, indices):
+    """Per-crop scoring as the analyzer ran it before SuitabilityKernel"""
+    lst_norm = (indices['LST'] - (-20)) / (60 - (-20))
+    moisture = (indices['Moisture'] + 1) / 2
+    vegetation = (indices['NDVI'] + 1) / 2
+    soil_quality = (indices['Carbon'] + (1 - indices['BSI'])) / 2
+    suitability = {}
+    for crop, params in crop_params.items():
+        temp_center = np.mean(params['temp_range'])
+        temp_width = (params['temp_range'][1] - params['temp_range'][0]) / 2
+        temp_score = np.exp(-0.5 * ((lst_norm - temp_center / 60) / (temp_width / 60)) ** 2)
+        moisture_low, moisture_high = params['moisture_range']
+        moisture_score = np.where(
+            moisture < moisture_low,
+            moisture / moisture_low,
+            np.where(moisture > moisture_high, (1 - moisture) / (1 - moisture_high), 1)
+        )
+        veg_low, veg_high = params['vegetation_range']
+        veg_score = np.clip((vegetation - veg_low) / (veg_high - veg_low), 0, 1)
+        soil_low, soil_high = params['soil_range']
+        soil_score = np.clip((soil_quality - soil_low) / (soil_high - soil_low), 0, 1)
+        soil_comp = np.isin(indices['SoilType'], params['preferred_soil']).astype(float)
+        suitability[crop] = np.clip(
+            temp_score * 0.3 + moisture_score * 0.2 + veg_score * 0.2 + soil_score * 0.2 + soil_comp * 0.1, 0, 1
+        )
+    return suitability
+
+
+def measure(fn, iterations):
+    times = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times[i] = (time.perf_counter() - start) * 1000
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.median(times), peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--crops", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    shape = (args.tile_size, args.tile_size)
+    rng = np.random.default_rng(0)
+    bands = {code: rng.integers(low, high, shape).astype(np.float32) for code, (low, high) in BAND_RANGES.items()}
+    indices = IndexKernel(shape).compute(bands, CONSTANTS)
+    base = dict(MultispectralAnalyzer().crop_params)
+
+    print(f"🧪 Scoring crop suitability on a {args.tile_size}x{args.tile_size} tile")
+    for count in args.crops:
+        crop_params = make_crop_params(base, count)
+        kernel = SuitabilityKernel(crop_params, shape)
+        legacy_ms, legacy_peak = measure(lambda: legacy_suitability(crop_params, indices), args.iterations)
+        kernel_ms, kernel_peak = measure(lambda: kernel.compute(indices), args.iterations)
+        print(f"{count:>3} crops  legacy {legacy_ms:8.1f}ms (peak alloc {legacy_peak:7.1f} MiB)  "
+              f"kernel {kernel_ms:8.1f}ms (peak alloc {kernel_peak:5.1f} MiB)  "
+              f"{legacy_ms / kernel_ms:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.analysis_pool import (
+    AnalysisCancelledError,
+    AnalysisFailedError,
+    AnalysisPoolFullError,
+    AnalysisTimeoutError,
+    AnalysisWorkerPool,
+)
+from app.services.layer_store import layer_store
+from test_multispectral_tiling import write_scene
+
+
+def test_runs_analysis_in_worker_process_with_progress(tmp_path):
+    mtl_path = write_scene(str(tmp_path))
+    pool = AnalysisWorkerPool(max_workers=1, max_queued=0, timeout_seconds=120, poll_interval=0.05)
+    progress = []
+
+    async def record(fraction):
+        progress.append(fraction)
+
+    results = asyncio.run(pool.run(mtl_path, progress=record))
+
+    assert f"suitability_{results['best_crop']}" in results["layers"]
+    assert layer_store.read(results["layers"]["soil_type"]).startswith(b"\x89PNG")
+    assert results["analysis_summary"]["bands_processed"] == ["B2", "B4", "B5", "B6", "B10"]
+    assert progress and progress == sorted(progress) and progress[-1] == 1.0
+    assert pool.get_stats()["completed"] == 1
+
+
+def test_worker_errors_are_reported(tmp_path):
+    mtl_path = write_scene(str(tmp_path))
+    os.remove(mtl_path.replace("_MTL.txt", "_B4.TIF"))
+    pool = AnalysisWorkerPool(max_workers=1, timeout_seconds=120, poll_interval=0.05)
+
+    with pytest.raises(AnalysisFailedError, match="Missing required band: B4"):
+        asyncio.run(pool.run(mtl_path))
+    assert pool.get_stats()["failed"] == 1
+
+
+def test_timeout_and_cancel_terminate_the_worker(tmp_path):
+    mtl_path = write_scene(str(tmp_path))
+    pool = AnalysisWorkerPool(max_workers=1, max_queued=1, poll_interval=0.05)
+
+    async def scenario():
+        # Spawning and importing alone takes longer than this timeout
+        with pytest.raises(AnalysisTimeoutError):
+            await pool.run(mtl_path, timeout=0.2)
+
+        running = asyncio.create_task(pool.run(mtl_path, job_id="running"))
+        queued = asyncio.create_task(pool.run(mtl_path, job_id="queued"))
+        await asyncio.sleep(0.1)
+        with pytest.raises(AnalysisPoolFullError):
+            await pool.run(mtl_path)
+        assert pool.get_stats()["running"] == 1 and pool.get_stats()["queued"] == 1
+
+        assert pool.cancel("queued") and pool.cancel("running")
+        assert not pool.cancel("unknown")
+        for task in (running, queued):
+            with pytest.raises(AnalysisCancelledError):
+                await task
+
+    asyncio.run(scenario())
+    stats = pool.get_stats()
+    assert (stats["timed_out"], stats["cancelled"], stats["rejected"], stats["running"]) == (1, 2, 1, 0)
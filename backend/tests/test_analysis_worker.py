@@ -0,0 +1,151 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.services import analysis_worker as worker_module
+from app.services.analysis_pool import AnalysisFailedError, AnalysisPoolFullError, AnalysisTimeoutError
+from app.services.analysis_worker import AnalysisQueueWorker, find_mtl_path, retry_delay
+
+
+class FakeJob:
+    def __init__(self, work_dir, attempts=1, max_attempts=3):
+        self.id = "job-1"
+        self.user_id = "user-1"
+        self.work_dir = str(work_dir)
+        self.file_paths = [str(work_dir / "LC08_TEST_MTL.txt")]
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.error = None
+        self.calls = []
+
+    async def _record(self, name, *args):
+        self.calls.append((name, *args))
+        return True
+
+    async def complete(self, result):
+        return await self._record("complete", result)
+
+    async def fail(self, error):
+        return await self._record("fail", error)
+
+    async def retry_later(self, error, delay):
+        return await self._record("retry_later", error, delay)
+
+    async def release(self):
+        return await self._record("release")
+
+    async def heartbeat(self, lease_seconds):
+        return await self._record("heartbeat")
+
+    async def update_progress(self, fraction):
+        return True
+
+
+class FakePool:
+    max_workers = 1
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.cancelled = []
+
+    def has_capacity(self):
+        return True
+
+    def cancel(self, job_id):
+        self.cancelled.append(job_id)
+        return True
+
+    async def run(self, mtl_path, job_id=None, progress=None):
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        if self.outcome == "hang":
+            await asyncio.sleep(60)
+        await progress(0.5)
+        return self.outcome
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    (tmp_path / "LC08_TEST_MTL.txt").write_text("")
+
+    async def no_history(**kwargs):
+        return None
+
+    monkeypatch.setattr(worker_module.PredictionHistoryModel, "create", no_history)
+    return FakeJob(tmp_path)
+
+
+def run_job(outcome, job):
+    worker = AnalysisQueueWorker(FakePool(outcome), worker_id="test", heartbeat_seconds=60)
+    asyncio.run(worker.process(job))
+    return worker
+
+
+def test_retry_delay_backs_off_exponentially_up_to_the_cap():
+    assert [retry_delay(n, base=10, maximum=60) for n in (1, 2, 3, 4, 5)] == [10, 20, 40, 60, 60]
+
+
+def test_find_mtl_path_ignores_other_text_files():
+    assert find_mtl_path(["/x/notes.txt", "/x/SCENE_B4.TIF", "/x/SCENE_MTL.txt"]) == "/x/SCENE_MTL.txt"
+    assert find_mtl_path(["/x/notes.txt"]) is None
+
+
+def test_successful_job_completes_and_removes_its_files(job, tmp_path):
+    worker = run_job({"status": "success", "best_crop": "Maize"}, job)
+    assert job.calls[0][0] == "complete"
+    assert job.calls[0][1]["results"]["best_crop"] == "Maize"
+    assert not tmp_path.exists()
+    assert worker.get_stats()["completed"] == 1
+
+
+def test_transient_failures_are_retried_with_backoff(job, tmp_path):
+    run_job(AnalysisTimeoutError("too slow"), job)
+    run_job(AnalysisFailedError("worker exited", retryable=True), job)
+    assert [call[0] for call in job.calls] == ["retry_later", "retry_later"]
+    assert job.calls[0][2] == retry_delay(1)
+    assert tmp_path.exists()
+
+
+def test_last_attempt_and_analysis_errors_fail_permanently(job, tmp_path):
+    job.attempts = job.max_attempts
+    run_job(AnalysisTimeoutError("too slow"), job)
+    assert job.calls[-1][0] == "fail" and "after 3 attempts" in job.calls[-1][1]
+
+    job.attempts = 1
+    run_job(AnalysisFailedError("ValueError: Missing required band: B4"), job)
+    assert job.calls[-1][0] == "fail" and "Missing required band" in job.calls[-1][1]
+
+
+def test_busy_pool_and_shutdown_hand_the_job_back(job):
+    run_job(AnalysisPoolFullError(), job)
+    assert job.calls == [("release",)]
+
+    async def shutdown_mid_job():
+        worker = AnalysisQueueWorker(FakePool("hang"), worker_id="test", heartbeat_seconds=60)
+        task = asyncio.create_task(worker.process(job))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(shutdown_mid_job())
+    assert job.calls == [("release",), ("release",)]
+
+
+def test_worker_modules_import_without_the_classifier_model(tmp_path):
+    # A standalone queue worker only runs multispectral analyses
+    script = (
+        "import sys\n"
+        "import app.worker, app.services.analysis_pool, app.services.analysis_worker\n"
+        "from app.services.analysis_pool import _run_analysis\n"
+        "from app.services.multispectral_service import MultispectralAnalyzer\n"
+        "assert 'app.services.prediction_service' not in sys.modules\n"
+        "assert 'onnxruntime' not in sys.modules\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "MODEL_PATH": str(tmp_path / "missing.onnx"), "PYTHONPATH": backend}
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
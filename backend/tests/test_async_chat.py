@@ -0,0 +1,226 @@
+import asyncio
+import json
+import random
+
+import pytest
+from aiohttp import web
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routes import ai_router, chat_router
+from app.services.alleai_service import AlleAIService, ResponseStreamCleaner, alleai_service
+from app.services.http_client import http_client
+from app.utils.disconnect import cancel_on_disconnect
+
+
+async def start_stub_openrouter(delay=0.0):
+    """Local OpenAI-compatible chat endpoint that tracks how many calls overlap"""
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    async def completions(request):
+        body = await request.json()
+        state["calls"] += 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            state["active"] -= 1
+        reply = f"{len(body['messages'])} messages via {body['model']}"
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": reply}}]})
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions", state
+
+
+@pytest.fixture
+def stub_settings(monkeypatch):
+    def apply(url, concurrency=16):
+        monkeypatch.setattr(settings, "OPENROUTER_API_URL", url)
+        monkeypatch.setattr(settings, "CHAT_MAX_CONCURRENCY", concurrency)
+    return apply
+
+
+def test_concurrent_chats_are_bounded_by_the_semaphore(stub_settings):
+    async def scenario():
+        runner, url, state = await start_stub_openrouter(delay=0.1)
+        stub_settings(url, concurrency=2)
+        service = AlleAIService()
+        history = [{"role": "assistant", "content": "Hello"}]
+        try:
+            replies = await asyncio.gather(*[
+                service.chat_with_ai("Is my maize healthy?", conversation_history=history) for _ in range(6)
+            ])
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return replies, state, service.get_chat_stats()
+
+    replies, state, stats = asyncio.run(scenario())
+    assert replies == [f"3 messages via {settings.OPENROUTER_CHAT_MODEL}"] * 6
+    assert state["calls"] == 6 and state["peak"] == 2
+    assert stats["completed"] == 6 and stats["in_flight"] == 0 and stats["waiting"] == 0
+    # Blocking chats show their first text when the whole reply arrives
+    assert stats["ttft_ms_p50"] == stats["response_ms_p50"] >= 100
+
+
+class FakeRequest:
+    """Stands in for a starlette Request whose client goes away after ``after`` seconds"""
+
+    class url:
+        path = "/chat/"
+
+    def __init__(self, after):
+        self.after = after
+        self.started = None
+
+    async def is_disconnected(self):
+        loop = asyncio.get_running_loop()
+        self.started = self.started or loop.time()
+        return loop.time() - self.started >= self.after
+
+
+def test_client_disconnect_cancels_the_upstream_call(stub_settings):
+    async def scenario():
+        runner, url, state = await start_stub_openrouter(delay=5.0)
+        stub_settings(url)
+        service = AlleAIService()
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await cancel_on_disconnect(FakeRequest(after=0.1), service.chat_with_ai("Hi"), poll_interval=0.05)
+            await asyncio.sleep(0)
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return excinfo.value, service.get_chat_stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.status_code == 499
+    assert stats["cancelled"] == 1 and stats["in_flight"] == 0 and stats["completed"] == 0
+
+
+def test_upstream_errors_fall_back_to_a_canned_reply(stub_settings):
+    async def scenario():
+        stub_settings("http://127.0.0.1:9/api/v1/chat/completions")
+        service = AlleAIService()
+        try:
+            return await service.chat_with_ai("How do I water tomatoes?"), service.get_chat_stats()
+        finally:
+            await http_client.close()
+
+    reply, stats = asyncio.run(scenario())
+    assert "water" in reply.lower() and stats["failed"] == 1
+
+
+REPLY = (
+    "  here are some tips:\n\n1. **Isolate plants** now\n2. Remove leaves [see note] and {\"a\": 1} spray\n\n\n"
+    "Use \"neem\": \"oil\" carefully.\n```json\nok\n```\n   Done.  "
+)
+
+
+def test_incremental_cleaning_matches_cleaning_the_whole_reply():
+    rng = random.Random(7)
+    # The second reply only cleans to "A" because {...} spans are removed before [...] spans
+    for reply, min_pieces in ((REPLY, 6), ('a [b {c] d} e "f [g" h]', 1)):
+        expected = AlleAIService._clean_response(reply)
+        for _ in range(200):
+            cleaner, pieces, i = ResponseStreamCleaner(), [], 0
+            while i < len(reply):
+                size = rng.randint(1, 8)
+                pieces.append(cleaner.feed(reply[i:i + size]))
+                i += size
+            pieces.append(cleaner.finish())
+            assert "".join(pieces) == expected
+            assert sum(1 for piece in pieces if piece) >= min_pieces
+
+
+def test_json_replies_are_held_until_complete():
+    cleaner = ResponseStreamCleaner()
+    assert cleaner.feed('{"treatment": "neem oil", ') == ""
+    assert cleaner.feed('"severity": "low"}') == ""
+    assert cleaner.finish() == "**Treatment:** neem oil\n**Severity:** low"
+
+
+async def start_stub_openrouter_stream(deltas, delay):
+    """Local OpenRouter endpoint streaming ``deltas`` as SSE chunks ``delay`` seconds apart"""
+
+    async def completions(request):
+        body = await request.json()
+        assert body["stream"] is True
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        for delta in deltas:
+            chunk = {"choices": [{"delta": {"content": delta}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+
+def test_stream_yields_cleaned_text_before_the_reply_completes(stub_settings):
+    deltas = [REPLY[i:i + 3] for i in range(0, len(REPLY), 3)]
+
+    async def scenario():
+        runner, url = await start_stub_openrouter_stream(deltas, delay=0.01)
+        stub_settings(url)
+        service = AlleAIService()
+        loop = asyncio.get_running_loop()
+        started, arrivals = loop.time(), []
+        try:
+            async for text in service.stream_chat_with_ai("Tips?"):
+                arrivals.append((loop.time() - started, text))
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return arrivals, service.get_chat_stats()
+
+    arrivals, stats = asyncio.run(scenario())
+    assert "".join(text for _, text in arrivals) == AlleAIService._clean_response(REPLY)
+    # The first words arrive long before the ~0.6s the whole reply takes
+    assert arrivals[0][0] < arrivals[-1][0] / 4
+    assert stats["streamed"] == 1 and stats["in_flight"] == 0
+    assert 0 < stats["ttft_ms_p50"] < stats["response_ms_p50"]
+
+
+def test_stream_routes_send_token_and_done_events(monkeypatch):
+    async def fake_stream(user_message, conversation_history=None, models=None):
+        for text in ["\"Rotate", " crops", " yearly.\""]:
+            yield text
+
+    monkeypatch.setattr(alleai_service, "stream_chat_with_ai", fake_stream)
+    app = FastAPI()
+    app.include_router(ai_router)
+    app.include_router(chat_router)
+    client = TestClient(app)
+
+    def events(response):
+        return [
+            (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in response.text.strip().split("\n\n")
+        ]
+
+    response = client.post("/chat/stream", json={"message": "Tips?"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert events(response) == [
+        ("token", {"text": "\"Rotate"}), ("token", {"text": " crops"}), ("token", {"text": " yearly.\""}),
+        ("done", {"message": "\"Rotate crops yearly.\""})
+    ]
+    # /ai/chat/stream finishes with the same cleanup /ai/chat applies
+    assert events(client.post("/ai/chat/stream", json={"prompt": "Tips?"}))[-1] == ("done", {"message": "Rotate crops yearly."})
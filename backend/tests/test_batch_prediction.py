@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+import io
+import json
+import zipfile
+
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+from app.models.schemas import PredictionItem
+
+prediction_router = importlib.import_module("app.routes.prediction_router")
+
+
+def make_upload(filename, data, content_type):
+    return UploadFile(io.BytesIO(data), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+class FakeUser:
+    id = "64b7f0c2a1b2c3d4e5f60718"
+    email = "agent@example.com"
+
+
+def encode_png(value):
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((16, 16, 3), value, dtype=np.uint8)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_read_batch_uploads_expands_zip_archives():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("plot/a.png", encode_png(1))
+        zf.writestr("plot/notes.txt", "ignored")
+        zf.writestr("__MACOSX/plot/._a.png", "ignored")
+    uploads = [
+        make_upload("b.png", encode_png(2), "image/png"),
+        make_upload("plot.zip", archive.getvalue(), "application/zip"),
+    ]
+    images = asyncio.run(prediction_router._read_batch_uploads(uploads))
+    assert [name for name, _ in images] == ["b.png", "plot/a.png"]
+
+
+def test_read_batch_uploads_enforces_image_limit(monkeypatch):
+    monkeypatch.setattr(prediction_router.settings, "BATCH_PREDICTION_MAX_IMAGES", 1)
+    uploads = [make_upload(f"{i}.png", encode_png(i), "image/png") for i in range(2)]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(prediction_router._read_batch_uploads(uploads))
+    assert error.value.status_code == 413
+
+
+def test_read_batch_uploads_enforces_the_total_size_across_uploads(monkeypatch):
+    first, second = encode_png(1), encode_png(2)
+    monkeypatch.setattr(prediction_router.settings, "BATCH_PREDICTION_MAX_TOTAL_SIZE", len(first) + len(second) - 1)
+    late = UploadFile(io.BytesIO(second), size=len(second), filename="b.png", headers=Headers({"content-type": "image/png"}))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(prediction_router._read_batch_uploads([make_upload("a.png", first, "image/png"), late]))
+    assert error.value.status_code == 413
+    assert error.value.detail.startswith("Batch too large")
+    # Rejected from its declared size against what the first upload left, before reading it
+    assert late.file.tell() == 0
+
+
+def zip_with_flipped_bytes(member_data, flip):
+    """A zip archive holding leaf.png with ``flip`` applied to its raw bytes"""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("leaf.png", member_data)
+    return flip(bytearray(archive.getvalue()))
+
+
+def mark_encrypted(data):
+    # General purpose flag bit 0 in the local header and the central directory entry
+    data[6] |= 0x1
+    data[data.rfind(b"PK\x01\x02") + 8] |= 0x1
+    return bytes(data)
+
+
+def corrupt_deflate_stream(data):
+    data[30 + len("leaf.png")] = 0xFF  # Reserved deflate block type
+    return bytes(data)
+
+
+@pytest.mark.parametrize("flip", [mark_encrypted, corrupt_deflate_stream])
+def test_read_batch_uploads_rejects_unreadable_zip_members(flip):
+    archive = zip_with_flipped_bytes(encode_png(3) * 4, flip)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(prediction_router._read_batch_uploads([make_upload("plot.zip", archive, "application/zip")]))
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid zip archive: plot.zip"
+
+
+def test_stream_batch_predictions_dedupes_recommendations(monkeypatch):
+    calls, saved = [], []
+
+    async def predict_batch(arrays, top_k):
+        # Class follows the first pixel so images 0 and 2 share a class
+        return [
+            [PredictionItem(**{"class": f"Tomato class {int(a.flat[0]) % 2}", "confidence": 0.9, "confidence_percentage": "90.00%"})]
+            for a in arrays
+        ]
+
+    async def get_recommendations(disease_name, confidence, crop_type, models=None):
+        calls.append(disease_name)
+        return {"severity_level": "High"}
+
+    async def create_many(user_id, entries):
+        saved.extend(entries)
+
+    monkeypatch.setattr(prediction_router.inference_engine, "predict_batch", predict_batch)
+    monkeypatch.setattr(prediction_router.alleai_service, "get_disease_recommendations", get_recommendations)
+    monkeypatch.setattr(prediction_router.PredictionHistoryModel, "create_many", create_many)
+
+    images = [("a.png", encode_png(0)), ("b.png", encode_png(1)), ("c.png", encode_png(2)), ("bad.png", b"junk")]
+
+    async def collect():
+        stream = prediction_router._stream_batch_predictions(images, 1, None, FakeUser())
+        return [json.loads(line) async for line in stream]
+
+    lines = asyncio.run(collect())
+    predictions = [line for line in lines if line["type"] == "prediction"]
+    assert sorted(line["index"] for line in predictions) == [0, 1, 2, 3]
+    assert [line["success"] for line in predictions if line["index"] == 3] == [False]
+    assert sorted(calls) == ["Tomato class 0", "Tomato class 1"]
+    assert sum(line["type"] == "recommendations" for line in lines) == 2
+    assert lines[-1] == {
+        "type": "summary", "total": 4, "succeeded": 3, "failed": 1,
+        "distinct_classes": 2, "history_saved": True
+    }
+    assert [entry["severity"] for entry in saved] == ["High"] * 3
+    assert saved[0]["crop_type"] == "Tomato"
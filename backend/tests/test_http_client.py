@@ -0,0 +1,76 @@
+import asyncio
+
+from aiohttp import web
+
+from app.services.alleai_service import AlleAIService
+from app.services.http_client import HTTPClient, http_client
+
+
+async def start_stub_llm():
+    """Local AlleAI-style endpoint that records the client port of every request"""
+    peers = []
+
+    async def completions(request):
+        peers.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"responses": {"responses": {"gpt-4o": "Rotate crops yearly."}}})
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions", peers
+
+
+def test_shared_session_reuses_connections():
+    async def scenario():
+        runner, url, peers = await start_stub_llm()
+        client = HTTPClient(max_connections_per_host=2)
+        try:
+            await client.start()
+            session = await client.get_session()
+            for _ in range(5):
+                async with session.post(url, json={}) as response:
+                    assert response.status == 200
+            assert await client.get_session() is session
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return peers, client.get_stats()
+
+    peers, stats = asyncio.run(scenario())
+    assert len(peers) == 5 and len(set(peers)) == 1
+    assert stats["sessions_created"] == 1 and not stats["active"]
+
+
+def test_alleai_requests_share_the_process_session():
+    async def scenario():
+        runner, url, peers = await start_stub_llm()
+        service = AlleAIService()
+        service.api_url = url
+        try:
+            replies = [
+                await service._make_alleai_request([{"role": "user", "content": "Soil tips?"}], models=["gpt-4o"])
+                for _ in range(3)
+            ]
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return replies, peers
+
+    replies, peers = asyncio.run(scenario())
+    assert all("Rotate crops yearly." in reply for reply in replies)
+    assert len(peers) == 3 and len(set(peers)) == 1
+
+
+def test_session_follows_the_running_event_loop():
+    client = HTTPClient()
+
+    async def get():
+        return await client.get_session()
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    assert first is not second and client.get_stats()["sessions_created"] == 2
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, UnidentifiedImageError
+
+from app.utils.image_decode import decode_image
+
+
+def encode(image, format, **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **kwargs)
+    return buffer.getvalue()
+
+
+def test_jpeg_is_decoded_near_target_size():
+    data = encode(Image.new("RGB", (2000, 1500), (10, 200, 30)), "JPEG")
+    array = decode_image(data, target_size=112)
+    assert array.dtype == np.uint8 and array.shape[2] == 3
+    assert 112 <= min(array.shape[:2]) < 375
+    assert abs(int(array[..., 1].mean()) - 200) < 3
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+    data = encode(Image.new("RGB", (1600, 800)), "JPEG", exif=exif.tobytes())
+    height, width = decode_image(data, target_size=112).shape[:2]
+    assert height > width
+
+
+def test_palette_png_is_reduced_and_converted():
+    image = Image.new("P", (900, 600))
+    image.putpalette([0, 0, 255] * 256)
+    array = decode_image(encode(image, "PNG"), target_size=112)
+    assert array.shape == (120, 180, 3)
+    assert array[0, 0].tolist() == [0, 0, 255]
+
+
+def test_invalid_bytes_raise():
+    with pytest.raises(UnidentifiedImageError):
+        decode_image(b"not an image")
@@ -0,0 +1,84 @@
+import numpy as np
+
+from app.services.index_kernel import INDEX_LAYERS, IndexKernel
+
+CONSTANTS = (3.342e-04, 0.1, 774.8853, 1321.0789)
+
+
+def make_bands(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    ranges = {"B2": (7000, 12000), "B4": (6500, 14000), "B5": (8000, 25000), "B6": (7000, 20000), "B10": (20000, 45000)}
+    bands = {code: rng.integers(low, high, shape).astype(np.float32) for code, (low, high) in ranges.items()}
+    bands["B5"][0, :4] = 0  # exercise the zero-denominator guards
+    bands["B4"][0, :4] = 0
+    return bands
+
+
+def reference_lst(band10, constants, lst_mean=None, lst_std=None):
+    """Whole-array LST (°C): clipped to [-20, 60], then outliers masked when the MTL constants are known"""
+    if constants is None:
+        return np.clip(band10 * 0.1 - 273.15, -20, 60)
+    ML, AL, K1, K2 = constants
+    lst = np.clip(K2 / np.log((K1 / (ML * band10 + AL)) + 1) - 273.15, -20, 60)
+    if lst_mean is None:
+        lst_mean, lst_std = np.mean(lst), np.std(lst)
+    lst[np.abs(lst - lst_mean) > 3 * lst_std] = np.nan
+    return lst
+
+
+def reference_indices(bands, lst):
+    """Whole-array computation of every index layer, one expression per index"""
+    blue, red, nir, swir = bands["B2"], bands["B4"], bands["B5"], bands["B6"]
+    ndvi = np.clip((nir - red) / (nir + red + 1e-10), -1, 1)
+    ndmi = np.clip((nir - swir) / (nir + swir + 1e-10), -1, 1)
+    ndbi = np.clip((swir - nir) / (swir + nir + 1e-10), -1, 1)
+    bsi = np.clip(((swir + red) - (nir + blue)) / ((swir + red) + (nir + blue) + 1e-10), -1, 1)
+    lst_norm = np.clip((lst - (-20)) / (60 - (-20)), 0, 1)
+    soil_type = np.zeros_like(bsi)
+    soil_type[(bsi > 0.5) & (ndvi < 0.2)] = 0  # Sandy
+    soil_type[(bsi > -0.2) & (bsi <= 0.5) & (ndvi < 0.3)] = 1  # Loamy
+    soil_type[(bsi <= -0.2) & (ndvi < 0.3)] = 2  # Clayey
+    soil_type[ndvi >= 0.3] = 3  # Organic
+    return {
+        "NDVI": ndvi,
+        "EVI": np.clip(2.5 * (nir - red) / (nir + 6 * red - 7.5 * blue + 1), -1, 1),
+        "SAVI": np.clip((nir - red) / (nir + red + 0.5) * 1.5, -1, 1),
+        "NDMI": ndmi,
+        "NDBI": ndbi,
+        "BSI": bsi,
+        "Carbon": np.clip((1 - ndvi) * (1 - lst_norm), 0, 1),
+        "Methane": np.clip((ndbi + (1 - ndvi)) / 2, 0, 1),
+        "Moisture": np.clip((ndvi + ndmi) / 2, -1, 1),
+        "LST": lst,
+        "SoilType": soil_type
+    }
+
+
+def test_kernel_matches_float64_reference():
+    bands = make_bands((64, 48))
+    kernel = IndexKernel((64, 48))
+    lst = kernel.clipped_lst(bands["B10"], CONSTANTS).astype(np.float64)
+    lst_mean, lst_std = float(lst.mean()), float(lst.std()) / 2  # tight std so some pixels are masked
+    result = kernel.compute(bands, CONSTANTS, lst_mean, lst_std)
+    bands64 = {code: band.astype(np.float64) for code, band in bands.items()}
+    expected = reference_indices(bands64, reference_lst(bands64["B10"], CONSTANTS, lst_mean, lst_std))
+
+    assert tuple(result) == INDEX_LAYERS
+    for name in INDEX_LAYERS:
+        assert result[name].dtype == np.float32
+        if name == "SoilType":
+            # Only pixels sitting on a class threshold may differ
+            assert np.mean(result[name] != expected[name]) < 1e-3
+        else:
+            np.testing.assert_allclose(result[name], expected[name], atol=1e-4, equal_nan=True, err_msg=name)
+    assert np.isnan(result["LST"]).any()
+    np.testing.assert_array_equal(result["NDBI"], -result["NDMI"])
+
+
+def test_kernel_reuses_buffers_for_smaller_edge_tiles():
+    kernel = IndexKernel((32, 32))
+    full = kernel.compute(make_bands((32, 32)), None)
+    ndvi_buffer = full["NDVI"]
+    edge = kernel.compute(make_bands((10, 7), seed=1), None)
+    assert edge["NDVI"].shape == (10, 7)
+    assert np.shares_memory(edge["NDVI"], ndvi_buffer)
@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+
+from app.services.inference_engine import MicroBatchingEngine
+
+
+class FakeService:
+    """Records batch sizes; images with a negative first pixel fail preprocessing"""
+
+    def __init__(self, fail_batches=False):
+        self.batch_sizes = []
+        self.fail_batches = fail_batches
+
+    def get_max_batch_size(self):
+        return None
+
+    def preprocess_image(self, image, out=None):
+        if image.flat[0] < 0:
+            raise ValueError("bad image")
+        out[...] = image.flat[0]
+        return out
+
+    def run_inference(self, batch):
+        self.batch_sizes.append(batch.shape[0])
+        if self.fail_batches and batch.shape[0] > 1:
+            raise RuntimeError("batch failed")
+        if self.fail_batches and batch[0, 0, 0, 0] == 13:
+            raise RuntimeError("poisoned image")
+        return batch[:, 0, 0, :3].copy()
+
+    def logits_to_predictions(self, logits, top_k=3):
+        return [float(logits[0])] * top_k
+
+    def predict(self, image, top_k=3):
+        return [float(image.flat[0])] * top_k
+
+
+def run_concurrently(engine, values, top_k=2):
+    async def scenario():
+        await engine.start()
+        try:
+            images = [np.full((8, 8, 3), v, dtype=np.float32) for v in values]
+            return await asyncio.gather(
+                *(engine.predict(image, top_k) for image in images),
+                return_exceptions=True
+            )
+        finally:
+            await engine.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_concurrent_requests_are_batched():
+    service = FakeService()
+    engine = MicroBatchingEngine(service, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(engine, range(20))
+    assert results == [[float(v)] * 2 for v in range(20)]
+    assert max(service.batch_sizes) > 1
+    assert sum(service.batch_sizes) == 20
+    assert all(size <= 8 for size in service.batch_sizes)
+    stats = engine.get_stats()
+    assert stats["total_items"] == 20
+    assert sum(stats["batch_size_histogram"].values()) == stats["total_batches"]
+
+
+def test_preprocessing_failure_is_isolated():
+    engine = MicroBatchingEngine(FakeService(), max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(engine, [1, -1, 2])
+    assert results[0] == [1.0, 1.0]
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == [2.0, 2.0]
+
+
+def test_batch_failure_falls_back_to_single_images():
+    service = FakeService(fail_batches=True)
+    engine = MicroBatchingEngine(service, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(engine, [1, 13, 2])
+    assert results[0] == [1.0, 1.0]
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == [2.0, 2.0]
+    assert engine.get_stats()["isolation_reruns"] >= 1
+
+
+def test_disabled_engine_runs_unbatched():
+    service = FakeService()
+    engine = MicroBatchingEngine(service, enabled=False)
+    results = run_concurrently(engine, [3, 4])
+    assert results == [[3.0, 3.0], [4.0, 4.0]]
+    assert service.batch_sizes == []
+
+
+def test_predict_batch_chunks_and_isolates_failures():
+    service = FakeService()
+    engine = MicroBatchingEngine(service, max_batch_size=4)
+    images = [np.full((8, 8, 3), v, dtype=np.float32) for v in [1, 2, -1, 3, 4, 5]]
+    results = asyncio.run(engine.predict_batch(images, top_k=1))
+    assert service.batch_sizes == [3, 2]
+    assert results[:2] == [[1.0], [2.0]]
+    assert isinstance(results[2], ValueError)
+    assert results[3:] == [[3.0], [4.0], [5.0]]
+    assert engine.get_stats()["failed_items"] == 1
+
+
+def test_stop_fails_batches_the_collector_is_holding():
+    async def scenario(max_wait_ms, busy):
+        engine = MicroBatchingEngine(FakeService(), max_batch_size=8, max_wait_ms=max_wait_ms)
+        await engine.start()
+        if busy:
+            # Every batch slot taken: the collected batch waits for one
+            await engine._batch_slots.acquire()
+        images = [np.full((8, 8, 3), v, dtype=np.float32) for v in (1, 2)]
+        tasks = [asyncio.create_task(engine.predict(image)) for image in images]
+        await asyncio.sleep(0.05)
+        await engine.stop()
+        return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1)
+
+    # Still inside the max_wait window, then blocked on a batch slot
+    for max_wait_ms, busy in ((10_000, False), (0, True)):
+        results = asyncio.run(scenario(max_wait_ms, busy))
+        assert all(isinstance(r, RuntimeError) and "shutting down" in str(r) for r in results)
@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from app.services.inference_executor import BoundedInferenceExecutor, InferenceQueueFullError
+
+
+def test_rejects_when_queue_is_full():
+    executor = BoundedInferenceExecutor(max_workers=1, max_queue_size=1, retry_after=7)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait)
+        queued = executor.submit(lambda: 42)
+        with pytest.raises(InferenceQueueFullError) as exc_info:
+            executor.submit(lambda: 0)
+        assert exc_info.value.retry_after == 7
+        stats = executor.get_stats()
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] >= 1
+    finally:
+        release.set()
+    assert running.result(timeout=5) is True
+    assert queued.result(timeout=5) == 42
+    executor.shutdown()
+
+
+def test_capacity_is_released_after_completion():
+    executor = BoundedInferenceExecutor(max_workers=1, max_queue_size=0)
+    for value in range(5):
+        assert executor.submit(lambda v=value: v * 2).result(timeout=5) == value * 2
+    stats = executor.get_stats()
+    assert stats["completed"] == 5
+    assert stats["rejected"] == 0
+    executor.shutdown()
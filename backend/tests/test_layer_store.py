@@ -0,0 +1,51 @@
+import os
+import time
+
+from app.services.layer_store import LayerStore, sign_layer, verify_layer_signature
+from app.services.multispectral_service import MultispectralAnalyzer
+from app.services.scene_cache import SceneResultCache
+
+
+def test_layers_are_content_addressed(tmp_path):
+    store = LayerStore(directory=str(tmp_path))
+    ref = store.put(b"\x89PNG one", "PNG")
+    assert store.put(b"\x89PNG one", "PNG") == ref
+    assert ref["media_type"] == "image/png" and ref["size"] == 8
+    assert store.read(ref) == b"\x89PNG one"
+
+    webp = store.put(b"RIFF two", "WEBP")
+    assert store.path_for(webp).endswith(".webp") and webp["digest"] != ref["digest"]
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_prune_keeps_recently_touched_layers(tmp_path):
+    store = LayerStore(directory=str(tmp_path), retention_seconds=60)
+    old, used = store.put(b"old"), store.put(b"used")
+    past = time.time() - 120
+    for ref in (old, used):
+        os.utime(store.path_for(ref), (past, past))
+    assert store.touch({"soil_type": used})
+
+    assert store.prune() == 1
+    assert store.touch({"soil_type": used}) and not store.touch({"soil_type": old})
+
+
+def test_signed_layer_urls():
+    expires = int(time.time()) + 60
+    signature = sign_layer("job1", "soil_type", expires)
+    assert verify_layer_signature("job1", "soil_type", expires, signature)
+    assert not verify_layer_signature("job2", "soil_type", expires, signature)
+    assert not verify_layer_signature("job1", "suitability_Maize", expires, signature)
+    expired = int(time.time()) - 1
+    assert not verify_layer_signature("job1", "soil_type", expired, sign_layer("job1", "soil_type", expired))
+
+
+def test_scene_cache_misses_once_layers_are_pruned(tmp_path):
+    store = LayerStore(directory=str(tmp_path / "layers"))
+    cache = SceneResultCache(directory=str(tmp_path / "cache"), analyzer=MultispectralAnalyzer(layer_store=store))
+    results = {"best_crop": "Maize", "layers": {"soil_type": store.put(b"soil")}}
+    cache.set("A__p__1", results)
+    assert cache.get("A__p__1") == results
+
+    assert store.prune(max_age_seconds=-1) == 1
+    assert cache.get("A__p__1") is None
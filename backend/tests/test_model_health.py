@@ -0,0 +1,78 @@
+import asyncio
+
+from app.services.model_health import ModelHealthMonitor
+
+
+class FakeService:
+    """Minimal stand-in for PredictionService"""
+
+    def __init__(self, valid=True):
+        self.loaded = True
+        self.valid = valid
+        self.last_load_attempt = None
+        self.validations = 0
+        self.loads = 0
+
+    def is_model_loaded(self):
+        return self.loaded
+
+    def validate_model(self):
+        self.validations += 1
+        return self.valid
+
+    def load_model(self, force_reload=False):
+        self.loads += 1
+        self.loaded = True
+        self.valid = True
+
+
+def test_success_does_not_validate():
+    service = FakeService()
+    monitor = ModelHealthMonitor(service, interval_seconds=60, failure_threshold=3)
+    for _ in range(10):
+        monitor.record_success()
+    assert service.validations == 0
+    assert monitor.get_status()["total_successes"] == 10
+
+
+def test_check_reloads_invalid_model():
+    service = FakeService(valid=False)
+    monitor = ModelHealthMonitor(service, interval_seconds=60, failure_threshold=3)
+    assert monitor.check_now() is True
+    assert service.loads == 1
+    status = monitor.get_status()
+    assert status["reloads"] == 1
+    assert status["last_check_ok"] is True
+
+
+def test_check_loads_missing_model():
+    service = FakeService()
+    service.loaded = False
+    monitor = ModelHealthMonitor(service, interval_seconds=60, failure_threshold=3)
+    assert monitor.is_healthy() is False
+    monitor.check_now()
+    assert service.loads == 1
+    assert monitor.is_healthy() is True
+
+
+def test_failures_trigger_background_check():
+    service = FakeService()
+    monitor = ModelHealthMonitor(service, interval_seconds=3600, failure_threshold=2)
+
+    async def scenario():
+        await monitor.start()
+        try:
+            monitor.record_failure(RuntimeError("boom"))
+            await asyncio.sleep(0.05)
+            assert service.validations == 0
+            monitor.record_failure(RuntimeError("boom"))
+            for _ in range(50):
+                if service.validations:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await monitor.stop()
+
+    asyncio.run(scenario())
+    assert service.validations == 1
+    assert monitor.get_status()["consecutive_failures"] == 0
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.windows import Window
+
+from app.services.multispectral_service import LAYER_RANGES, MultispectralAnalyzer, PreviewCanvas
+from app.services.raster_stats import DEFAULT_BINS
+from test_index_kernel import reference_indices, reference_lst
+from test_suitability_kernel import reference_suitability
+
+PRODUCT_ID = "LC08_L1TP_194056_20241221_20241228_02_T1"
+BAND_RANGES = {"B2": (7000, 12000), "B4": (6500, 14000), "B5": (8000, 25000), "B6": (7000, 20000), "B10": (20000, 45000)}
+
+
+def write_scene(directory, height=200, width=170, block=32, seed=0):
+    """Write a synthetic tiled Landsat-like scene and return its MTL path"""
+    rng = np.random.default_rng(seed)
+    mtl_path = os.path.join(directory, f"{PRODUCT_ID}_MTL.txt")
+    with open(mtl_path, "w") as f:
+        f.write(
+            "RADIANCE_MULT_BAND_10 = 3.3420E-04\n"
+            "RADIANCE_ADD_BAND_10 = 0.10000\n"
+            "K1_CONSTANT_BAND_10 = 774.8853\n"
+            "K2_CONSTANT_BAND_10 = 1321.0789\n"
+        )
+    for band, (low, high) in BAND_RANGES.items():
+        data = rng.integers(low, high, (height, width)).astype(np.uint16)
+        profile = dict(driver="GTiff", height=height, width=width, count=1, dtype="uint16",
+                       tiled=True, blockxsize=block, blockysize=block)
+        with rasterio.open(os.path.join(directory, f"{PRODUCT_ID}_{band}.TIF"), "w", **profile) as dst:
+            dst.write(data, 1)
+    return mtl_path
+
+
+@pytest.fixture
+def scene(tmp_path):
+    return write_scene(str(tmp_path))
+
+
+def full_scene_reference(analyzer, mtl_path):
+    """Whole-array computation over fully loaded bands, as the analysis ran before tiling"""
+    bands = analyzer.find_band_files(mtl_path)
+    loaded = {}
+    for code in BAND_RANGES:
+        with rasterio.open(bands[code]) as src:
+            loaded[code] = src.read(1, out_dtype="float32")
+    lst = reference_lst(loaded["B10"], analyzer.read_lst_constants(mtl_path))
+    indices = reference_indices(loaded, lst)
+    return indices, reference_suitability(analyzer.crop_params, indices)
+
+
+def test_tiled_scene_matches_whole_array_computation(scene):
+    analyzer = MultispectralAnalyzer(tile_size=64, preview_size=1000)
+    progress = []
+    summary = analyzer.process_scene(analyzer.find_band_files(scene), scene, progress=progress.append)
+    indices, suitability = full_scene_reference(analyzer, scene)
+
+    for stats in summary["env_stats"]:
+        array = indices[stats["name"]]
+        assert stats["mean"] == pytest.approx(np.nanmean(array, dtype=np.float64), rel=1e-4, abs=1e-6)
+        assert stats["min"] == pytest.approx(np.nanmin(array), rel=1e-4, abs=1e-6)
+        assert stats["max"] == pytest.approx(np.nanmax(array), rel=1e-4, abs=1e-6)
+        # Quartiles come from a histogram: within one bin width (plus float32 rounding)
+        low, high = LAYER_RANGES[stats["name"]]
+        tolerance = (high - low) / DEFAULT_BINS + 1e-4
+        assert abs(stats["percentile_25"] - np.nanpercentile(array, 25)) <= tolerance
+        assert abs(stats["percentile_75"] - np.nanpercentile(array, 75)) <= tolerance
+    for stats in summary["crop_stats"]:
+        assert stats["mean"] == pytest.approx(np.nanmean(suitability[stats["crop"]], dtype=np.float64), rel=1e-4)
+        # Preview at factor 1 is the full layer
+        np.testing.assert_allclose(summary["previews"][stats["crop"]], suitability[stats["crop"]], atol=1e-4)
+
+    best = np.argmax(np.stack([suitability[crop] for crop in analyzer.crop_params]), axis=0)
+    valid = ~np.isnan(suitability["Maize"])
+    expected_counts = np.bincount(best[valid], minlength=len(analyzer.crop_params))
+    # Near-ties may resolve differently in float32
+    assert np.abs(np.array(list(summary["best_crop_counts"].values())) - expected_counts).sum() <= valid.sum() * 1e-3
+    assert summary["soil_counts"].tolist() == np.bincount(indices["SoilType"].ravel().astype(int), minlength=4).tolist()
+    assert progress[-1] == 1.0 and progress == sorted(progress)
+
+
+def test_parallel_band_reads_match_serial(scene):
+    bands = MultispectralAnalyzer().find_band_files(scene)
+    serial = MultispectralAnalyzer(tile_size=64, read_workers=1).process_scene(bands, scene)
+    parallel = MultispectralAnalyzer(tile_size=64, read_workers=5).process_scene(bands, scene)
+
+    assert parallel["env_stats"] == serial["env_stats"]
+    assert parallel["crop_stats"] == serial["crop_stats"]
+    assert parallel["soil_counts"].tolist() == serial["soil_counts"].tolist()
+    for name, preview in serial["previews"].items():
+        np.testing.assert_array_equal(parallel["previews"][name], preview)
+
+
+def test_tiles_align_to_blocks_and_cover_scene(scene):
+    analyzer = MultispectralAnalyzer(tile_size=100)
+    with rasterio.open(analyzer.find_band_files(scene)["B4"]) as src:
+        windows = list(analyzer.iter_tiles(src))
+    assert {(w.height, w.width) for w in windows[:1]} == {(96, 96)}
+    assert sum(w.height * w.width for w in windows) == 200 * 170
+
+
+def test_preview_canvas_samples_on_the_scene_grid():
+    layer = np.arange(100 * 90, dtype=np.float32).reshape(100, 90)
+    canvas = PreviewCanvas(100, 90, max_size=30)
+    for row in range(0, 100, 37):
+        for col in range(0, 90, 41):
+            window = Window(col, row, min(41, 90 - col), min(37, 100 - row))
+            canvas.add(window, layer[row:row + window.height, col:col + window.width])
+    np.testing.assert_array_equal(canvas.array, layer[::canvas.factor, ::canvas.factor])
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from app.models.schemas import PredictionItem
+from app.services.cache import TTLCache
+from app.services.prediction_cache import PredictionResultCache
+
+
+class FakeService:
+    def __init__(self):
+        self.model_version = "v1"
+        self.listeners = []
+
+    def add_reload_listener(self, callback):
+        self.listeners.append(callback)
+
+    def reload(self, version):
+        self.model_version = version
+        for callback in self.listeners:
+            callback(self)
+
+
+def make_predictions():
+    return [PredictionItem(**{"class": "tomato_healthy", "confidence": 0.8, "confidence_percentage": "80.00%"})]
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=4, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_prediction_cache_round_trip_and_reload_invalidation():
+    service = FakeService()
+    cache = PredictionResultCache(service, enabled=True, max_entries=8, ttl_seconds=60, shared=False)
+    image_hash = cache.hash_image(b"leaf photo bytes")
+
+    async def scenario():
+        assert await cache.get(image_hash, 3) is None
+        await cache.set(image_hash, 3, make_predictions())
+        hit = await cache.get(image_hash, 3)
+        other_top_k = await cache.get(image_hash, 1)
+        service.reload("v2")
+        after_reload = await cache.get(image_hash, 3)
+        return hit, other_top_k, after_reload
+
+    hit, other_top_k, after_reload = asyncio.run(scenario())
+    assert [item.class_name for item in hit] == ["tomato_healthy"]
+    assert other_top_k is None
+    assert after_reload is None
+    assert len(cache.cache.local) == 0
+    assert cache.get_stats()["hits"] == 1
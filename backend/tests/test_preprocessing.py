@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.prediction_service import PredictionService, IMAGENET_MEAN, IMAGENET_STD
+
+
+@pytest.fixture
+def service():
+    """Prediction service without a loaded model (preprocessing only)"""
+    return PredictionService(auto_load=False)
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(42)
+    return rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+
+def test_preprocess_shape_and_dtype(service, image):
+    tensor = service.preprocess_image(image)
+    assert tensor.shape == (1, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE)
+    assert tensor.dtype == np.float32
+
+
+def test_preprocess_is_deterministic(service, image):
+    first = service.preprocess_image(image).copy()
+    second = service.preprocess_image(image)
+    np.testing.assert_array_equal(first, second)
+
+
+def test_preprocess_matches_imagenet_normalization(service):
+    # A uniform image makes the expected value independent of resizing
+    image = np.full((200, 300, 3), (10, 128, 250), dtype=np.uint8)
+    tensor = service.preprocess_image(image)
+    expected = (np.array([10, 128, 250]) / 255.0 - np.array(IMAGENET_MEAN)) / np.array(IMAGENET_STD)
+    for channel in range(3):
+        np.testing.assert_allclose(tensor[0, channel], expected[channel], rtol=1e-5, atol=1e-5)
+
+
+def test_preprocess_writes_into_given_buffer(service, image):
+    batch = np.zeros((2, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE), dtype=np.float32)
+    result = service.preprocess_image(image, out=batch[1])
+    assert np.shares_memory(result, batch)
+    assert np.any(batch[1] != 0)
+    assert not np.any(batch[0])
+
+
+def test_preprocess_handles_grayscale_and_rgba(service):
+    gray = np.zeros((64, 64), dtype=np.uint8)
+    rgba = np.zeros((64, 64, 4), dtype=np.uint8)
+    assert service.preprocess_image(gray).shape == (1, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE)
+    assert service.preprocess_image(rgba).shape == (1, 3, settings.IMAGE_SIZE, settings.IMAGE_SIZE)
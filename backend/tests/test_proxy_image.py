@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+from aiohttp import web
+from fastapi import FastAPI
+from starlette.requests import ClientDisconnect
+
+from app.routes import ai_router
+from app.routes.ai_router import proxy_image
+from app.services.http_client import http_client
+
+IMAGE = b"\x89PNG" + bytes(range(256)) * 1024
+
+
+async def start_stub_image_server():
+    """Local server with an image at /leaf.png and nothing anywhere else"""
+
+    async def leaf(request):
+        return web.Response(body=IMAGE, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/leaf.png", leaf)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def connections_in_use():
+    session = await http_client.get_session()
+    return len(session.connector._acquired)
+
+
+def test_proxy_streams_images_and_rejects_upstream_errors():
+    app = FastAPI()
+    app.include_router(ai_router)
+
+    async def scenario():
+        runner, base = await start_stub_image_server()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                image = await client.get("/ai/proxy-image", params={"url": f"{base}/leaf.png"})
+                image_in_use = await connections_in_use()
+                missing = await client.get("/ai/proxy-image", params={"url": f"{base}/missing.png"})
+                missing_in_use = await connections_in_use()
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return image, image_in_use, missing, missing_in_use
+
+    image, image_in_use, missing, missing_in_use = asyncio.run(scenario())
+    assert image.status_code == 200 and image.content == IMAGE
+    assert image.headers["content-type"] == "image/png"
+    assert missing.status_code == 502
+    assert image_in_use == 0 and missing_in_use == 0
+
+
+def test_proxy_releases_the_connection_when_the_client_goes_away():
+    async def scenario():
+        runner, base = await start_stub_image_server()
+        try:
+            response = await proxy_image(f"{base}/leaf.png")
+            sent = []
+
+            async def send(message):
+                if message["type"] == "http.response.body" and sent:
+                    raise OSError("client went away")
+                sent.append(message)
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+            with pytest.raises(ClientDisconnect):
+                await response(scope, receive, send)
+            return await connections_in_use()
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+
+    assert asyncio.run(scenario()) == 0
@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.multispectral_service import SOIL_COLORS
+from app.utils.raster_render import (
+    LUTS,
+    class_colorbar,
+    colorbar,
+    colorize,
+    palette_lut,
+    render_classes,
+    render_raster,
+)
+
+
+def decode(data):
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+
+def test_colorize_matches_matplotlib_colormaps():
+    matplotlib = pytest.importorskip("matplotlib")
+    values = np.linspace(-0.3, 0.9, 1000, dtype=np.float32).reshape(20, 50)
+    for name in ("RdYlGn", "viridis"):
+        expected = matplotlib.colormaps[name](matplotlib.colors.Normalize()(values), bytes=True)
+        rgba = colorize(values, name)
+        # Anchor interpolation differs from matplotlib's tables by a few levels at most
+        assert np.abs(rgba[..., :3].astype(int) - expected[..., :3]).max() <= 6
+        assert (rgba[..., 3] == 255).all()
+
+
+def test_render_downsamples_and_makes_nan_transparent():
+    array = np.random.default_rng(0).random((1500, 1000)).astype(np.float32)
+    array[:100] = np.nan
+    for image_format in ("PNG", "WEBP"):
+        rgba = decode(render_raster(array, "RdYlGn", 0, 1, max_size=512, image_format=image_format))
+        assert rgba.shape == (500, 334, 4)
+        assert (rgba[:34, :, 3] == 0).all() and (rgba[34:, :, 3] == 255).all()
+
+    assert decode(render_raster(array, max_size=64)).shape == (63, 42, 4)
+
+
+def test_soil_classes_use_palette_colors():
+    palette = palette_lut(SOIL_COLORS)
+    classes = np.array([[0, 1], [2, 3]], dtype=np.float32)
+    rgba = decode(render_classes(classes, palette, image_format="PNG"))
+    assert (rgba[..., :3].reshape(4, 3) == palette).all()
+
+
+def test_colorbars_are_cached_gradients():
+    bar = colorbar("RdYlGn")
+    assert colorbar("RdYlGn") is bar
+    pixels = decode(bar)
+    assert pixels.shape == (256, 24, 4)
+    assert (pixels[0, 0, :3] == LUTS["RdYlGn"][-1]).all() and (pixels[-1, 0, :3] == LUTS["RdYlGn"][0]).all()
+
+    soil = decode(class_colorbar(tuple(SOIL_COLORS)))
+    assert (soil[-1, 0, :3] == palette_lut(SOIL_COLORS)[0]).all()
+    with pytest.raises(ValueError):
+        colorbar("jet")
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from app.services.raster_stats import LayerStatistics, RasterStatistics
+
+
+def test_streamed_tiles_match_exact_statistics_within_bin_width():
+    rng = np.random.default_rng(0)
+    data = np.clip(rng.normal(0.2, 0.3, (600, 500)), -1, 1).astype(np.float32)
+    data[rng.random(data.shape) < 0.05] = np.nan
+
+    stats = RasterStatistics("NDVI", (-1, 1))
+    for row in range(0, data.shape[0], 128):
+        for col in range(0, data.shape[1], 128):
+            stats.update(data[row:row + 128, col:col + 128])
+
+    valid = data[~np.isnan(data)]
+    summary = stats.summary()
+    assert stats.count == valid.size
+    assert summary["min"] == valid.min()
+    assert summary["max"] == valid.max()
+    assert summary["mean"] == pytest.approx(valid.mean(dtype=np.float64), rel=1e-9)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert abs(stats.quantile(q) - np.quantile(valid, q)) <= stats.bin_width
+
+
+def test_out_of_range_values_keep_exact_extremes():
+    stats = RasterStatistics("LST", (-20, 60), bins=80)
+    stats.update(np.array([-40.0, 10.0, 10.5, 90.0]))
+    assert stats.summary()["min"] == -40.0
+    assert stats.summary()["max"] == 90.0
+    assert stats.counts.sum() == 4
+
+
+def test_empty_layers_summarize_to_zeros():
+    layers = LayerStatistics({"NDVI": (-1, 1), "Carbon": (0, 1)})
+    layers.update({"NDVI": np.full((4, 4), np.nan)})
+    assert [s["name"] for s in layers.summaries()] == ["NDVI", "Carbon"]
+    assert layers.summaries()[0] == {
+        "name": "NDVI", "min": 0, "max": 0, "mean": 0, "percentile_25": 0, "percentile_75": 0
+    }
+    assert layers["NDVI"].quantile(0.5) is None
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from app.config import IDX_TO_CLASS
+from app.services.alleai_service import AlleAIService
+from app.services.http_client import http_client
+from app.services.recommendation_warmup import RecommendationWarmer, crop_type_from_class, warmup_targets
+
+
+def test_targets_cover_every_class_and_confidence_band():
+    targets = warmup_targets(0.25)
+    assert len(targets) == len(IDX_TO_CLASS) * 4
+    keys = {AlleAIService.recommendations_cache_key(*target) for target in targets}
+    assert len(keys) == len(targets)
+    # Whatever confidence a prediction has, its key is one of the warmed ones
+    for class_name in IDX_TO_CLASS.values():
+        for confidence in (0.0, 0.3, 0.5, 0.74, 0.99, 1.0):
+            assert AlleAIService.recommendations_cache_key(class_name, confidence, crop_type_from_class(class_name)) in keys
+    assert [confidence for _, confidence, _ in warmup_targets(0.3)[:4]] == [0.15, 0.45, 0.75, 0.95]
+    assert len(warmup_targets(0)) == len(IDX_TO_CLASS)
+
+
+def test_warmup_fills_the_cache_with_bounded_concurrency(monkeypatch):
+    service = AlleAIService()
+    state = {"active": 0, "peak": 0, "calls": 0, "fail": False}
+
+    async def fake_request(messages, temperature=0.7, max_tokens=1000, models=None, clean=True):
+        state["calls"] += 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(0.005)
+        finally:
+            state["active"] -= 1
+        if state["fail"]:
+            raise Exception("upstream timeout")
+        return json.dumps({"disease_overview": f"pass {state['calls']}"})
+
+    monkeypatch.setattr(service, "_make_alleai_request", fake_request)
+    warmer = RecommendationWarmer(service, concurrency=3, refresh_after_seconds=3600)
+    targets = len(warmup_targets())
+
+    async def scenario():
+        first = await warmer.run_once()
+        calls_after_warmup = state["calls"]
+        served = await service.get_disease_recommendations("maize_streak_virus", 0.93, "Maize")
+        fresh_pass = await warmer.run_once()
+
+        # Every entry is due again but the LLM is down: old entries stay in place
+        warmer.refresh_after_seconds = 0
+        state["fail"] = True
+        failed_pass = await warmer.run_once()
+        still_served = await service.get_disease_recommendations("maize_streak_virus", 0.93, "Maize")
+        return first, calls_after_warmup, served, fresh_pass, failed_pass, still_served
+
+    first, calls_after_warmup, served, fresh_pass, failed_pass, still_served = asyncio.run(scenario())
+    assert first["refreshed"] == targets and first["failed"] == 0
+    assert state["peak"] == 3
+    assert served["disease_overview"].startswith("pass ")
+    assert calls_after_warmup == targets
+    assert fresh_pass["refreshed"] == 0
+    assert failed_pass["failed"] == targets
+    assert still_served is served
+    assert state["calls"] == targets * 2
+    assert warmer.get_status()["passes"] == 3
+
+
+async def start_stub_alleai():
+    """Local AlleAI endpoint answering every disease prompt with well-formed recommendations JSON"""
+    calls = []
+
+    async def completions(request):
+        calls.append(await request.json())
+        reply = json.dumps({
+            "disease_overview": f"Overview #{len(calls)}",
+            "immediate_actions": "Isolate affected plants.",
+            "treatment_protocols": {"organic": "Neem oil"},
+            "prevention": "Rotate crops.",
+            "monitoring": "Scout weekly.",
+            "cost_effective": "Remove debris.",
+            "severity_level": "Moderate",
+            "professional_help": "Ask an extension officer."
+        })
+        return web.json_response({"responses": {"responses": {"gpt-4o": reply}}})
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions", calls
+
+
+def test_warmup_against_an_http_llm_refreshes_every_target():
+    async def scenario():
+        runner, url, calls = await start_stub_alleai()
+        service = AlleAIService()
+        service.api_url = url
+        warmer = RecommendationWarmer(service, concurrency=8)
+        try:
+            summary = await warmer.run_once()
+            served = await service.get_disease_recommendations("cassava_mosaic", 0.8, "Cassava")
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return summary, served, calls
+
+    summary, served, calls = asyncio.run(scenario())
+    targets = len(warmup_targets())
+    assert summary["refreshed"] == targets and summary["failed"] == 0
+    assert served["disease_overview"].startswith("Overview #") and len(calls) == targets
+
+
+def test_clearing_the_cache_makes_the_next_pass_regenerate_everything(monkeypatch):
+    service = AlleAIService()
+    calls = []
+
+    async def fake_request(messages, temperature=0.7, max_tokens=1000, models=None, clean=True):
+        calls.append(messages)
+        return json.dumps({"disease_overview": f"call {len(calls)}"})
+
+    monkeypatch.setattr(service, "_make_alleai_request", fake_request)
+    warmer = RecommendationWarmer(service, concurrency=4, refresh_after_seconds=3600)
+    targets = len(warmup_targets())
+
+    async def scenario():
+        await warmer.run_once()
+        await service.clear_cache()
+        warmer.forget_generated()
+        cleared = service.get_cache_stats()
+        summary = await warmer.run_once()
+        return cleared, summary
+
+    cleared, summary = asyncio.run(scenario())
+    assert cleared["size"] == 0
+    assert summary["refreshed"] == targets and len(calls) == targets * 2
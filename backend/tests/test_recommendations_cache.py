@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from app.services.alleai_service import AlleAIService
+from app.services.cache import TTLCache, approximate_size
+from app.services.http_client import http_client
+
+
+def test_ttl_cache_tracks_memory_through_evictions():
+    cache = TTLCache(max_entries=2, ttl_seconds=60, size_of=approximate_size)
+    cache.set("a", {"treatment": "x" * 1000})
+    cache.set("b", {"treatment": "y" * 10})
+    cache.set("a", {"treatment": "z" * 10})
+    cache.set("c", {"treatment": "w" * 10})
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.memory_bytes == approximate_size({"treatment": "z" * 10}) * 2
+    cache.clear()
+    assert cache.get_stats()["memory_bytes"] == 0
+
+
+def test_confidences_in_the_same_band_share_a_key(monkeypatch):
+    key = AlleAIService.recommendations_cache_key
+    assert key("Tomato_Late_blight", 0.91, "tomato") == key("Tomato_Late_blight", 0.999, "tomato")
+    assert key("Tomato_Late_blight", 0.91, "tomato") == key("Tomato_Late_blight", 1.0, "tomato")
+    assert key("Tomato_Late_blight", 0.91, "tomato") != key("Tomato_Late_blight", 0.6, "tomato")
+    monkeypatch.setattr("app.config.settings.RECOMMENDATIONS_CONFIDENCE_BUCKET", 0)
+    assert key("Tomato_Late_blight", 0.91, "tomato") == key("Tomato_Late_blight", 0.2, "tomato")
+
+
+def test_recommendations_are_reused_and_fallbacks_expire_sooner(monkeypatch):
+    service = AlleAIService()
+    calls = []
+
+    async def fake_request(messages, temperature=0.7, max_tokens=1000, models=None, clean=True):
+        calls.append(messages)
+        if len(calls) == 1:
+            raise Exception("upstream timeout")
+        return json.dumps({"disease_overview": "Late blight spreads fast in wet weather."})
+
+    monkeypatch.setattr(service, "_make_alleai_request", fake_request)
+    monkeypatch.setattr("app.config.settings.RECOMMENDATIONS_CACHE_FALLBACK_TTL_SECONDS", 0.05)
+
+    async def scenario():
+        fallback = await service.get_disease_recommendations("Tomato_Late_blight", 0.93, "tomato")
+        cached_fallback = await service.get_disease_recommendations("Tomato_Late_blight", 0.95, "tomato")
+        await asyncio.sleep(0.1)
+        fresh = await service.get_disease_recommendations("Tomato_Late_blight", 0.97, "tomato")
+        reused = await service.get_disease_recommendations("Tomato_Late_blight", 0.99, "tomato")
+        return fallback, cached_fallback, fresh, reused
+
+    fallback, cached_fallback, fresh, reused = asyncio.run(scenario())
+    assert cached_fallback is fallback
+    assert fresh["disease_overview"] == "Late blight spreads fast in wet weather."
+    assert reused is fresh and len(calls) == 2
+    stats = service.get_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_ratio"] == 0.5
+    assert stats["expirations"] == 1 and stats["memory_bytes"] > 0
+
+
+RECOMMENDATIONS_JSON = json.dumps({
+    "disease_overview": "Late blight spreads fast in wet weather.",
+    "immediate_actions": "Remove infected leaves.",
+    "treatment_protocols": {"organic": "Copper spray", "chemical": "Mancozeb"},
+    "prevention": "Space plants for airflow.",
+    "monitoring": "Check leaves daily.",
+    "cost_effective": "Prune early.",
+    "severity_level": "High",
+    "professional_help": "Call extension services if it spreads."
+})
+
+
+async def start_stub_alleai(reply):
+    """Local AlleAI chat completions endpoint answering every request with ``reply``"""
+    calls = []
+
+    async def completions(request):
+        calls.append(await request.json())
+        return web.json_response({"responses": {"responses": {"gpt-4o": reply}}})
+
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions", calls
+
+
+def test_real_llm_answers_are_parsed_and_cached_for_the_full_ttl():
+    async def scenario():
+        runner, url, calls = await start_stub_alleai(f"```json\n{RECOMMENDATIONS_JSON}\n```")
+        service = AlleAIService()
+        service.api_url = url
+        try:
+            first = await service.get_disease_recommendations("tomato_leaf_blight", 0.9, "Tomato")
+            second = await service.get_disease_recommendations("tomato_leaf_blight", 0.95, "Tomato")
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+        return service, first, second, calls
+
+    service, first, second, calls = asyncio.run(scenario())
+    assert first["disease_overview"] == "Late blight spreads fast in wet weather."
+    assert first["treatment_protocols"]["organic"] == "Copper spray"
+    assert second is first and len(calls) == 1
+    key = service.recommendations_cache_key("tomato_leaf_blight", 0.9, "Tomato")
+    _, expires_at, _ = service._recommendations_cache.local._entries[key]
+    assert expires_at - time.monotonic() > service._recommendations_cache.local.ttl_seconds - 60
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import rasterio
+
+from app.services.analysis_pool import AnalysisWorkerPool
+from app.services.scene_cache import SceneResultCache
+from test_multispectral_tiling import PRODUCT_ID, write_scene
+
+
+def scene_in(directory):
+    directory.mkdir()
+    return write_scene(str(directory))
+
+
+def test_key_tracks_band_contents_and_crop_params(tmp_path):
+    mtl_path = scene_in(tmp_path / "scene")
+    cache = SceneResultCache(directory=str(tmp_path / "cache"))
+    key = cache.key_for(mtl_path)
+    assert key.startswith(f"{PRODUCT_ID}__") and key == cache.key_for(mtl_path)
+
+    band = mtl_path.replace("_MTL.txt", "_B4.TIF")
+    with rasterio.open(band, "r+") as dst:
+        dst.write(np.ones((1, 10, 10), dtype=np.uint16), window=((0, 10), (0, 10)))
+    changed_bands = cache.key_for(mtl_path)
+    assert changed_bands != key
+
+    cache.analyzer.crop_params["Maize"]["temp_range"] = (20, 26)
+    assert cache.key_for(mtl_path).rsplit("__", 1)[0] != changed_bands.rsplit("__", 1)[0]
+
+    os.remove(band)
+    assert cache.key_for(mtl_path) is None
+
+
+def test_round_trip_and_least_recently_used_eviction(tmp_path):
+    cache = SceneResultCache(directory=str(tmp_path), max_bytes=2500)
+    payload = {"best_crop": "Maize", "image": "x" * 1000}
+    assert cache.get("A__p__1") is None
+
+    cache.set("A__p__1", payload)
+    cache.set("A__p__2", payload)
+    past = time.time() - 60
+    os.utime(os.path.join(tmp_path, "A__p__2.json"), (past, past))
+    assert cache.get("A__p__1") == payload  # refreshes entry 1
+    cache.set("A__p__3", payload)
+
+    assert cache.get("A__p__2") is None
+    assert cache.get("A__p__1") == payload and cache.get("A__p__3") == payload
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 2)
+
+
+def test_invalidate_by_product_and_stale_params(tmp_path):
+    cache = SceneResultCache(directory=str(tmp_path))
+    current = cache.params_hash()
+    for key in (f"LC08_A__{current}__1", f"LC08_B__{current}__1", "LC08_A__oldparams__1"):
+        cache.set(key, {"ok": True})
+
+    assert cache.invalidate(stale_only=True) == 1
+    assert cache.invalidate(product_id="LC08_A") == 1
+    assert cache.get(f"LC08_B__{current}__1") == {"ok": True}
+    assert cache.invalidate() == 1 and cache.get_stats()["entries"] == 0
+
+
+def test_pool_answers_repeat_scenes_from_cache(tmp_path):
+    mtl_path = scene_in(tmp_path / "scene")
+    cache = SceneResultCache(directory=str(tmp_path / "cache"))
+    pool = AnalysisWorkerPool(max_workers=1, timeout_seconds=120, poll_interval=0.05, cache=cache)
+
+    first = asyncio.run(pool.run(mtl_path))
+    start = time.perf_counter()
+    second = asyncio.run(pool.run(mtl_path))
+
+    assert time.perf_counter() - start < 1.0
+    assert second == first
+    assert pool.get_stats()["completed"] == 1
+    assert cache.get_stats()["hits"] == 1
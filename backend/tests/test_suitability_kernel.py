@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.services.index_kernel import IndexKernel
+from app.services.multispectral_service import MultispectralAnalyzer
+from app.services.suitability_kernel import SuitabilityKernel
+from test_index_kernel import CONSTANTS, make_bands
+
+
+def tile_indices(shape, seed=0):
+    kernel = IndexKernel(shape)
+    lst = kernel.clipped_lst(make_bands(shape, seed)["B10"], CONSTANTS).astype(np.float64)
+    indices = kernel.compute(make_bands(shape, seed), CONSTANTS, float(lst.mean()), float(lst.std()) / 2)
+    return {name: layer.copy() for name, layer in indices.items()}
+
+
+def reference_suitability(crop_params, indices):
+    """Per-crop scoring over whole float64 arrays, one temporary per term and crop"""
+    lst_norm = (indices["LST"] - (-20)) / (60 - (-20))
+    moisture = (indices["Moisture"] + 1) / 2
+    vegetation = (indices["NDVI"] + 1) / 2
+    soil_quality = (indices["Carbon"] + (1 - indices["BSI"])) / 2
+
+    suitability = {}
+    for crop, params in crop_params.items():
+        # Gaussian temperature score; ranges are divided by 60 although LST is normalized over 80
+        temp_center = np.mean(params["temp_range"])
+        temp_width = (params["temp_range"][1] - params["temp_range"][0]) / 2
+        temp_score = np.exp(-0.5 * ((lst_norm - temp_center / 60) / (temp_width / 60)) ** 2)
+
+        # Triangular moisture score
+        moisture_low, moisture_high = params["moisture_range"]
+        moisture_score = np.where(
+            moisture < moisture_low,
+            moisture / moisture_low,
+            np.where(moisture > moisture_high, (1 - moisture) / (1 - moisture_high), 1)
+        )
+
+        veg_low, veg_high = params["vegetation_range"]
+        veg_score = np.clip((vegetation - veg_low) / (veg_high - veg_low), 0, 1)
+        soil_low, soil_high = params["soil_range"]
+        soil_score = np.clip((soil_quality - soil_low) / (soil_high - soil_low), 0, 1)
+        soil_comp = np.isin(indices["SoilType"], params["preferred_soil"]).astype(float)
+
+        suitability[crop] = np.clip(
+            temp_score * 0.3 + moisture_score * 0.2 + veg_score * 0.2 + soil_score * 0.2 + soil_comp * 0.1,
+            0, 1
+        )
+    return suitability
+
+
+def test_kernel_matches_per_crop_scoring():
+    analyzer = MultispectralAnalyzer()
+    indices = tile_indices((64, 48))
+    scores, best = SuitabilityKernel(analyzer.crop_params, (64, 48)).compute(indices)
+    expected = reference_suitability(analyzer.crop_params, {name: layer.astype(np.float64) for name, layer in indices.items()})
+
+    assert scores.shape == (len(analyzer.crop_params), 64, 48) and scores.dtype == np.float32
+    for i, crop in enumerate(analyzer.crop_params):
+        np.testing.assert_allclose(scores[i], expected[crop], atol=1e-5, equal_nan=True, err_msg=crop)
+
+    stacked = np.stack(list(expected.values()))
+    valid = ~np.isnan(stacked[0])
+    assert np.isnan(best[~valid]).all() and valid.any() and not valid.all()
+    candidates = stacked[:, valid]
+    chosen = np.take_along_axis(candidates, best[valid].astype(int)[np.newaxis], axis=0)[0]
+    # Ties aside, the chosen crop has the highest score
+    np.testing.assert_allclose(chosen, candidates.max(axis=0), atol=1e-5)
+
+
+def test_crops_are_parameter_slices_and_edge_tiles_reuse_buffers():
+    analyzer = MultispectralAnalyzer()
+    params = dict(analyzer.crop_params)
+    params["Maize (late)"] = {**params["Maize"], "temp_range": (23, 29)}
+    kernel = SuitabilityKernel(params, (32, 32))
+    full, _ = kernel.compute(tile_indices((32, 32)))
+    buffer = full
+    edge, best = kernel.compute(tile_indices((10, 7), seed=1))
+
+    assert edge.shape == (5, 10, 7) and best.shape == (10, 7)
+    assert np.shares_memory(edge, buffer)
+    reference = SuitabilityKernel(analyzer.crop_params, (10, 7)).compute(tile_indices((10, 7), seed=1))[0]
+    np.testing.assert_array_equal(edge[:4], reference)
+    with pytest.raises(ValueError):
+        kernel.compute(tile_indices((40, 8)))
@@ -0,0 +1,85 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.requests import Request
+
+from app.utils.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware, read_upload, safe_filename, save_upload
+
+
+def make_upload(data, filename="leaf.jpg"):
+    return UploadFile(io.BytesIO(data), filename=filename, headers=Headers({"content-type": "image/jpeg"}))
+
+
+def test_read_upload_enforces_limit_while_reading():
+    assert asyncio.run(read_upload(make_upload(b"x" * 10), max_size=10, chunk_size=3)) == b"x" * 10
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(make_upload(b"x" * 11), max_size=10, chunk_size=3))
+    assert error.value.status_code == 413
+
+
+def test_save_upload_streams_to_disk_and_cleans_up_on_overflow(tmp_path):
+    path, size = asyncio.run(save_upload(make_upload(b"abc" * 100, "../../etc/band_B4.TIF"), str(tmp_path), 1000, 64))
+    assert path == os.path.join(str(tmp_path), "band_B4.TIF") and size == 300
+    with pytest.raises(HTTPException):
+        asyncio.run(save_upload(make_upload(b"abc" * 100, "big.TIF"), str(tmp_path), 100, 64))
+    assert not os.path.exists(tmp_path / "big.TIF")
+    assert safe_filename("..").startswith("upload-")
+
+
+def call(app, path, chunks, content_length=None):
+    """Send a POST through the ASGI app and return (status, chunks consumed)"""
+    headers = [(b"content-type", b"application/octet-stream")]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers,
+             "query_string": b"", "http_version": "1.1", "scheme": "http",
+             "server": ("test", 80), "client": ("test", 1), "root_path": ""}
+    consumed = []
+    messages = []
+
+    async def receive():
+        index = len(consumed)
+        consumed.append(index)
+        if index < len(chunks):
+            return {"type": "http.request", "body": chunks[index], "more_body": index < len(chunks) - 1}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], len(consumed)
+
+
+def build_app():
+    inner = FastAPI()
+
+    @inner.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    return UploadSizeLimitMiddleware(inner, default_limit=100, route_limits={"/predict": 10})
+
+
+def test_middleware_rejects_by_content_length_without_reading_body():
+    status, consumed = call(build_app(), "/echo", [b"x" * 10], content_length=100 + MULTIPART_OVERHEAD + 1)
+    assert status == 413 and consumed == 0
+
+
+def test_middleware_stops_streaming_body_past_limit():
+    chunk = b"x" * (MULTIPART_OVERHEAD // 2)
+    status, consumed = call(build_app(), "/echo", [chunk] * 10)
+    assert status == 413 and consumed == 3
+    status, _ = call(build_app(), "/echo", [b"x" * 50])
+    assert status == 200
+
+
+def test_middleware_picks_longest_matching_route_limit():
+    app = UploadSizeLimitMiddleware(None, default_limit=100, route_limits={"/predict": 10, "/predict/batch": 50})
+    assert app.limit_for("/predict/batch") == 50
+    assert app.limit_for("/predict/") == 10
+    assert app.limit_for("/chat/") == 100
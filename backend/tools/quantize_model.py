@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Produce quantized variants of the classifier and gate them on accuracy.
+
+Variants (written next to the FP32 model, see resolve_model_path):
+- int8-dynamic: weights quantized to INT8 ahead of time, activations at runtime
+- int8-static:  weights and activations quantized to INT8 (QDQ format), with
+                activation ranges calibrated on a folder of sample leaf images
+                (both INT8 variants use onnxruntime.quantization, which requires
+                the optional onnx package)
+- fp16:         weights converted to float16 with float32 inputs/outputs
+                (requires the optional onnxconverter-common package)
+
+Every variant is then compared with the FP32 model over an evaluation folder:
+top-1 agreement (same argmax) and top-3 agreement (FP32's top class is within
+the variant's top 3), per class over the 22 classes in IDX_TO_CLASS, plus
+latency. A variant passes when both agreements meet the thresholds; only then
+should MODEL_VARIANT be switched to it.
+
+Usage:
+    python tools/quantize_model.py --calibration-dir samples/calibration --eval-dir samples/eval
+        [--variants int8-dynamic int8-static fp16] [--min-top1 0.98] [--min-top3 0.995]
+        [--max-calibration-images 300] [--report quantization_report.json]
+    python tools/quantize_model.py --eval-only --eval-dir samples/eval
+
+Exit status is non-zero if any requested variant fails the accuracy gate.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import onnxruntime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings, IDX_TO_CLASS
+from app.services.prediction_service import PredictionService, resolve_model_path
+from app.utils.image_decode import decode_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+QUANTIZED_VARIANTS = ("int8-dynamic", "int8-static", "fp16")
+
+
+def find_images(folder: str, limit: Optional[int] = None) -> List[str]:
+    """Recursively list image files in a folder (sorted for reproducibility)"""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    paths.sort()
+    return paths[:limit] if limit else paths
+
+
+def load_inputs(paths: List[str], preprocessor: PredictionService) -> Iterator[np.ndarray]:
+    """Decode and preprocess images exactly like the /predict endpoint"""
+    for path in paths:
+        with open(path, "rb") as f:
+            array = decode_image(f.read())
+        yield preprocessor.preprocess_image(array).copy()
+
+
+class LeafImageCalibrationReader:
+    """Feeds preprocessed sample images to the static quantization calibrator"""
+
+    def __init__(self, paths: List[str], input_name: str, preprocessor: PredictionService):
+        self.input_name = input_name
+        self._inputs = load_inputs(paths, preprocessor)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        tensor = next(self._inputs, None)
+        return None if tensor is None else {self.input_name: tensor}
+
+
+def quantize_dynamic_variant(source: str, target: str) -> None:
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise RuntimeError("INT8 quantization requires 'onnx' (pip install onnx)")
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+
+def quantize_static_variant(source: str, target: str, calibration_paths: List[str],
+                            preprocessor: PredictionService, calibration_method: str) -> None:
+    try:
+        from onnxruntime.quantization import (
+            CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+        )
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError:
+        raise RuntimeError("INT8 quantization requires 'onnx' (pip install onnx)")
+
+    if not calibration_paths:
+        raise ValueError("Static quantization needs calibration images (--calibration-dir)")
+
+    class Reader(LeafImageCalibrationReader, CalibrationDataReader):
+        pass
+
+    input_name = onnxruntime.InferenceSession(source).get_inputs()[0].name
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shape inference + graph cleanup gives the quantizer complete tensor info;
+        # the classifier has static spatial dims so ONNX shape inference suffices
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(source, prepared, skip_symbolic_shape=True)
+        quantize_static(
+            prepared,
+            target,
+            Reader(calibration_paths, input_name, preprocessor),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=getattr(CalibrationMethod, calibration_method)
+        )
+
+
+def convert_fp16_variant(source: str, target: str) -> None:
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError:
+        raise RuntimeError("FP16 conversion requires 'onnx' and 'onnxconverter-common' (pip install onnxconverter-common)")
+    model = onnx.load(source)
+    onnx.save(float16.convert_float_to_float16(model, keep_io_types=True), target)
+
+
+def run_model(path: str, inputs: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """Run a model over preprocessed inputs, returning probabilities and latencies"""
+    session = onnxruntime.InferenceSession(path)
+    input_name = session.get_inputs()[0].name
+    probabilities, latencies = [], []
+    for tensor in inputs:
+        start = time.perf_counter()
+        logits = session.run(None, {input_name: tensor})[0][0].astype(np.float64)
+        latencies.append(time.perf_counter() - start)
+        exp = np.exp(logits - logits.max())
+        probabilities.append(exp / exp.sum())
+    return {"probabilities": np.array(probabilities), "latencies": np.array(latencies)}
+
+
+def compare(reference: Dict[str, np.ndarray], candidate: Dict[str, np.ndarray]) -> Dict:
+    """Top-1/top-3 agreement of a candidate against the FP32 reference"""
+    ref_top1 = reference["probabilities"].argmax(axis=1)
+    cand_top1 = candidate["probabilities"].argmax(axis=1)
+    cand_top3 = np.argsort(candidate["probabilities"], axis=1)[:, -3:]
+    top1 = ref_top1 == cand_top1
+    top3 = (cand_top3 == ref_top1[:, None]).any(axis=1)
+
+    per_class = {}
+    for index, class_name in IDX_TO_CLASS.items():
+        mask = ref_top1 == index
+        if mask.any():
+            per_class[class_name] = {
+                "samples": int(mask.sum()),
+                "top1_agreement": float(top1[mask].mean()),
+                "top3_agreement": float(top3[mask].mean())
+            }
+    return {
+        "top1_agreement": float(top1.mean()),
+        "top3_agreement": float(top3.mean()),
+        "max_probability_delta": float(np.abs(reference["probabilities"] - candidate["probabilities"]).max()),
+        "latency_p50_ms": float(np.percentile(candidate["latencies"], 50) * 1000),
+        "per_class": per_class
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="FP32 source model")
+    parser.add_argument("--variants", nargs="+", default=["int8-dynamic", "int8-static"], choices=QUANTIZED_VARIANTS)
+    parser.add_argument("--calibration-dir", help="Sample leaf images for static calibration")
+    parser.add_argument("--max-calibration-images", type=int, default=300)
+    parser.add_argument("--calibration-method", default="MinMax", choices=["MinMax", "Entropy", "Percentile"])
+    parser.add_argument("--eval-dir", help="Images used to compare variants with FP32 (defaults to the calibration dir)")
+    parser.add_argument("--eval-only", action="store_true", help="Skip quantization and evaluate existing variants")
+    parser.add_argument("--min-top1", type=float, default=0.98)
+    parser.add_argument("--min-top3", type=float, default=0.995)
+    parser.add_argument("--report", help="Write the evaluation report as JSON")
+    args = parser.parse_args()
+
+    preprocessor = PredictionService(auto_load=False)
+    calibration_paths = find_images(args.calibration_dir, args.max_calibration_images) if args.calibration_dir else []
+
+    if not args.eval_only:
+        for variant in args.variants:
+            target = resolve_model_path(variant, args.model)
+            print(f"⚙️  Building {variant} -> {target}")
+            start = time.perf_counter()
+            if variant == "int8-dynamic":
+                quantize_dynamic_variant(args.model, target)
+            elif variant == "int8-static":
+                quantize_static_variant(args.model, target, calibration_paths, preprocessor, args.calibration_method)
+            else:
+                convert_fp16_variant(args.model, target)
+            size_ratio = os.path.getsize(target) / os.path.getsize(args.model)
+            print(f"   done in {time.perf_counter() - start:.1f}s, {size_ratio:.0%} of FP32 size")
+
+    eval_dir = args.eval_dir or args.calibration_dir
+    if not eval_dir:
+        parser.error("--eval-dir (or --calibration-dir) is required to evaluate accuracy")
+    eval_paths = find_images(eval_dir)
+    if not eval_paths:
+        parser.error(f"No images found in {eval_dir}")
+    inputs = list(load_inputs(eval_paths, preprocessor))
+
+    print(f"\n🧪 Comparing against FP32 on {len(inputs)} images")
+    reference = run_model(args.model, inputs)
+    report = {
+        "fp32": {"latency_p50_ms": float(np.percentile(reference["latencies"], 50) * 1000)},
+        "thresholds": {"top1": args.min_top1, "top3": args.min_top3},
+        "variants": {}
+    }
+    print(f"{'variant':<14} {'top-1':>7} {'top-3':>7} {'p50 ms':>8}  gate")
+    print(f"{'fp32':<14} {'1.000':>7} {'1.000':>7} {report['fp32']['latency_p50_ms']:8.2f}  reference")
+
+    all_passed = True
+    for variant in args.variants:
+        path = resolve_model_path(variant, args.model)
+        if not os.path.exists(path):
+            print(f"{variant:<14} missing ({path})")
+            all_passed = False
+            continue
+        result = compare(reference, run_model(path, inputs))
+        result["passed"] = result["top1_agreement"] >= args.min_top1 and result["top3_agreement"] >= args.min_top3
+        all_passed &= result["passed"]
+        report["variants"][variant] = result
+        print(f"{variant:<14} {result['top1_agreement']:7.3f} {result['top3_agreement']:7.3f} "
+              f"{result['latency_p50_ms']:8.2f}  {'✅ pass' if result['passed'] else '❌ fail'}")
+        for class_name, stats in result["per_class"].items():
+            if stats["top1_agreement"] < args.min_top1:
+                print(f"    {class_name}: top-1 {stats['top1_agreement']:.3f} over {stats['samples']} images")
+
+    passing = [v for v, r in report["variants"].items() if r["passed"]]
+    if passing:
+        fastest = min(passing, key=lambda v: report["variants"][v]["latency_p50_ms"])
+        print(f"\nFastest variant within the accuracy gate: MODEL_VARIANT={fastest}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    sys.exit(0 if all_passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,73 @@ export async function askAiChat(userMessage: string, context?: string, models?:
   }
 }
 
+/**
+ * Ask the AI assistant a question and receive the answer as it is generated.
+ * Reads the Server-Sent Events from /ai/chat/stream.
+ * @param userMessage The user's question or prompt.
+ * @param onToken Called with each new piece of the answer as it arrives.
+ * @param models Optional list of AI models to use.
+ * @param signal Optional AbortSignal; aborting also stops the backend's LLM call.
+ * @returns The complete answer (same text askAiChat would return).
+ */
+export async function streamAiChat(
+  userMessage: string,
+  onToken: (text: string) => void,
+  models?: string[],
+  signal?: AbortSignal
+): Promise<string> {
+  const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000';
+
+  const res = await fetch(`${API_BASE}/ai/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({ prompt: userMessage, models: models || undefined }),
+    signal,
+  });
+
+  if (!res.ok || !res.body) {
+    const errorText = await res.text();
+    console.error('AI chat stream request failed:', res.status, errorText);
+    throw new Error(`Failed to get AI response: ${res.status} ${errorText}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let answer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line: "event: <name>\ndata: <json>"
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = block.match(/^data: (.*)$/m)?.[1];
+      if (!event || !data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'token') {
+        answer += payload.text;
+        onToken(payload.text);
+      } else if (event === 'done') {
+        return payload.message;
+      } else if (event === 'error') {
+        throw new Error(payload.detail || 'AI response failed');
+      }
+    }
+  }
+
+  return answer;
+}
+
 /**
  * Test the AI chat functionality with a simple message.
  * @returns Test result information.
@@ -21,8 +21,8 @@ export interface MultispectralAnalysisResult {
       percentile_25: number;
       percentile_75: number;
     }>;
-    suitability_images: Record<string, string>; // base64 images
-    soil_type_image: string; // base64 image
+    suitability_images: Record<string, string>; // signed layer URLs (async jobs) or data URIs
+    soil_type_image: string; // signed layer URL (async jobs) or data URI
     prediction: string;
     best_crop: string;
     analysis_summary: {